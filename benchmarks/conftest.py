@@ -0,0 +1,62 @@
+"""
+conftest.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+Configures Django against the fake MeiliSearch server for the benchmark suite.
+
+The fake server has to be running before Django is set up, because the
+django-meili client and the model indexes are created at import time.
+"""
+
+from io import StringIO
+
+import django
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+from benchmarks.fakemeili import FakeMeiliServer
+
+server = FakeMeiliServer().start()
+
+settings.configure(
+    DEBUG=False,
+    SECRET_KEY="benchmarks",
+    INSTALLED_APPS=[
+        "django.contrib.contenttypes",
+        "django.contrib.auth",
+        "django_meili",
+        "posts",
+    ],
+    DATABASES={
+        "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}
+    },
+    DEFAULT_AUTO_FIELD="django.db.models.BigAutoField",
+    USE_TZ=True,
+    MEILISEARCH={"HOST": server.host, "PORT": server.port},
+)
+django.setup()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    call_command("migrate", run_syncdb=True, verbosity=0)
+
+
+@pytest.fixture(scope="session")
+def posts(database):
+    """A thousand posts already present in both the database and the index."""
+
+    from posts.models import Post
+
+    Post.objects.bulk_create(
+        Post(
+            title=f"Hello World {i}",
+            body="This is a test post " * 20,
+            lat=i % 90,
+            lng=i % 180,
+        )
+        for i in range(1000)
+    )
+    call_command("syncindex", "posts.Post", stdout=StringIO())
+    return Post.objects.order_by("pk")
@@ -0,0 +1,91 @@
+"""
+fakemeili.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains an in-process stand-in for the MeiliSearch HTTP API,
+used to benchmark django-meili without a real search server.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps
+from threading import Thread
+
+from meilisearch.errors import MeilisearchApiError
+
+from django_meili.backends.memory import MemoryBackend
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakeMeiliServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> bytes | None:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else None
+
+    def _send(self, payload, status: int = 200):
+        data = dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self, method: str):
+        try:
+            payload = self.server.backend.request(
+                method, self.path, self._body(), self.headers.get("Content-Type")
+            )
+        except MeilisearchApiError as e:
+            return self._send(
+                {"message": e.message, "code": e.code, "type": e.type, "link": e.link},
+                e.status_code,
+            )
+        # Enqueued tasks are answered with 202 Accepted, like MeiliSearch does.
+        self._send(payload, 202 if isinstance(payload, dict) and "taskUid" in payload else 200)
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PUT(self):
+        self._route("PUT")
+
+    def do_PATCH(self):
+        self._route("PATCH")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+
+class FakeMeiliServer(ThreadingHTTPServer):
+    """A threaded HTTP server answering the MeiliSearch routes from a `MemoryBackend`.
+
+    Example:
+    ```python
+    server = FakeMeiliServer().start()
+    settings.MEILISEARCH = {"HOST": server.host, "PORT": server.port}
+    ```
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.backend = MemoryBackend()
+
+    @property
+    def host(self) -> str:
+        return self.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "FakeMeiliServer":
+        Thread(target=self.serve_forever, daemon=True).start()
+        return self
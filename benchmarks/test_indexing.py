@@ -0,0 +1,23 @@
+"""Benchmarks for the write paths: syncindex and the post_save signal."""
+
+from io import StringIO
+
+from django.core.management import call_command
+
+
+def test_syncindex(benchmark, posts):
+    benchmark.pedantic(
+        call_command,
+        args=("syncindex", "posts.Post"),
+        kwargs={"stdout": StringIO()},
+        rounds=5,
+    )
+    # With --benchmark-disable the command runs once and nothing is timed.
+    if benchmark.stats is not None:
+        benchmark.extra_info["docs_per_sec"] = posts.count() / benchmark.stats["mean"]
+
+
+def test_save_signal_overhead(benchmark, posts):
+    post = posts.first()
+
+    benchmark(post.save)
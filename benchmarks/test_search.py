@@ -0,0 +1,33 @@
+"""Benchmarks for the read paths: filter compilation and search hydration."""
+
+from django_meili.querysets import IndexQuerySet, Radius
+
+
+def test_filter_compilation(benchmark, posts):
+    def compile_filters():
+        return IndexQuerySet(posts.model).filter(
+            Radius(45.0, 90.0, 1000),
+            title="Hello World 1",
+            lat__gte=10,
+            lng__lt=170.5,
+            id__in=[1, 2, 3],
+            lat__range=(0, 45),
+        )
+
+    benchmark(compile_filters)
+
+
+def test_search_hydration(benchmark, posts):
+    def search():
+        return list(IndexQuerySet(posts.model)[0:100].search("Hello"))
+
+    results = benchmark(search)
+    assert len(results) == 100
+
+
+def test_raw_search(benchmark, posts):
+    def search():
+        return IndexQuerySet(posts.model).raw()[0:100].search("Hello")
+
+    results = benchmark(search)
+    assert len(results) == 100
@@ -0,0 +1,16 @@
+"""Benchmarks for turning model instances into MeiliSearch documents."""
+
+from django_meili._batching import AdaptiveBatcher
+
+
+def test_meili_serialize(benchmark, posts):
+    instances = list(posts[:100])
+
+    benchmark(lambda: [post.meili_serialize() for post in instances])
+
+
+def test_batch_encoding(benchmark, posts):
+    documents = [post.meili_serialize() for post in posts]
+    batcher = AdaptiveBatcher(max_bytes=10_485_760, batch_size=1000)
+
+    benchmark(lambda: list(batcher.batches(documents)))
@@ -134,8 +134,27 @@ MEILISEARCH = {
     "PORT": 7700,  # The port for the meilisearch server
     "TIMEOUT": None,  # The timeout to wait for when using sync meilisearch server
     "CLIENT_AGENTS": None,  # The client agents for the meilisearch server
-    "DEBUG": DEBUG,  # Whether to throw exceptions on failed creation of documents
+    "DEBUG": DEBUG,  # Whether to throw exceptions on failed creation of documents, and log every meilisearch call per request
     "SYNC": False,  # Whether to execute operations to meilisearch in a synchronous manner (waiting for each rather than letting the task queue operate)
     "OFFLINE": False,  # Whether to make any http requests for the application.
-    "DEFAULT_BATCH_SIZE": 1000,  # For syncindex the default batch size for import queryset
+    "BACKEND": None,  # What answers requests instead of the meilisearch server: None for the server, "memory", "record", "replay" or a dotted path
+    "BACKEND_OPTIONS": {},  # Keyword arguments the backend is built with, e.g. {"path": "traffic.jsonl"}
+    "DEFAULT_BATCH_SIZE": 1000,  # For syncindex the starting number of documents per batch
+    "BATCH_MAX_BYTES": 10_485_760,  # The largest payload, in bytes, sent in a single batch
+    "BATCH_TARGET_DURATION": 5.0,  # Seconds MeiliSearch should spend per batch; batches grow or shrink towards it (None to disable)
+    "TRACING": False,  # Whether to emit OpenTelemetry spans for every meilisearch call (requires opentelemetry-api)
+    "METRICS": False,  # Whether to record Prometheus metrics for every meilisearch call (requires prometheus-client)
+    "CONTENT_HASHES": False,  # Whether to store a hash of every document so syncindex only sends changed ones
+    "AUTOCOMPLETE_CACHE": "default",  # The cache alias the autocomplete view stores responses in
+    "AUTOCOMPLETE_TIMEOUT": 10,  # Seconds the autocomplete view caches each response for
+    "TENANT_TOKEN_API_KEY": os.getenv("MEILISEARCH_SEARCH_KEY"),  # The search API key tenant tokens are signed with (not the master key)
+    "TENANT_TOKEN_API_KEY_UID": os.getenv("MEILISEARCH_SEARCH_KEY_UID"),  # The uid of that API key
+    "TENANT_TOKEN_TTL": 3600,  # Seconds a tenant token is valid for
+    "CIRCUIT_BREAKER": False,  # Whether to stop calling meilisearch while it fails, falling back for searches and keeping writes in an outbox
+    "CIRCUIT_BREAKER_FAILURE_RATE": 0.5,  # The share of failed or slow requests that opens the circuit breaker
+    "CIRCUIT_BREAKER_SLOW_CALL": 2.0,  # Seconds after which a request counts as failed (None to only count errors)
+    "CIRCUIT_BREAKER_WINDOW": 20,  # The number of latest requests the failure rate is computed over
+    "CIRCUIT_BREAKER_MIN_CALLS": 5,  # The fewest requests in the window before the circuit breaker can open
+    "CIRCUIT_BREAKER_RESET_TIMEOUT": 30.0,  # Seconds the circuit breaker stays open before probing meilisearch again
+    "SEARCH_FALLBACK": "raise",  # What searches do while meilisearch is unavailable: "raise" or "database"
 }
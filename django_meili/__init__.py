@@ -2,6 +2,15 @@
 
 __version__ = "0.0.15"
 
+
+def __getattr__(name):
+    # Imported lazily, since the client can only be created once settings are loaded.
+    if name == "federated_search":
+        from .federation import federated_search
+
+        return federated_search
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # Optional Support for DJP, a Django Plugin System
 # https://djp.readthedocs.io/en/latest/index.html
 try:
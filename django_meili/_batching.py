@@ -0,0 +1,232 @@
+"""
+_batching.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the adaptive document batcher for the Django MeiliSearch app,
+and the requests the management commands send batches and deletes with.
+"""
+
+from collections import deque
+from json import dumps
+from threading import BoundedSemaphore
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from meilisearch.models.task import Task
+from meilisearch.task import TaskInfo
+
+from ._client import client as _client
+from .models import DocumentHash, IndexMixin
+from .signals import documents_indexed
+
+
+class Batch(NamedTuple):
+    """A batch of documents ready to be sent to MeiliSearch.
+
+    The payload is the NDJSON encoding of the documents, so each document
+    is only ever encoded once.
+    """
+
+    documents: list[dict]
+    payload: bytes
+
+
+def encode_document(document: dict) -> bytes:
+    """Encode a single document as one NDJSON line."""
+
+    return dumps(document, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+
+
+def add_batch(Model: type[IndexMixin], index_name: str, batch: Batch) -> TaskInfo:
+    """Add the documents of the given batch in a single request.
+
+    Sends documents_indexed once MeiliSearch accepted the batch.
+    """
+
+    with _client.instrumentation.operation(
+        "add_documents",
+        index_name,
+        documents=len(batch.documents),
+        payload_bytes=len(batch.payload),
+    ) as op:
+        task = _client.get_index(index_name).add_documents_ndjson(batch.payload)
+    documents_indexed.send(
+        sender=Model,
+        index_name=index_name,
+        documents=batch.documents,
+        payload_bytes=len(batch.payload),
+        duration=op.duration,
+        task=task,
+    )
+    return task
+
+
+def delete_documents(index_name: str, ids: list[str], filter: str | None = None) -> TaskInfo:
+    """Delete the documents with the given ids in a single request.
+
+    With a filter, the documents matching it are deleted instead, which is
+    how every chunk of a chunked row is removed.
+    """
+
+    if settings.MEILISEARCH.get("CONTENT_HASHES", False):
+        DocumentHash.objects.forget(index_name, ids)
+    with _client.instrumentation.operation("delete_documents", index_name, documents=len(ids)):
+        index = _client.get_index(index_name)
+        if filter is not None:
+            return index.delete_documents(filter=filter)
+        return index.delete_documents(ids)
+
+
+def task_duration(task: Task) -> float | None:
+    """Return how long MeiliSearch spent processing the task, in seconds."""
+
+    if task.started_at is None or task.finished_at is None:
+        return None
+    return (task.finished_at - task.started_at).total_seconds()
+
+
+class AdaptiveBatcher:
+    """Split a stream of documents into batches bounded by payload size.
+
+    A batch is closed as soon as adding another document would push it past
+    `max_bytes`, or once it holds `batch_size` documents. The document count
+    is adjusted after each finished task: it is halved when MeiliSearch took
+    longer than `target_duration` to process the batch, and doubled when it
+    took less than half of it. The byte limit always wins, so a growing batch
+    size never produces a payload MeiliSearch would reject.
+
+    Example:
+    ```python
+    batcher = AdaptiveBatcher(max_bytes=10_485_760, batch_size=1000, target_duration=5.0)
+    for batch in batcher.batches(documents):
+        task = index.add_documents_ndjson(batch.payload)
+        batcher.record(client.wait_for_task(task.task_uid))
+    ```
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        batch_size: int,
+        target_duration: float | None = None,
+        min_batch_size: int = 1,
+        max_batch_size: int | None = None,
+    ):
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.target_duration = target_duration
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+
+    def __repr__(self):
+        return f"<AdaptiveBatcher batch_size={self.batch_size} max_bytes={self.max_bytes}>"
+
+    def batches(self, documents: Iterable[dict]) -> Iterator[Batch]:
+        """Yield payload-bounded batches from the given documents.
+
+        A single document larger than `max_bytes` is yielded on its own.
+        """
+
+        buffer: list[dict] = []
+        lines: list[bytes] = []
+        size = 0
+        for document in documents:
+            line = encode_document(document)
+            if lines and (
+                size + len(line) + 1 > self.max_bytes or len(lines) >= self.batch_size
+            ):
+                yield Batch(buffer, b"\n".join(lines))
+                buffer, lines, size = [], [], 0
+            buffer.append(document)
+            lines.append(line)
+            size += len(line) + 1
+        if lines:
+            yield Batch(buffer, b"\n".join(lines))
+
+    def record(self, task: Task) -> None:
+        """Adjust the batch size from the processing time of a finished task."""
+
+        duration = task_duration(task)
+        if self.target_duration is None or duration is None:
+            return
+        if duration > self.target_duration:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        elif duration < self.target_duration / 2:
+            self.batch_size = self.batch_size * 2
+            if self.max_batch_size is not None:
+                self.batch_size = min(self.max_batch_size, self.batch_size)
+
+
+class TaskQueue:
+    """The MeiliSearch tasks enqueued by one sync, waited on in order.
+
+    At most `limit` of its tasks are in flight at once. When `shared` is given
+    every task also holds a slot of it until it is waited on, which bounds the
+    tasks in flight across every queue using the same semaphore (e.g. one queue
+    per model synced in its own thread).
+
+    Example:
+    ```python
+    queue = TaskQueue(wait=lambda task: client.wait_for_task(task.task_uid), limit=2)
+    for batch in batcher.batches(documents):
+        queue.submit(lambda: index.add_documents_ndjson(batch.payload))
+    queue.join()
+    ```
+    """
+
+    def __init__(
+        self,
+        wait: Callable[[TaskInfo], None],
+        limit: int,
+        shared: BoundedSemaphore | None = None,
+    ):
+        self.wait = wait
+        self.limit = limit
+        self.shared = shared
+        self.pending: deque[tuple[TaskInfo, Callable[[TaskInfo], None] | None]] = deque()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def submit(
+        self,
+        send: Callable[[], TaskInfo],
+        on_done: Callable[[TaskInfo], None] | None = None,
+    ) -> TaskInfo:
+        """Send a request that enqueues a task, and track the task.
+
+        `on_done` is called with the task once it finished successfully.
+        """
+
+        if self.shared is not None:
+            # A queue only blocks on the shared slots once it holds none of them,
+            # so queues waiting on each other can never deadlock.
+            while not self.shared.acquire(blocking=not self.pending):
+                self.wait_oldest()
+        try:
+            task = send()
+        except BaseException:
+            if self.shared is not None:
+                self.shared.release()
+            raise
+        self.pending.append((task, on_done))
+        while len(self.pending) >= self.limit:
+            self.wait_oldest()
+        return task
+
+    def wait_oldest(self) -> None:
+        task, on_done = self.pending.popleft()
+        try:
+            self.wait(task)
+        finally:
+            if self.shared is not None:
+                self.shared.release()
+        if on_done is not None:
+            on_done(task)
+
+    def join(self) -> None:
+        """Wait on every task still in flight."""
+
+        while self.pending:
+            self.wait_oldest()
@@ -0,0 +1,160 @@
+"""
+_breaker.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the circuit breaker guarding the requests sent to MeiliSearch.
+"""
+
+from collections import deque
+from threading import Lock
+from time import monotonic
+from typing import Callable, Literal, TypeVar
+
+from meilisearch.errors import (
+    MeilisearchApiError,
+    MeilisearchCommunicationError,
+    MeilisearchError,
+    MeilisearchTimeoutError,
+)
+
+from .signals import circuit_state_changed
+
+T = TypeVar("T")
+
+State = Literal["closed", "open", "half_open"]
+
+
+class CircuitOpenError(MeilisearchCommunicationError):
+    """Raised in place of sending a request while the circuit breaker is open."""
+
+
+# The errors meaning MeiliSearch could not answer at all.
+UNAVAILABLE = (MeilisearchCommunicationError, MeilisearchTimeoutError)
+
+
+def is_unavailable(error: BaseException) -> bool:
+    """Whether the error means MeiliSearch is unavailable, which searches and writes degrade on.
+
+    That is when it could not answer, timed out or answered with a 5xx error.
+
+    For example:
+    ```python
+    try:
+        index.search("hello")
+    except MeilisearchError as e:
+        if not is_unavailable(e):
+            raise
+    ```
+    """
+
+    if isinstance(error, MeilisearchApiError):
+        return error.status_code >= 500
+    return isinstance(error, UNAVAILABLE)
+
+
+class CircuitBreaker:
+    """Stops sending requests to MeiliSearch while it is failing or too slow.
+
+    The breaker is closed at first. Over the last `window` requests, it counts
+    the ones that failed (no answer, a timeout or a 5xx error) or took
+    `slow_call` seconds or more. Once `min_calls` requests are in the window and
+    that share reaches `failure_rate`, the breaker opens. While open, every
+    request raises CircuitOpenError at once. After `reset_timeout` seconds it
+    is half-open, and lets a single probe request through: the breaker closes
+    if the probe succeeds, or opens again if it fails.
+
+    For example:
+    ```python
+    breaker = CircuitBreaker(failure_rate=0.5, slow_call=2.0, window=20, min_calls=5, reset_timeout=30)
+    breaker.call(lambda: index.search("hello"))
+    ```
+    """
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        slow_call: float | None = 2.0,
+        window: int = 20,
+        min_calls: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self.failure_rate = failure_rate
+        self.slow_call = slow_call
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.lock = Lock()
+        self.state: State = "closed"
+        # Whether each of the last requests failed, oldest first.
+        self.outcomes: deque[bool] = deque(maxlen=window)
+        self.opened_at = 0.0
+        self.probing = False
+
+    def call(self, function: Callable[[], T], timed: bool = True) -> T:
+        """Call the function unless the breaker is open, recording how it went.
+
+        Unless `timed`, the call only counts as failed when it raises, however long it took.
+        """
+
+        probe = self._admit()
+        started = self.clock()
+        failed = True
+        try:
+            result = function()
+            failed = (
+                timed
+                and self.slow_call is not None
+                and self.clock() - started >= self.slow_call
+            )
+            return result
+        except MeilisearchError as e:
+            # When MeiliSearch answered, only its own errors count against it.
+            failed = is_unavailable(e)
+            raise
+        except BaseException:
+            failed = False
+            raise
+        finally:
+            self._record(failed, probe)
+
+    def _admit(self) -> bool:
+        """Let a request through, returning whether it is the half-open probe."""
+
+        with self.lock:
+            if self.state == "open":
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError("The circuit breaker is open")
+                self._set_state("half_open")
+            if self.state == "half_open":
+                if self.probing:
+                    raise CircuitOpenError("The circuit breaker is probing MeiliSearch")
+                self.probing = True
+                return True
+            return False
+
+    def _record(self, failed: bool, probe: bool):
+        with self.lock:
+            if probe:
+                self.probing = False
+                if failed:
+                    self._open()
+                else:
+                    self.outcomes.clear()
+                    self._set_state("closed")
+            elif self.state == "closed":
+                self.outcomes.append(failed)
+                if (
+                    len(self.outcomes) >= self.min_calls
+                    and sum(self.outcomes) / len(self.outcomes) >= self.failure_rate
+                ):
+                    self._open()
+
+    def _open(self):
+        self.opened_at = self.clock()
+        self._set_state("open")
+
+    def _set_state(self, state: State):
+        previous, self.state = self.state, state
+        if previous != state:
+            circuit_state_changed.send(sender=self.__class__, state=state, previous=previous)
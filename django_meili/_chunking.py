@@ -0,0 +1,90 @@
+"""
+_chunking.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains helpers to split large text fields across several documents.
+"""
+
+from json import dumps
+from typing import Iterable
+
+# The attributes every document of a model with chunk_fields carries.
+PARENT = "_parent"
+CHUNK = "_chunk"
+CHUNKS = "_chunks"
+
+_WHITESPACE = " \n\t"
+
+
+def split_text(text: str, size: int) -> list[str]:
+    """Split text into pieces of at most `size` characters.
+
+    Pieces end after the last whitespace that fits, unless that would make
+    the piece less than half the size, so words are rarely cut in two.
+    Joining the pieces gives back the original text.
+
+    For example:
+    ```python
+    split_text("hello big world", 10)  # ["hello big ", "world"]
+    ```
+    """
+
+    pieces = []
+    while len(text) > size:
+        cut = max(text.rfind(char, 0, size) for char in _WHITESPACE) + 1
+        if cut <= size // 2:
+            cut = size
+        pieces.append(text[:cut])
+        text = text[cut:]
+    pieces.append(text)
+    return pieces
+
+
+def parent_id(document: dict) -> str:
+    """Return the id of the row the document was built from."""
+
+    return document.get(PARENT, document["id"])
+
+
+def row_pk(document: dict, primary_key: str) -> str:
+    """Return the pk of the row the document was built from."""
+
+    # When the index is keyed by "pk", the chunks after the first overwrite it.
+    if primary_key == "pk" and PARENT in document:
+        return document[PARENT]
+    return document["pk"]
+
+
+def is_last_chunk(document: dict) -> bool:
+    """Whether the document is the last of its row's documents."""
+
+    return document.get(CHUNK, 0) == document.get(CHUNKS, 1) - 1
+
+
+def chunk_filter(parents: Iterable[str] = (), counts: dict[str, int] | None = None) -> str:
+    """Build a filter matching the documents to delete for chunked rows.
+
+    Every document of the rows in `parents` is matched, as are the documents
+    of the rows in `counts` past their current number of chunks, which are
+    left over from when the row's text was longer.
+
+    For example:
+    ```python
+    chunk_filter(["1"], {"2": 3})  # '_parent IN ["1"] OR (_parent IN ["2"] AND _chunk >= 3)'
+    ```
+    """
+
+    clauses = []
+    parents = list(parents)
+    if parents:
+        clauses.append(f"{PARENT} IN {_values(parents)}")
+    by_count: dict[int, list[str]] = {}
+    for id, count in (counts or {}).items():
+        by_count.setdefault(count, []).append(id)
+    for count, ids in by_count.items():
+        clauses.append(f"({PARENT} IN {_values(ids)} AND {CHUNK} >= {count})")
+    return " OR ".join(clauses)
+
+
+def _values(ids: Iterable[str]) -> str:
+    return "[" + ", ".join(dumps(str(id)) for id in ids) + "]"
@@ -5,13 +5,115 @@ Ian Kollipara <ian.kollipara@gmail.com>
 This module contains the MeiliSearch client for the Django MeiliSearch app.
 """
 
-from typing import Self
-
+import re
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from json import dumps, loads
+from threading import Lock
+from typing import Any, Iterable, Self
+
+from django.core.exceptions import ImproperlyConfigured
+from meilisearch._httprequests import HttpRequests
 from meilisearch.client import Client as _Client
+from meilisearch.config import Config
 from meilisearch.models.task import Task
 from meilisearch.task import TaskInfo
 
+from ._breaker import CircuitBreaker
+from ._instrumentation import Instrumentation
 from ._settings import _DjangoMeiliSettings
+from .backends import Backend, get_backend
+from .signals import task_failed
+
+
+class TenantTokens:
+    """Mints MeiliSearch tenant tokens locally and caches them until they near expiry.
+
+    A token is signed with a search API key, never the master key, and is reused
+    while at least half of its lifetime is left, so a token handed to a browser
+    always stays valid for a while.
+    """
+
+    # The most distinct sets of search rules kept, least recently used first out.
+    max_tokens = 10_000
+
+    def __init__(self, client: _Client, api_key: str | None, api_key_uid: str | None, ttl: int):
+        self.client = client
+        self.api_key = api_key
+        self.api_key_uid = api_key_uid
+        self.ttl = ttl
+        self.lock = Lock()
+        self.tokens: OrderedDict[str, tuple[str, datetime]] = OrderedDict()
+
+    def get(self, search_rules: dict[str, Any], ttl: int | None = None) -> str:
+        if self.api_key is None or self.api_key_uid is None:
+            raise ImproperlyConfigured(
+                "Tenant tokens require MEILISEARCH['TENANT_TOKEN_API_KEY'] and "
+                "MEILISEARCH['TENANT_TOKEN_API_KEY_UID']"
+            )
+        ttl = self.ttl if ttl is None else ttl
+        key = dumps([search_rules, ttl], sort_keys=True, default=str)
+        now = datetime.now(timezone.utc)
+        with self.lock:
+            cached = self.tokens.get(key)
+            if cached is not None and cached[1] - now > timedelta(seconds=ttl / 2):
+                self.tokens.move_to_end(key)
+                return cached[0]
+        expires_at = now + timedelta(seconds=ttl)
+        token = self.client.generate_tenant_token(
+            self.api_key_uid, search_rules, expires_at=expires_at, api_key=self.api_key
+        )
+        with self.lock:
+            self.tokens[key] = (token, expires_at)
+            self.tokens.move_to_end(key)
+            if len(self.tokens) > self.max_tokens:
+                self.tokens.popitem(last=False)
+        return token
+
+
+# Document uploads take as long as their payload, and tasks are polled until
+# they finish, so the circuit breaker does not count these requests as slow.
+_UNTIMED_PATH = re.compile(r"(indexes/[^/]+/documents|tasks)\b")
+
+
+class _Http(HttpRequests):
+    """Sends the client's requests to MeiliSearch, or to the backend set in its place.
+
+    One instance is shared by the client, its task handler and every index it
+    hands out, so setting `backend` redirects all of them at once, and the
+    `breaker` set on it guards all of them.
+
+    HttpRequests is private to meilisearch-python, which is why the dependency
+    is capped below the next release; a test checks that `send_request` still
+    has the signature overridden here.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        backend: Backend | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
+        super().__init__(config)
+        self.backend = backend
+        self.breaker = breaker
+
+    def send_request(self, http_method, path, body=None, content_type=None, *, serializer=None):
+        if self.breaker is None:
+            return self._send(http_method, path, body, content_type, serializer)
+        return self.breaker.call(
+            lambda: self._send(http_method, path, body, content_type, serializer),
+            timed=not _UNTIMED_PATH.match(path),
+        )
+
+    def _send(self, http_method, path, body, content_type, serializer):
+        if self.backend is None:
+            return super().send_request(
+                http_method, path, body, content_type, serializer=serializer
+            )
+        if serializer is not None and not isinstance(body, bytes):
+            body = loads(dumps(body, cls=serializer))
+        return self.backend.request(http_method.__name__.upper(), path, body, content_type)
 
 
 class Client:
@@ -29,8 +131,128 @@ class Client:
             timeout=settings.timeout,
             client_agents=settings.client_agents,
         )
+        self.http = _Http(
+            self.client.config,
+            get_backend(settings.backend, self.client.config, settings.backend_options),
+            CircuitBreaker(
+                settings.circuit_breaker_failure_rate,
+                settings.circuit_breaker_slow_call,
+                settings.circuit_breaker_window,
+                settings.circuit_breaker_min_calls,
+                settings.circuit_breaker_reset_timeout,
+            )
+            if settings.circuit_breaker
+            else None,
+        )
+        self.client.http = self.client.task_handler.http = self.http
         self.is_sync = settings.sync
         self.tasks = []
+        # The routed indexes already created, with the model whose settings they have.
+        self.known_indexes: dict[str, type] = {}
+        self.instrumentation = Instrumentation(
+            settings.tracing, settings.metrics, settings.debug
+        )
+        self.tenant_tokens = TenantTokens(
+            self.client,
+            settings.tenant_token_api_key,
+            settings.tenant_token_api_key_uid,
+            settings.tenant_token_ttl,
+        )
+
+    @property
+    def backend(self) -> Backend | None:
+        """The backend answering requests in place of MeiliSearch, if any.
+
+        Set by `MEILISEARCH["BACKEND"]`, and replaceable at runtime, e.g. by
+        `django_meili.test.MemoryBackendMixin`.
+        """
+
+        return self.http.backend
+
+    @backend.setter
+    def backend(self, backend: Backend | None):
+        self.http.backend = backend
+
+    @property
+    def breaker(self) -> CircuitBreaker | None:
+        """The circuit breaker guarding requests, when `MEILISEARCH["CIRCUIT_BREAKER"]` is on.
+
+        While it is open, requests raise `CircuitOpenError` without being sent,
+        searches fall back per `MEILISEARCH["SEARCH_FALLBACK"]`, and writes are
+        kept in the outbox for `manage.py replayoutbox`.
+        """
+
+        return self.http.breaker
+
+    @breaker.setter
+    def breaker(self, breaker: CircuitBreaker | None):
+        self.http.breaker = breaker
+
+    @property
+    def queries(self) -> list[dict]:
+        """The MeiliSearch operations logged for the current request.
+
+        Only populated while `MEILISEARCH["DEBUG"]` is on, like `connection.queries`.
+        """
+
+        return list(self.instrumentation.log.queries)
+
+    def tenant_token(self, search_rules: dict[str, Any], ttl: int | None = None) -> str:
+        """Get a tenant token for the given search rules, without a network request.
+
+        Tokens are cached per set of rules and reused while at least half of their
+        lifetime is left. They expire after `ttl` seconds, by default
+        `MEILISEARCH["TENANT_TOKEN_TTL"]`.
+
+        For example:
+        ```python
+        client.tenant_token({"posts": {"filter": "organization_id = 5"}})
+        ```
+        """
+
+        return self.tenant_tokens.get(search_rules, ttl)
+
+    def tenant_token_for(
+        self, tenant: Any, *models, unrestricted: Iterable = (), ttl: int | None = None
+    ) -> str:
+        """Get a tenant token restricting each model's index to the tenant's documents.
+
+        Each model's `MeiliMeta.tenant_field` must equal the tenant, and a model
+        without a tenant_field raises ImproperlyConfigured. The models whose index
+        the token may search in full are listed in `unrestricted` instead. A model
+        overriding `meili_index_name` is given as a (model, index_name) pair, naming
+        the routed index the token is for.
+
+        For example:
+        ```python
+        token = client.tenant_token_for(request.user.organization_id, Post, Comment, unrestricted=[Tag])
+        token = client.tenant_token_for(organization.pk, (Note, f"notes_{organization.pk}"))
+        ```
+        """
+
+        search_rules = {self._token_index(model)[1]: {} for model in unrestricted}
+        for model in models:
+            model, index_name = self._token_index(model)
+            tenant_field = model._meilisearch["tenant_field"]
+            if tenant_field is None:
+                raise ImproperlyConfigured(
+                    f"{model._meta.label} has no tenant_field, so the token would let every "
+                    "document be searched; list it in unrestricted if that is intended"
+                )
+            search_rules[index_name] = {"filter": f"{tenant_field} = {dumps(str(tenant))}"}
+        return self.tenant_token(search_rules, ttl)
+
+    def _token_index(self, model) -> tuple[type, str]:
+        """Return the model and index a tenant token is for, from a model or (model, index_name)."""
+
+        if isinstance(model, tuple):
+            return model
+        if model._meilisearch["routed"]:
+            raise ImproperlyConfigured(
+                f"{model._meta.label} routes documents to several indexes, "
+                "so give it as a (model, index_name) pair"
+            )
+        return model, model._meilisearch["index_name"]
 
     def flush_tasks(self):
         """Flush all currently stored tasks."""
@@ -44,6 +266,8 @@ class Client:
         searchable_fields: list[str] | None = None,
         filterable_fields: list[str] | None = None,
         sortable_fields: list[str] | None = None,
+        distinct_attribute: str | None = None,
+        embedders: dict[str, dict] | None = None,
     ):
         """Create a new index with the given settings.
 
@@ -56,23 +280,26 @@ class Client:
             searchable_fields (list[str] | None): The fields to search on.
             filterable_fields (list[str] | None): The fields to filter on.
             sortable_fields (list[str] | None): The fields to sort on.
+            distinct_attribute (str | None): The attribute search results are deduplicated on.
+            embedders (dict[str, dict] | None): The embedders to generate vectors with, by name.
 
         Returns:
             Self: The client object.
         """
 
-        self.tasks.append(
-            self._handle_sync(
-                self.client.index(index_name).update_settings(
-                    {
-                        "displayedAttributes": displayed_fields or ["*"],
-                        "searchableAttributes": searchable_fields or ["*"],
-                        "filterableAttributes": filterable_fields or [],
-                        "sortableAttributes": sortable_fields or [],
-                    }
-                )
+        with self.instrumentation.operation("update_settings", index_name):
+            task = self.get_index(index_name).update_settings(
+                {
+                    "displayedAttributes": displayed_fields or ["*"],
+                    "searchableAttributes": searchable_fields or ["*"],
+                    "filterableAttributes": filterable_fields or [],
+                    "sortableAttributes": sortable_fields or [],
+                    "distinctAttribute": distinct_attribute,
+                }
+                # Only sent when configured, as servers before 1.6 reject the setting.
+                | ({"embedders": embedders} if embedders else {})
             )
-        )
+        self.tasks.append(self._handle_sync(task))
         return self
 
     def create_index(self, index_name: str, primary_key: str):
@@ -86,11 +313,16 @@ class Client:
             dict: The response from the MeiliSearch server.
         """
         if index_name not in [i.uid for i in self.get_indexes()]:
-            self.tasks.append(
-                self._handle_sync(
-                    self.client.create_index(index_name, {"primaryKey": primary_key})
+            with self.instrumentation.operation("create_index", index_name):
+                # Sent through the client's own requests rather than `Index.create`,
+                # which makes its own.
+                task = TaskInfo(
+                    **self.http.post(
+                        self.client.config.paths.index,
+                        {"uid": index_name, "primaryKey": primary_key},
+                    )
                 )
-            )
+            self.tasks.append(self._handle_sync(task))
         return self
 
     def get_index(self, index_name: str):
@@ -103,35 +335,50 @@ class Client:
             Index: The index with the given name.
         """
 
-        return self.client.index(index_name)
+        index = self.client.index(index_name)
+        index.http = index.task_handler.http = self.http
+        return index
 
-    def wait_for_task(self, task_uid: str) -> Task | TaskInfo:
+    def wait_for_task(self, task_uid: str) -> Task:
         """Wait for a task to finish.
 
+        Failed tasks are reported through the `task_failed` signal and
+        the task failure metric, but are returned rather than raised.
+
         Args:
             task_uid (str): The UID of the task to wait for.
 
         Returns:
-            Task | TaskInfo: The task object.
+            Task: The finished task object.
         """
 
-        task = self.client.wait_for_task(task_uid)
-        return self._handle_sync(task)
+        with self.instrumentation.operation("wait_for_task"):
+            task = self.client.wait_for_task(task_uid)
+        if task.status == "failed":
+            self.instrumentation.task_failed(task.index_uid, task.type)
+            task_failed.send(sender=self.__class__, index_name=task.index_uid, task=task)
+        return task
 
     def get_indexes(self):
-        """Get all indexes.
+        """Get all indexes, reading them a page at a time.
 
         Returns:
             list[Index]: A list of all indexes.
         """
 
-        return self.client.get_indexes()["results"]
+        indexes = []
+        with self.instrumentation.operation("get_indexes"):
+            while True:
+                page = self.client.get_indexes({"offset": len(indexes), "limit": 1000})
+                indexes += page["results"]
+                if not page["results"] or len(indexes) >= page["total"]:
+                    return indexes
 
     def update_display(self, index_name: str, attributes: dict | None) -> Self:
         if attributes is None:
             return self
         self._handle_sync(
-            self.client.index(index_name).update_displayed_attributes(attributes)
+            self.get_index(index_name).update_displayed_attributes(attributes)
         )
         return self
 
@@ -139,7 +386,7 @@ class Client:
         if attributes is None:
             return self
         self._handle_sync(
-            self.client.index(index_name).update_searchable_attributes(attributes)
+            self.get_index(index_name).update_searchable_attributes(attributes)
         )
         return self
 
@@ -147,7 +394,7 @@ class Client:
         if attributes is None:
             return self
         self._handle_sync(
-            self.client.index(index_name).update_filterable_attributes(attributes)
+            self.get_index(index_name).update_filterable_attributes(attributes)
         )
         return self
 
@@ -155,7 +402,7 @@ class Client:
         if attributes is None:
             return self
         self._handle_sync(
-            self.client.index(index_name).update_sortable_attributes(attributes)
+            self.get_index(index_name).update_sortable_attributes(attributes)
         )
         return self
 
@@ -163,7 +410,7 @@ class Client:
         """Handle the sync task."""
 
         if self.is_sync:
-            task = self.client.wait_for_task(task.task_uid)
+            task = self.wait_for_task(task.task_uid)
             if task.status == "failed":
                 raise Exception(task.error)
         return task
@@ -0,0 +1,158 @@
+"""
+_consistency.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains helpers to compare a MeiliSearch index against the database.
+"""
+
+from hashlib import blake2b
+from itertools import islice
+from json import dumps
+from typing import TYPE_CHECKING, Iterable, Iterator, NamedTuple, Type
+
+from django.core.serializers.json import DjangoJSONEncoder
+from meilisearch.index import Index
+
+from ._chunking import PARENT
+
+if TYPE_CHECKING:
+    from .models import IndexMixin
+
+
+def index_document_ids(
+    index: Index, primary_key: str, page_size: int
+) -> Iterator[list[tuple[str, str]]]:
+    """Yield the id and parent id of every document in the index, a page at a time.
+
+    The parent id is the id of the row a chunk was split from, or the
+    document's own id when the model has no chunk_fields.
+    """
+
+    offset = 0
+    while True:
+        page = index.get_documents(
+            {"fields": [primary_key, PARENT], "offset": offset, "limit": page_size}
+        )
+        if not page.results:
+            return
+        yield [
+            (
+                str(getattr(document, primary_key)),
+                str(getattr(document, PARENT, getattr(document, primary_key))),
+            )
+            for document in page.results
+        ]
+        offset += len(page.results)
+        if offset >= page.total:
+            return
+
+
+def orphaned_ids(
+    model: Type["IndexMixin"], index: Index, page_size: int
+) -> Iterator[list[str]]:
+    """Yield the ids of documents whose rows no longer exist, a page at a time.
+
+    The index is streamed page by page and each page is looked up in the database
+    with a single `pk__in` query, so memory stays bounded by the page size.
+    """
+
+    codec = model._meili_pk_codec()
+    for ids in index_document_ids(index, model._meilisearch["primary_key"], page_size):
+        parents = dict(zip(ids, codec.to_python(parent for _, parent in ids)))
+        existing = set(
+            model._base_manager.filter(
+                **{f"{codec.lookup}__in": set(parents.values())}
+            ).values_list(codec.lookup, flat=True)
+        )
+        missing = [id for (id, _), value in parents.items() if value not in existing]
+        if missing:
+            yield missing
+
+
+class RowComparison(NamedTuple):
+    """How a chunk of database rows differs from the index.
+
+    - missing: documents of rows that have no document in the index.
+    - stale: documents of rows whose indexed document has different content.
+
+    For a model with chunk_fields, missing and stale hold every chunk of the row,
+    and only the first chunk is compared.
+    - extra: ids of rows that fail meili_filter but still have a document.
+    """
+
+    missing: list[dict]
+    stale: list[dict]
+    extra: list[str]
+
+
+def content_hash(document: dict, fields: Iterable[str] | None = None) -> str:
+    """Hash a document's content, independent of key order.
+
+    When `fields` is given only those keys are hashed, so that a document
+    read back through `displayedAttributes` can be compared to the full one.
+    A stored `_hash` attribute is never part of the content.
+    """
+
+    document = {
+        key: value
+        for key, value in document.items()
+        if key != "_hash" and (fields is None or key in fields)
+    }
+    encoded = dumps(
+        document, cls=DjangoJSONEncoder, sort_keys=True, separators=(",", ":")
+    )
+    return blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+
+def compare_rows(
+    model: Type["IndexMixin"],
+    index: Index,
+    page_size: int,
+    compare_content: bool = False,
+) -> Iterator[RowComparison]:
+    """Compare the database against the index, a chunk of rows at a time.
+
+    Rows are streamed in pk order and each chunk is fetched from the index by
+    id in a single request, so memory stays bounded by the page size whatever
+    order the index stores its documents in. With `compare_content`, whole
+    documents are fetched and compared by `content_hash`; otherwise only
+    presence is checked. Documents without a row are found by `orphaned_ids`.
+
+    Fetching documents by id requires MeiliSearch 1.14 or newer.
+    """
+
+    primary_key = model._meilisearch["primary_key"]
+    displayed = model._meilisearch["displayed_fields"]
+    fields = (
+        None
+        if displayed is None or "*" in displayed
+        else [primary_key, *displayed]
+    )
+    rows = model._base_manager.order_by("pk").iterator(chunk_size=page_size)
+    while chunk := list(islice(rows, page_size)):
+        expected: dict[str, list[dict]] = {}
+        filtered_out: list[str] = []
+        for instance in chunk:
+            if instance.meili_filter():
+                expected[instance._meili_document_id()] = list(instance._meili_documents())
+            else:
+                filtered_out.append(instance._meili_document_id())
+        ids = [*expected, *filtered_out]
+        page = index.get_documents(
+            {
+                "ids": ids,
+                "limit": len(ids),
+                "fields": fields if compare_content else [primary_key],
+            }
+        )
+        found = {str(getattr(document, primary_key)): document for document in page.results}
+        comparison = RowComparison([], [], [])
+        for id, documents in expected.items():
+            if id not in found:
+                comparison.missing.extend(documents)
+            elif compare_content and content_hash(documents[0], fields) != content_hash(
+                dict(found[id]), fields
+            ):
+                comparison.stale.extend(documents)
+        comparison.extra.extend(id for id in filtered_out if id in found)
+        yield comparison
@@ -0,0 +1,93 @@
+"""
+_hits.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the typed hit objects returned by raw searches.
+"""
+
+from dataclasses import field, fields, make_dataclass
+from keyword import iskeyword
+from typing import TYPE_CHECKING, Any, Type
+
+if TYPE_CHECKING:
+    from .models import IndexMixin
+
+
+class Hit:
+    """Base class of the hit classes generated for each model.
+
+    Every displayed field is a slot on the generated class, so a page of hits
+    holds no per-hit dictionary of field names. The attributes MeiliSearch adds
+    to a hit (`_formatted`, `_matchesPosition`, `_rankingScore`, `_geoDistance`, ...) are kept
+    together and only looked up when one of the properties below is read.
+    """
+
+    __slots__ = ()
+
+    _meili: dict | None
+
+    @property
+    def formatted(self) -> dict | None:
+        """The highlighted and cropped fields, when requested."""
+
+        return self._extra("_formatted")
+
+    @property
+    def matches_position(self) -> dict | None:
+        """Where the query matched in each field, when requested."""
+
+        return self._extra("_matchesPosition")
+
+    @property
+    def ranking_score(self) -> float | None:
+        """The ranking score of the hit, when requested."""
+
+        return self._extra("_rankingScore")
+
+    @property
+    def geo_distance(self) -> int | None:
+        """The distance in meters to the point sorted by, when sorting by geoPoint."""
+
+        return self._extra("_geoDistance")
+
+    def _extra(self, name: str) -> Any:
+        return self._meili.get(name) if self._meili is not None else None
+
+    @classmethod
+    def from_hit(cls, hit: dict) -> "Hit":
+        """Build a hit object from a hit returned by MeiliSearch."""
+
+        extra = {key: value for key, value in hit.items() if key.startswith("_")}
+        return cls(
+            *(hit.get(name) for name in cls._meili_fields),
+            _meili=extra or None,
+        )
+
+
+def make_hit_class(model: Type["IndexMixin"]) -> type[Hit]:
+    """Generate the hit class of a model from its displayed fields.
+
+    Without displayed_fields, the id, pk, searchable and filterable fields are
+    used. Fields that aren't valid attribute names, or that start with an
+    underscore, are left out.
+    """
+
+    meili = model._meilisearch
+    displayed = meili["displayed_fields"]
+    if displayed is None or "*" in displayed:
+        displayed = ["pk", *(meili["searchable_fields"] or []), *(meili["filterable_fields"] or [])]
+    names = [
+        name
+        for name in dict.fromkeys(["id", *displayed])
+        if name.isidentifier() and not iskeyword(name) and not name.startswith("_")
+    ]
+    cls = make_dataclass(
+        f"{model.__name__}Hit",
+        [(name, Any, field(default=None)) for name in names]
+        + [("_meili", dict | None, field(default=None, repr=False, compare=False))],
+        bases=(Hit,),
+        slots=True,
+    )
+    cls._meili_fields = tuple(f.name for f in fields(cls) if f.name != "_meili")
+    cls.__module__ = model.__module__
+    return cls
@@ -0,0 +1,210 @@
+"""
+_instrumentation.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the optional tracing and metrics support for the Django MeiliSearch app.
+"""
+
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import cache
+from threading import local
+from time import perf_counter
+from typing import Any, Iterator
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    from opentelemetry import trace
+except (ImportError, ModuleNotFoundError):
+    trace = None
+
+try:
+    import prometheus_client
+except (ImportError, ModuleNotFoundError):
+    prometheus_client = None
+
+
+class Observation:
+    """The measurements taken for a single MeiliSearch operation."""
+
+    __slots__ = ("operation", "index_name", "attributes", "started", "duration")
+
+    def __init__(self, operation: str, index_name: str | None, attributes: dict):
+        self.operation = operation
+        self.index_name = index_name
+        self.attributes = attributes
+        self.started = perf_counter()
+        self.duration = 0.0
+
+    def set(self, **attributes: Any) -> None:
+        """Record extra measurements, e.g. hits or payload_bytes."""
+
+        self.attributes.update(attributes)
+
+
+class QueryLog(local):
+    """A per-thread log of MeiliSearch operations, like `connection.queries`.
+
+    Operations are logged while `MEILISEARCH["DEBUG"]` is on, or while
+    something (a test helper, the debug toolbar panel) has forced capturing.
+    The log is cleared at the start of every request.
+    """
+
+    # The same bound Django uses for `connection.queries_log`.
+    max_entries = 9000
+
+    def __init__(self, debug: bool = False):
+        self.debug = debug
+        self.forced = 0
+        self.queries: deque[dict] = deque(maxlen=self.max_entries)
+        # How many operations were ever logged, which neither clearing nor the bound resets.
+        self.count = 0
+
+    @property
+    def active(self) -> bool:
+        return self.debug or self.forced > 0
+
+    def append(self, observation: Observation) -> None:
+        self.queries.append(
+            {
+                "operation": observation.operation,
+                "index": observation.index_name,
+                "duration": observation.duration,
+            }
+            | observation.attributes
+        )
+        self.count += 1
+
+    def since(self, count: int) -> list[dict]:
+        """The operations logged since `count` was read, as far as the log still holds them."""
+
+        logged = min(self.count - count, len(self.queries))
+        return list(self.queries)[len(self.queries) - logged :]
+
+    def reset(self, **kwargs) -> None:
+        """Clear the log. Connected to `request_started`."""
+
+        self.queries.clear()
+
+
+@cache
+def _metrics() -> dict:
+    """Create the Prometheus collectors once per process."""
+
+    labels = ["operation", "index"]
+    return {
+        "requests": prometheus_client.Counter(
+            "django_meili_requests_total",
+            "MeiliSearch operations performed.",
+            labels + ["outcome"],
+        ),
+        "latency": prometheus_client.Histogram(
+            "django_meili_request_duration_seconds",
+            "Time spent in MeiliSearch operations.",
+            labels,
+        ),
+        "payload_bytes": prometheus_client.Histogram(
+            "django_meili_payload_bytes",
+            "Size of document payloads sent to MeiliSearch.",
+            labels,
+            buckets=(1e3, 1e4, 1e5, 1e6, 1e7, 1e8),
+        ),
+        "hits": prometheus_client.Histogram(
+            "django_meili_search_hits",
+            "Hits returned per search.",
+            labels,
+            buckets=(0, 1, 5, 10, 20, 50, 100, 1000),
+        ),
+        "task_failures": prometheus_client.Counter(
+            "django_meili_task_failures_total",
+            "MeiliSearch tasks that finished with a failed status.",
+            ["index", "type"],
+        ),
+    }
+
+
+class Instrumentation:
+    """Records timings, counters and spans for MeiliSearch operations.
+
+    Tracing uses OpenTelemetry and metrics use prometheus_client, both of which
+    are optional, and every operation is added to the query log while it is
+    active. When all three are off an operation only costs two calls to
+    `perf_counter`, which the signals in `django_meili.signals` rely on.
+    """
+
+    def __init__(self, tracing: bool = False, metrics: bool = False, debug: bool = False):
+        if tracing and trace is None:
+            raise ImproperlyConfigured(
+                "MEILISEARCH['TRACING'] requires the opentelemetry-api package"
+            )
+        if metrics and prometheus_client is None:
+            raise ImproperlyConfigured(
+                "MEILISEARCH['METRICS'] requires the prometheus-client package"
+            )
+        self.tracer = trace.get_tracer("django_meili") if tracing else None
+        self.metrics = _metrics() if metrics else None
+        self.log = QueryLog(debug)
+
+    @property
+    def enabled(self) -> bool:
+        return self.tracer is not None or self.metrics is not None or self.log.active
+
+    @contextmanager
+    def operation(
+        self, name: str, index_name: str | None = None, **attributes: Any
+    ) -> Iterator[Observation]:
+        """Measure a single operation.
+
+        Example:
+        ```python
+        with client.instrumentation.operation("search", "posts") as op:
+            results = index.search(q)
+            op.set(hits=len(results["hits"]))
+        ```
+        """
+
+        observation = Observation(name, index_name, attributes)
+        span = (
+            self.tracer.start_as_current_span(f"meilisearch.{name}")
+            if self.tracer is not None
+            else nullcontext()
+        )
+        outcome = "error"
+        with span as current:
+            try:
+                yield observation
+                outcome = "ok"
+            finally:
+                observation.duration = perf_counter() - observation.started
+                if current is not None:
+                    current.set_attributes(self._span_attributes(observation))
+                if self.metrics is not None:
+                    self._record(observation, outcome)
+                if self.log.active:
+                    self.log.append(observation)
+
+    def task_failed(self, index_name: str | None, task_type: str) -> None:
+        """Count a MeiliSearch task that finished with a failed status."""
+
+        if self.metrics is not None:
+            self.metrics["task_failures"].labels(index_name or "", task_type).inc()
+
+    @staticmethod
+    def _span_attributes(observation: Observation) -> dict:
+        attributes = {
+            f"meilisearch.{key}": value
+            for key, value in observation.attributes.items()
+            if isinstance(value, (str, bool, int, float))
+        }
+        if observation.index_name is not None:
+            attributes["meilisearch.index"] = observation.index_name
+        return attributes
+
+    def _record(self, observation: Observation, outcome: str) -> None:
+        labels = (observation.operation, observation.index_name or "")
+        self.metrics["requests"].labels(*labels, outcome).inc()
+        self.metrics["latency"].labels(*labels).observe(observation.duration)
+        for key in ("payload_bytes", "hits"):
+            if observation.attributes.get(key) is not None:
+                self.metrics[key].labels(*labels).observe(observation.attributes[key])
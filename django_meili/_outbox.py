@@ -0,0 +1,93 @@
+"""
+_outbox.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the replay of the writes diverted while MeiliSearch was unavailable.
+"""
+
+from collections import Counter
+from itertools import groupby
+
+from django.apps import apps
+from django.conf import settings
+
+from ._batching import encode_document
+from ._chunking import chunk_filter
+from ._client import client
+from .models import DocumentHash, IndexMixin, PendingWrite
+
+DEFAULT_BATCH_SIZE = 100
+
+
+def replay_outbox(batch_size: int = DEFAULT_BATCH_SIZE) -> Counter:
+    """Send the diverted writes to MeiliSearch, oldest first, returning how many were indexed and deleted.
+
+    Each write is replayed from the row as it is now: rows that still exist and
+    pass meili_filter are indexed whole, and the documents of the others are
+    deleted. A write is only dropped from the outbox once MeiliSearch finished
+    it, and is kept if the document was written again in the meantime. Errors,
+    including the circuit breaker still being open, are raised with the
+    remaining writes left in the outbox.
+
+    For example:
+    ```python
+    replay_outbox()  # Counter({"indexed": 12, "deleted": 3})
+    ```
+    """
+
+    stats = Counter()
+    while writes := list(PendingWrite.objects.order_by("updated_at", "pk")[:batch_size]):
+        writes.sort(key=lambda write: (write.model, write.index_name))
+        for (label, index_name), group in groupby(
+            writes, key=lambda write: (write.model, write.index_name)
+        ):
+            group = list(group)
+            stats += _replay(apps.get_model(label), index_name, group)
+            PendingWrite.objects.settle(group)
+    return stats
+
+
+def _replay(Model: type[IndexMixin], index_name: str, writes: list[PendingWrite]) -> Counter:
+    """Replay the writes of one model to one index, and wait for MeiliSearch to finish them."""
+
+    codec = Model._meili_pk_codec()
+    ids = [write.document_id for write in writes]
+    rows = Model._default_manager.filter(**{f"{codec.lookup}__in": codec.to_python(ids)})
+    instances = [instance for instance in rows if instance.meili_filter()]
+    indexed = {instance._meili_document_id() for instance in instances}
+    deleted = [id for id in ids if id not in indexed]
+    chunked = bool(Model._meilisearch["chunk_fields"])
+
+    Model._meili_ensure_index(index_name)
+    index = client.get_index(index_name)
+    tasks = []
+    counts = {}
+    if instances:
+        vectors = Model._meili_vectors(instances)
+        documents = []
+        for instance, row_vectors in zip(instances, vectors):
+            row = list(instance._meili_documents(row_vectors))
+            counts[instance._meili_document_id()] = len(row)
+            documents.extend(row)
+        payload = b"\n".join(encode_document(document) for document in documents)
+        with client.instrumentation.operation(
+            "add_documents", index_name, documents=len(documents), payload_bytes=len(payload)
+        ):
+            tasks.append(index.add_documents_ndjson(payload))
+    if deleted or (chunked and counts):
+        with client.instrumentation.operation(
+            "delete_documents", index_name, documents=len(deleted)
+        ):
+            # For chunked rows, the chunks left over from longer text go too.
+            tasks.append(
+                index.delete_documents(filter=chunk_filter(deleted, counts))
+                if chunked
+                else index.delete_documents(deleted)
+            )
+    for task in tasks:
+        finished = client.wait_for_task(task.task_uid)
+        if finished.status == "failed":
+            raise Exception(finished)
+    if settings.MEILISEARCH.get("CONTENT_HASHES", False):
+        DocumentHash.objects.forget(index_name, ids)
+    return Counter(indexed=len(instances), deleted=len(deleted))
@@ -0,0 +1,85 @@
+"""
+_pk.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the conversion between primary keys and document ids.
+"""
+
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Type
+from uuid import UUID
+
+from django.db import models
+
+if TYPE_CHECKING:
+    from .models import IndexMixin
+
+_INTEGER_FIELDS = (
+    "AutoField",
+    "BigAutoField",
+    "SmallAutoField",
+    "IntegerField",
+    "BigIntegerField",
+    "SmallIntegerField",
+    "PositiveIntegerField",
+    "PositiveBigIntegerField",
+    "PositiveSmallIntegerField",
+)
+_STRING_FIELDS = ("CharField", "SlugField", "TextField", "EmailField")
+
+
+class PkCodec:
+    """Converts the values of a model's index key field to and from document ids.
+
+    Built once per model by `IndexMixin._meili_pk_codec`, and used by the
+    signal handlers, syncindex, deletes and hydration alike. Integer, string
+    and UUID fields are converted directly; other fields go through the
+    field's own `value_to_string` and `to_python`.
+
+    For example:
+    ```python
+    codec = UuidIdPost._meili_pk_codec()
+    codec.to_python(["6f1c...", "9b2e..."])  # [UUID("6f1c..."), UUID("9b2e...")]
+    ```
+    """
+
+    def __init__(self, model: Type["IndexMixin"]):
+        primary_key = model._meilisearch["primary_key"]
+        field = (
+            model._meta.pk if primary_key == "pk" else model._meta.get_field(primary_key)
+        )
+        self.field: models.Field = field
+        self.attname: str = field.attname
+        # Rows are looked up by "pk", or by name when the index is keyed by another unique field.
+        self.lookup: str = "pk" if field.primary_key else field.name
+        # The attribute of a hit holding the id, as written by `_meili_documents`.
+        self.hit_key: str = "id" if primary_key == "pk" else primary_key
+        internal_type = field.get_internal_type()
+        # Chunks after the first are keyed `<id>-<n>`, which no other integer or UUID id can be.
+        self.chunkable: bool = internal_type in (*_INTEGER_FIELDS, "UUIDField")
+        self._direct = internal_type in (*_INTEGER_FIELDS, *_STRING_FIELDS, "UUIDField")
+        self._parse: Callable[[str], Any] = (
+            int
+            if internal_type in _INTEGER_FIELDS
+            else UUID
+            if internal_type == "UUIDField"
+            else str
+            if internal_type in _STRING_FIELDS
+            else field.to_python
+        )
+
+    def value(self, instance: models.Model) -> Any:
+        """Return the instance's value for the key field."""
+
+        return getattr(instance, self.attname)
+
+    def document_id(self, instance: models.Model) -> str:
+        """Return the id of the instance's document."""
+
+        if self._direct:
+            return str(getattr(instance, self.attname))
+        return self.field.value_to_string(instance)
+
+    def to_python(self, ids: Iterable[str]) -> list:
+        """Convert document ids back into key field values, in bulk."""
+
+        return list(map(self._parse, ids))
@@ -0,0 +1,70 @@
+"""
+_progress.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the progress reporting used by long running management commands.
+"""
+
+from datetime import timedelta
+from time import monotonic
+from typing import Callable
+
+
+class Progress:
+    """Report how many rows were processed, the rate and the time left.
+
+    A line is written at most every `interval` seconds, so it can be
+    updated once per chunk without flooding the output.
+
+    Example:
+    ```python
+    progress = Progress(queryset.count(), self.stdout.write)
+    for chunk in chunks:
+        ...
+        progress.advance(len(chunk))
+    progress.report()
+    ```
+    """
+
+    def __init__(
+        self,
+        total: int,
+        write: Callable[[str], None],
+        interval: float = 5.0,
+        label: str = "",
+    ):
+        self.total = total
+        self.write = write
+        self.interval = interval
+        self.label = label
+        self.done = 0
+        self.started = monotonic()
+        self.reported = self.started
+
+    @property
+    def rate(self) -> float:
+        """Rows processed per second."""
+
+        elapsed = monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> timedelta | None:
+        """The estimated time left, or None before anything was processed."""
+
+        if self.rate == 0:
+            return None
+        return timedelta(seconds=round(max(self.total - self.done, 0) / self.rate))
+
+    def advance(self, rows: int) -> None:
+        self.done += rows
+        if monotonic() - self.reported >= self.interval:
+            self.report()
+
+    def report(self) -> None:
+        self.reported = monotonic()
+        eta = self.eta
+        self.write(
+            f"{self.label}{self.done}/{self.total} rows ({self.rate:.0f} rows/s"
+            + (f", ETA {eta})" if eta is not None else ")")
+        )
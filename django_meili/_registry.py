@@ -0,0 +1,91 @@
+"""
+_registry.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the lookup of indexed models used by the management commands.
+"""
+
+from fnmatch import fnmatchcase
+from typing import Iterable, Type
+
+from django.apps import apps
+
+from .models import IndexMixin
+
+
+def indexed_models() -> list[Type[IndexMixin]]:
+    """Return every installed model with a MeiliSearch index."""
+
+    return [model for model in apps.get_models() if issubclass(model, IndexMixin)]
+
+
+def select_models(patterns: Iterable[str]) -> list[Type[IndexMixin]]:
+    """Select indexed models by label, app label or glob.
+
+    A pattern with a dot is matched against model labels (`posts.Post`,
+    `posts.Post*`), one without against app labels (`posts`, `blog_*`).
+    Matching ignores case, and each model is returned once, in order.
+
+    Raises LookupError for a pattern that matches no indexed model.
+    """
+
+    selected: dict[Type[IndexMixin], None] = {}
+    candidates = indexed_models()
+    for pattern in patterns:
+        pattern = pattern.lower()
+        matches = [
+            model
+            for model in candidates
+            if fnmatchcase(
+                model._meta.label_lower if "." in pattern else model._meta.app_label,
+                pattern,
+            )
+        ]
+        if not matches:
+            raise LookupError(pattern)
+        selected.update(dict.fromkeys(matches))
+    return list(selected)
+
+
+def resolve_model(label: str) -> Type[IndexMixin]:
+    """Return the indexed model with the given `<app_label>.<model_name>` label.
+
+    Raises LookupError, with the message to show, when there is no such
+    model or it does not use IndexMixin.
+    """
+
+    try:
+        Model = apps.get_model(label)
+    except LookupError:
+        raise LookupError(f"Model not found: {label}") from None
+    except ValueError:
+        raise LookupError(f"Invalid model: {label}") from None
+    if not issubclass(Model, IndexMixin):
+        raise LookupError(f"Invalid model: {label}")
+    return Model
+
+
+def resolve_models(patterns: Iterable[str], all: bool = False) -> list[Type[IndexMixin]]:
+    """Resolve the models given to a management command.
+
+    Each pattern is a model label, an app label or a glob (see select_models),
+    and `all` selects every indexed model. Each model is returned once, in order.
+
+    Raises LookupError, with the message to show, for a pattern matching no
+    indexed model or when no pattern is given.
+    """
+
+    if all:
+        patterns = ["*"]
+    elif not patterns:
+        raise LookupError("Give at least one model, or --all")
+    models: dict[Type[IndexMixin], None] = {}
+    for pattern in patterns:
+        if "." in pattern and not any(char in pattern for char in "*?["):
+            models[resolve_model(pattern)] = None
+            continue
+        try:
+            models.update(dict.fromkeys(select_models([pattern])))
+        except LookupError:
+            raise LookupError(f"No indexed models match: {pattern}") from None
+    return list(models)
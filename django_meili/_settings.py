@@ -29,7 +29,26 @@ class DjangoMeiliSettings(TypedDict):
     DEBUG: bool | None
     SYNC: bool | None
     OFFLINE: bool | None
+    BACKEND: str | None
+    BACKEND_OPTIONS: dict | None
     DEFAULT_BATCH_SIZE: int = 1000
+    BATCH_MAX_BYTES: int = 10_485_760
+    BATCH_TARGET_DURATION: float | None = 5.0
+    TRACING: bool | None
+    METRICS: bool | None
+    CONTENT_HASHES: bool | None
+    AUTOCOMPLETE_CACHE: str = "default"
+    AUTOCOMPLETE_TIMEOUT: int = 10
+    TENANT_TOKEN_API_KEY: str | None
+    TENANT_TOKEN_API_KEY_UID: str | None
+    TENANT_TOKEN_TTL: int = 3600
+    CIRCUIT_BREAKER: bool | None
+    CIRCUIT_BREAKER_FAILURE_RATE: float = 0.5
+    CIRCUIT_BREAKER_SLOW_CALL: float | None = 2.0
+    CIRCUIT_BREAKER_WINDOW: int = 20
+    CIRCUIT_BREAKER_MIN_CALLS: int = 5
+    CIRCUIT_BREAKER_RESET_TIMEOUT: float = 30.0
+    SEARCH_FALLBACK: str = "raise"
 
 
 @dataclass(frozen=True, slots=True)
@@ -53,7 +72,26 @@ class _DjangoMeiliSettings:
     debug: bool
     sync: bool
     offline: bool
+    backend: str | None
+    backend_options: dict
     batch_size: int
+    batch_max_bytes: int
+    batch_target_duration: float | None
+    tracing: bool
+    metrics: bool
+    content_hashes: bool
+    autocomplete_cache: str
+    autocomplete_timeout: int
+    tenant_token_api_key: str | None
+    tenant_token_api_key_uid: str | None
+    tenant_token_ttl: int
+    circuit_breaker: bool
+    circuit_breaker_failure_rate: float
+    circuit_breaker_slow_call: float | None
+    circuit_breaker_window: int
+    circuit_breaker_min_calls: int
+    circuit_breaker_reset_timeout: float
+    search_fallback: str
 
     @classmethod
     def from_settings(cls) -> "_DjangoMeiliSettings":
@@ -69,5 +107,36 @@ class _DjangoMeiliSettings:
             debug=settings.MEILISEARCH.get("DEBUG", settings.DEBUG),
             sync=settings.MEILISEARCH.get("SYNC", False),
             offline=settings.MEILISEARCH.get("OFFLINE", False),
+            backend=settings.MEILISEARCH.get("BACKEND", None),
+            backend_options=settings.MEILISEARCH.get("BACKEND_OPTIONS", {}),
             batch_size=settings.MEILISEARCH.get("DEFAULT_BATCH_SIZE", 1000),
+            batch_max_bytes=settings.MEILISEARCH.get("BATCH_MAX_BYTES", 10_485_760),
+            batch_target_duration=settings.MEILISEARCH.get(
+                "BATCH_TARGET_DURATION", 5.0
+            ),
+            tracing=settings.MEILISEARCH.get("TRACING", False),
+            metrics=settings.MEILISEARCH.get("METRICS", False),
+            content_hashes=settings.MEILISEARCH.get("CONTENT_HASHES", False),
+            autocomplete_cache=settings.MEILISEARCH.get("AUTOCOMPLETE_CACHE", "default"),
+            autocomplete_timeout=settings.MEILISEARCH.get("AUTOCOMPLETE_TIMEOUT", 10),
+            tenant_token_api_key=settings.MEILISEARCH.get("TENANT_TOKEN_API_KEY", None),
+            tenant_token_api_key_uid=settings.MEILISEARCH.get(
+                "TENANT_TOKEN_API_KEY_UID", None
+            ),
+            tenant_token_ttl=settings.MEILISEARCH.get("TENANT_TOKEN_TTL", 3600),
+            circuit_breaker=settings.MEILISEARCH.get("CIRCUIT_BREAKER", False),
+            circuit_breaker_failure_rate=settings.MEILISEARCH.get(
+                "CIRCUIT_BREAKER_FAILURE_RATE", 0.5
+            ),
+            circuit_breaker_slow_call=settings.MEILISEARCH.get(
+                "CIRCUIT_BREAKER_SLOW_CALL", 2.0
+            ),
+            circuit_breaker_window=settings.MEILISEARCH.get("CIRCUIT_BREAKER_WINDOW", 20),
+            circuit_breaker_min_calls=settings.MEILISEARCH.get(
+                "CIRCUIT_BREAKER_MIN_CALLS", 5
+            ),
+            circuit_breaker_reset_timeout=settings.MEILISEARCH.get(
+                "CIRCUIT_BREAKER_RESET_TIMEOUT", 30.0
+            ),
+            search_fallback=settings.MEILISEARCH.get("SEARCH_FALLBACK", "raise"),
         )
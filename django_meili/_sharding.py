@@ -0,0 +1,51 @@
+"""
+_sharding.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the pk range sharding used by syncindex to spread a sync across processes.
+
+Nothing here imports the models at module level, so that worker processes which
+were spawned rather than forked can import it before Django is set up.
+"""
+
+from collections import Counter
+from typing import TYPE_CHECKING, Type
+
+if TYPE_CHECKING:
+    from .models import IndexMixin
+
+
+def shard_bounds(model: Type["IndexMixin"], shards: int) -> list[tuple]:
+    """Split the model's rows into `shards` contiguous pk ranges of similar size.
+
+    Each range is a half-open (lower, upper) pair, where None means unbounded,
+    so rows created after the bounds were computed still fall into a shard.
+    """
+
+    pks = model.objects.order_by("pk").values_list("pk", flat=True)
+    count = pks.count() if shards > 1 else 0
+    if count == 0:
+        return [(None, None)] * max(shards, 1)
+    # With fewer rows than shards some cuts repeat, leaving those shards empty.
+    cuts = [pks[count * k // shards] for k in range(1, shards)]
+    edges = [None, *cuts, None]
+    return list(zip(edges, edges[1:]))
+
+
+def setup_worker():
+    """Set up Django in a worker process, unless it was forked from a set up one."""
+
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def sync_shard(model: str, options: dict, lower, upper, shard: str = "") -> Counter:
+    """Sync the rows of a single shard in a worker process."""
+
+    from ._registry import resolve_model
+    from .management.commands.syncindex import Command
+
+    return Command()._sync(resolve_model(model), options, lower, upper, shard)
@@ -25,10 +25,16 @@ class DjangoMeiliConfig(AppConfig):
         """
 
         from django.conf import settings
+        from django.core.signals import request_started
         from django.db.models.signals import post_delete, post_save
+        from meilisearch.errors import MeilisearchError
 
+        from ._batching import encode_document
+        from ._breaker import is_unavailable
+        from ._chunking import chunk_filter
         from ._client import client as _client
-        from .models import IndexMixin
+        from .models import DocumentHash, IndexMixin, PendingWrite
+        from .signals import documents_indexed
 
         def add_model(**kwargs):
             """Add a model to the MeiliSearch index.
@@ -37,33 +43,107 @@ class DjangoMeiliConfig(AppConfig):
             """
 
             model: IndexMixin = kwargs["instance"]
-            if model.meili_filter():
-                serialized = model.meili_serialize()
-
-                # Since the primary key can be any field, we need to check if it is 'pk' or another field.
-                # If its 'pk', we can just use the model.pk, otherwise we need to get the value from the field.
-                pk = (
-                    model._meta.pk.value_to_string(model)
-                    if model._meilisearch["primary_key"] == "pk"
-                    else model._meta.get_field(
-                        model._meilisearch["primary_key"]
-                    ).value_to_string(model)
-                )
-
+            if not model.meili_filter():
+                # The row no longer qualifies (e.g. a post went back to being a draft), so its
+                # document has to be removed, unless it is known not to be in the index.
+                if kwargs.get("created", False):
+                    model._meili_in_index = False
+                elif model._meili_was_indexed() is not False:
+                    delete_model(**kwargs)
+                return
+
+            # Saves that only touch fields which aren't indexed don't need a round-trip,
+            # and saves that touch some indexed fields only need to send those.
+            changed = (
+                None
+                if kwargs.get("created", False) or model._meili_was_indexed() is not True
+                else model._meili_changed_fields(kwargs.get("update_fields"))
+            )
+            if changed is not None and not changed:
+                return
+            if settings.MEILISEARCH.get("OFFLINE", False):
+                return
+            chunk_fields = model._meilisearch["chunk_fields"]
+            if chunk_fields or model._meilisearch["embeds"]:
+                # Every chunk repeats the row's other fields, and vectors follow from the
+                # whole row, so those documents are always sent whole.
+                changed = None
+            if changed is None:
+                documents = list(model._meili_documents(type(model)._meili_vectors([model])[0]))
+            else:
+                pk = model._meili_document_id()
                 # This bit makes sure that geo is only added if the model supports it.
-                geo = model.meili_geo() if model._meilisearch["supports_geo"] else None
-                if settings.MEILISEARCH.get("OFFLINE", False):
-                    return
-                task = _client.get_index(
-                    model._meilisearch["index_name"]
-                ).add_documents(
-                    [
-                        serialized
-                        | {"id": pk, "pk": model._meta.pk.value_to_string(model)}
-                        | ({"_geo": geo} if geo else {})
-                    ]
+                geo = (
+                    type(model)._meili_geo_points([model])[0]
+                    if model._meilisearch["supports_geo"]
+                    else None
                 )
-                if settings.DEBUG:
+                # Coordinate columns only reach the document as _geo, unless they are
+                # indexed fields as well.
+                geo_columns = set(model._meilisearch["geo_fields"] or ()) - (
+                    model._meili_document_fields()
+                )
+                fields = changed - geo_columns
+                documents = [
+                    (model._meili_truncate(model._meili_serialize_fields(fields)) if fields else {})
+                    | {"id": pk, "pk": model._meta.pk.value_to_string(model)}
+                    # A point whose coordinates were cleared is cleared in the document too.
+                    | ({"_geo": geo} if geo or changed & geo_columns else {})
+                ]
+                if settings.MEILISEARCH.get("CONTENT_HASHES", False):
+                    # A partial update can't hash the whole document, so it clears the stale hash.
+                    documents[0]["_hash"] = None
+            index_name = model.meili_index_name()
+            id = model._meili_document_id()
+            payload = b"\n".join(encode_document(document) for document in documents)
+            operation = "add_documents" if changed is None else "update_documents"
+            try:
+                model._meili_ensure_index(index_name)
+                with _client.instrumentation.operation(
+                    operation, index_name, documents=len(documents), payload_bytes=len(payload)
+                ) as op:
+                    index = _client.get_index(index_name)
+                    task = (
+                        index.add_documents_ndjson(payload)
+                        if changed is None
+                        else index.update_documents_ndjson(payload)
+                    )
+                tasks = [task]
+                if chunk_fields:
+                    # Drop the chunks left over from when the text was longer.
+                    with _client.instrumentation.operation("delete_documents", index_name):
+                        tasks.append(
+                            index.delete_documents(
+                                filter=chunk_filter(counts={id: len(documents)})
+                            )
+                        )
+            except MeilisearchError as e:
+                if _client.breaker is None or not is_unavailable(e):
+                    raise
+                # The save goes through, and replayoutbox sends the whole row once MeiliSearch is back.
+                PendingWrite.objects.divert(
+                    model._meta.label, index_name, id, PendingWrite.INDEX
+                )
+                tasks = None
+            # A partial save only brings the fields it wrote up to date, while a
+            # whole document holds every field's current value.
+            model._meili_snapshot(None if changed is None else kwargs.get("update_fields"))
+            model._meili_in_index = True
+            if settings.MEILISEARCH.get("CONTENT_HASHES", False):
+                # syncindex must not skip this document based on what it last sent.
+                DocumentHash.objects.forget(index_name, [id])
+            if tasks is None:
+                return
+            documents_indexed.send(
+                sender=model.__class__,
+                index_name=index_name,
+                documents=documents,
+                payload_bytes=len(payload),
+                duration=op.duration,
+                task=task,
+            )
+            if settings.DEBUG:
+                for task in tasks:
                     finished = _client.wait_for_task(task.task_uid)
                     if finished.status == "failed":
                         raise Exception(finished)
@@ -75,27 +155,38 @@ class DjangoMeiliConfig(AppConfig):
             """
 
             model: IndexMixin = kwargs["instance"]
-            if model.meili_filter():
-                # Since the primary key can be any field, we need to check if it is 'pk' or another field.
-                # If its 'pk', we can just use the model.pk, otherwise we need to get the value from the field.
-                pk = (
-                    model._meta.get_field(
-                        model._meilisearch["primary_key"]
-                    ).value_from_object(model)
-                    if model._meilisearch["primary_key"] != "pk"
-                    else model.pk
-                )
+            if model._meili_was_indexed() is not False:
+                pk = model._meili_document_id()
 
                 if settings.MEILISEARCH.get("OFFLINE", False):
                     return
-                task = _client.get_index(
-                    model._meilisearch["index_name"]
-                ).delete_document(pk)
-                if settings.DEBUG:
+                index_name = model.meili_index_name()
+                try:
+                    model._meili_ensure_index(index_name)
+                    with _client.instrumentation.operation("delete_documents", index_name):
+                        index = _client.get_index(index_name)
+                        task = (
+                            index.delete_documents(filter=chunk_filter([pk]))
+                            if model._meilisearch["chunk_fields"]
+                            else index.delete_document(pk)
+                        )
+                except MeilisearchError as e:
+                    if _client.breaker is None or not is_unavailable(e):
+                        raise
+                    PendingWrite.objects.divert(
+                        model._meta.label, index_name, pk, PendingWrite.DELETE
+                    )
+                    task = None
+                model._meili_in_index = False
+                if settings.MEILISEARCH.get("CONTENT_HASHES", False):
+                    DocumentHash.objects.forget(index_name, [pk])
+                if settings.DEBUG and task is not None:
                     finished = _client.wait_for_task(task.task_uid)
                     if finished.status == "failed":
                         raise Exception(finished)
 
+        request_started.connect(_client.instrumentation.log.reset, weak=False)
+
         # This loop connects the add_model and delete_model functions to the post_save and post_delete signals of all
         # Its also why the `django_meili` app needs to be loaded before all the user apps in the `INSTALLED_APPS` list.
         for model in IndexMixin.__subclasses__():
@@ -0,0 +1,86 @@
+"""
+backends/__init__.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the interface of the backends the client's requests are sent to.
+"""
+
+from json import dumps
+from typing import Any
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from meilisearch.config import Config
+from meilisearch.errors import MeilisearchApiError
+from requests import Response
+
+# The short names `MEILISEARCH["BACKEND"]` accepts, besides dotted paths.
+BACKENDS = {
+    "memory": "django_meili.backends.memory.MemoryBackend",
+    "record": "django_meili.backends.recording.RecordingBackend",
+    "replay": "django_meili.backends.recording.ReplayBackend",
+}
+
+
+class Backend:
+    """Answers the requests of the MeiliSearch client in place of a MeiliSearch server.
+
+    A backend receives every request the client makes (searches, document
+    writes and deletes, settings, tasks, ...) with the HTTP method, the path
+    (including the query string) and the body as the client built it: JSON
+    values, or bytes for NDJSON documents. It returns the decoded response,
+    and raises `MeilisearchApiError` for error responses.
+
+    Backends are built with the client's `Config` and the keyword arguments in
+    `MEILISEARCH["BACKEND_OPTIONS"]`.
+
+    For example:
+    ```python
+    class NoSearches(Backend):
+        def request(self, method, path, body=None, content_type=None):
+            raise RuntimeError(f"{method} {path}")
+    ```
+    """
+
+    def __init__(self, config: Config | None = None):
+        self.config = config
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Any = None,
+        content_type: str | None = None,
+    ) -> Any:
+        raise NotImplementedError
+
+
+def api_error(status: int, error: dict) -> MeilisearchApiError:
+    """Build the error the client raises for an error response."""
+
+    response = Response()
+    response.status_code = status
+    response._content = dumps(error).encode()
+    return MeilisearchApiError(error.get("message", ""), response)
+
+
+def get_backend(
+    name: str | None, config: Config | None = None, options: dict | None = None
+) -> Backend | None:
+    """Build the backend named by `MEILISEARCH["BACKEND"]`.
+
+    The name is "memory", "record", "replay" or the dotted path of a Backend
+    subclass. None and "http" send requests to the MeiliSearch server, for
+    which no backend is needed.
+    """
+
+    if name in (None, "http"):
+        return None
+    try:
+        backend_class = import_string(BACKENDS.get(name, name))
+    except ImportError as e:
+        raise ImproperlyConfigured(
+            f"MEILISEARCH['BACKEND'] {name!r} is not one of 'http', "
+            f"{', '.join(map(repr, BACKENDS))} or the dotted path of a backend"
+        ) from e
+    return backend_class(config, **(options or {}))
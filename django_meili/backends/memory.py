@@ -0,0 +1,1087 @@
+"""
+backends/memory.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the in-memory backend, which keeps indexes in the process.
+"""
+
+from bisect import bisect_left
+from copy import deepcopy
+from datetime import datetime, timezone
+from json import dumps, loads
+from math import asin, cos, radians, sin, sqrt
+from re import compile
+from threading import RLock
+from typing import Any, Callable, Iterable
+from urllib.parse import parse_qsl, unquote, urlparse
+
+from meilisearch.config import Config
+from meilisearch.errors import MeilisearchApiError
+
+from . import Backend, api_error
+
+_WORD = compile(r"\w+")
+_TOKEN = compile(
+    r""""(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|>=|<=|!=|[()\[\],=<>]|[^\s()\[\],=<>!]+"""
+)
+_GEO_POINT = compile(r"_geoPoint\(\s*([-\d.]+)\s*,\s*([-\d.]+)\s*\):(asc|desc)")
+_MISSING = object()
+
+_DEFAULT_SETTINGS = {
+    "displayedAttributes": ["*"],
+    "searchableAttributes": ["*"],
+    "filterableAttributes": [],
+    "sortableAttributes": [],
+    "rankingRules": ["words", "typo", "proximity", "attribute", "sort", "exactness"],
+    "stopWords": [],
+    "synonyms": {},
+    "distinctAttribute": None,
+    "pagination": {"maxTotalHits": 1000},
+    "embedders": {},
+}
+# The settings sub-routes, e.g. /indexes/posts/settings/filterable-attributes.
+_SETTING_ROUTES = {
+    "".join(c if c.islower() else f"-{c.lower()}" for c in name): name
+    for name in _DEFAULT_SETTINGS
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _error(status: int, code: str, message: str) -> MeilisearchApiError:
+    return api_error(
+        status,
+        {
+            "message": message,
+            "code": code,
+            "type": "invalid_request",
+            "link": f"https://docs.meilisearch.com/errors#{code}",
+        },
+    )
+
+
+class _TaskError(Exception):
+    """Fails the task being processed, as MeiliSearch does for asynchronous errors."""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _split(text: str) -> list[str]:
+    """Split text into the lowercased words it is indexed and searched by."""
+
+    return _WORD.findall(text.casefold())
+
+
+def _lookup(document: dict, attribute: str) -> Any:
+    """The value of an attribute, which may be a dotted path into nested objects."""
+
+    if attribute in document:
+        return document[attribute]
+    value: Any = document
+    for part in attribute.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _scalars(value: Any) -> Iterable[str]:
+    """The searchable strings of a value, with arrays and objects flattened."""
+
+    if value is None or value is _MISSING:
+        return
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _scalars(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _scalars(item)
+    elif isinstance(value, bool):
+        yield "true" if value else "false"
+    else:
+        yield str(value)
+
+
+def _number(value: Any) -> float | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _equal(actual: Any, expected: str) -> bool:
+    if isinstance(actual, bool):
+        actual = "true" if actual else "false"
+    if not isinstance(actual, (str, int, float)):
+        return False
+    number, other = _number(actual), _number(expected)
+    if number is not None and other is not None:
+        return number == other
+    return str(actual).casefold() == expected.casefold()
+
+
+def _distance(geo: dict, lat: float, lng: float) -> int:
+    """The distance in meters between a `_geo` and a point, by the haversine formula."""
+
+    lat1, lng1, lat2, lng2 = map(radians, (float(geo["lat"]), float(geo["lng"]), lat, lng))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lng2 - lng1) / 2) ** 2
+    return round(2 * 6_371_000 * asin(sqrt(a)))
+
+
+def _similarity(document: dict, embedder: str, vector: list[float]) -> float | None:
+    """The cosine similarity of a document's vector to the given one, or None without one."""
+
+    other = (document.get("_vectors") or {}).get(embedder)
+    if isinstance(other, dict):
+        other = other.get("embeddings")
+    if not other:
+        return None
+    if isinstance(other[0], list):
+        other = other[0]
+    norms = sqrt(sum(x * x for x in vector)) * sqrt(sum(x * x for x in other))
+    return sum(x * y for x, y in zip(vector, other)) / norms if norms else 0.0
+
+
+class _FilterParser:
+    """Compiles a filter expression into a predicate on documents.
+
+    Supports the comparison operators, `TO`, `IN`, `EXISTS`, `IS NULL`,
+    `IS EMPTY`, their negations, `_geoRadius` and `_geoBoundingBox`,
+    combined with `AND`, `OR`, `NOT` and parentheses.
+    """
+
+    def __init__(self, expression: str, filterable: Callable[[str], bool]):
+        self.tokens = _TOKEN.findall(expression)
+        self.position = 0
+        self.filterable = filterable
+
+    def parse(self) -> Callable[[dict], bool]:
+        predicate = self.disjunction()
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected `{self.peek()}` in filter")
+        return predicate
+
+    def peek(self, offset: int = 0) -> str | None:
+        position = self.position + offset
+        return self.tokens[position] if position < len(self.tokens) else None
+
+    def take(self, expected: str | None = None) -> str:
+        token = self.peek()
+        if token is None or (expected is not None and token.upper() != expected):
+            raise ValueError(f"Expected `{expected or 'a value'}` in filter, found `{token}`")
+        self.position += 1
+        return token
+
+    def keyword(self, *keywords: str) -> bool:
+        token = self.peek()
+        return token is not None and token.upper() in keywords
+
+    def disjunction(self) -> Callable[[dict], bool]:
+        predicates = [self.conjunction()]
+        while self.keyword("OR"):
+            self.take()
+            predicates.append(self.conjunction())
+        if len(predicates) == 1:
+            return predicates[0]
+        return lambda document: any(predicate(document) for predicate in predicates)
+
+    def conjunction(self) -> Callable[[dict], bool]:
+        predicates = [self.negation()]
+        while self.keyword("AND"):
+            self.take()
+            predicates.append(self.negation())
+        if len(predicates) == 1:
+            return predicates[0]
+        return lambda document: all(predicate(document) for predicate in predicates)
+
+    def negation(self) -> Callable[[dict], bool]:
+        if self.keyword("NOT"):
+            self.take()
+            predicate = self.negation()
+            return lambda document: not predicate(document)
+        if self.peek() == "(":
+            self.take()
+            predicate = self.disjunction()
+            self.take(")")
+            return predicate
+        if self.peek() in ("_geoRadius", "_geoBoundingBox"):
+            return self.geo()
+        return self.condition()
+
+    def value(self) -> str:
+        token = self.take()
+        if token.startswith('"'):
+            return loads(token)
+        if token.startswith("'"):
+            return token[1:-1].replace("\\'", "'")
+        if token in ("(", ")", "[", "]", ","):
+            raise ValueError(f"Expected a value in filter, found `{token}`")
+        return token
+
+    def values(self) -> list[str]:
+        self.take("[")
+        values = []
+        while self.peek() != "]":
+            values.append(self.value())
+            if self.peek() == ",":
+                self.take()
+        self.take("]")
+        return values
+
+    def attribute(self) -> str:
+        attribute = self.value()
+        if not self.filterable(attribute):
+            raise PermissionError(attribute)
+        return attribute
+
+    def condition(self) -> Callable[[dict], bool]:
+        attribute = self.attribute()
+
+        def each(test: Callable[[Any], bool]) -> Callable[[dict], bool]:
+            def predicate(document: dict) -> bool:
+                value = _lookup(document, attribute)
+                if isinstance(value, list):
+                    return any(test(item) for item in value)
+                return value is not _MISSING and test(value)
+
+            return predicate
+
+        negated = False
+        if self.keyword("NOT"):
+            self.take()
+            negated = True
+        if self.keyword("IS"):
+            self.take()
+            if self.keyword("NOT"):
+                self.take()
+                negated = not negated
+            kind = self.take().upper()
+            if kind == "NULL":
+                predicate = lambda document: _lookup(document, attribute) is None
+            elif kind == "EMPTY":
+                predicate = lambda document: _lookup(document, attribute) in ("", [], {})
+            else:
+                raise ValueError(f"Expected `NULL` or `EMPTY` in filter, found `{kind}`")
+        elif self.keyword("EXISTS"):
+            self.take()
+            predicate = lambda document: _lookup(document, attribute) is not _MISSING
+        elif self.keyword("IN"):
+            self.take()
+            expected = self.values()
+            predicate = each(lambda value: any(_equal(value, other) for other in expected))
+        elif negated:
+            raise ValueError("Expected `IN`, `EXISTS` or `IS` after `NOT` in filter")
+        elif self.peek() in ("=", "!="):
+            operator, expected = self.take(), self.value()
+            predicate = each(lambda value: _equal(value, expected))
+            negated = operator == "!="
+        elif self.peek() in (">", ">=", "<", "<="):
+            operator, expected = self.take(), _number(self.value())
+            if expected is None:
+                raise ValueError(f"Expected a number after `{operator}` in filter")
+            compare = {
+                ">": float.__gt__,
+                ">=": float.__ge__,
+                "<": float.__lt__,
+                "<=": float.__le__,
+            }[operator]
+            predicate = each(
+                lambda value: (number := _number(value)) is not None and compare(number, expected)
+            )
+        else:
+            low = _number(self.value())
+            self.take("TO")
+            high = _number(self.value())
+            if low is None or high is None:
+                raise ValueError("Expected numbers around `TO` in filter")
+            predicate = each(
+                lambda value: (number := _number(value)) is not None and low <= number <= high
+            )
+        if negated:
+            return lambda document: not predicate(document)
+        return predicate
+
+    def geo(self) -> Callable[[dict], bool]:
+        function = self.take()
+        if not self.filterable("_geo"):
+            raise PermissionError("_geo")
+        self.take("(")
+        if function == "_geoRadius":
+            lat, lng, radius = (self.number() for _ in range(3))
+            self.take(")")
+            return lambda document: isinstance(document.get("_geo"), dict) and (
+                _distance(document["_geo"], lat, lng) <= radius
+            )
+        top, right = self.point()
+        self.take(",")
+        bottom, left = self.point()
+        self.take(")")
+
+        def inside(document: dict) -> bool:
+            geo = document.get("_geo")
+            if not isinstance(geo, dict):
+                return False
+            lat, lng = float(geo["lat"]), float(geo["lng"])
+            if not bottom <= lat <= top:
+                return False
+            # A box whose left edge is east of its right edge crosses the antimeridian.
+            return left <= lng <= right if left <= right else lng >= left or lng <= right
+
+        return inside
+
+    def number(self) -> float:
+        number = _number(self.value())
+        if number is None:
+            raise ValueError("Expected a number in geo filter")
+        if self.peek() == ",":
+            self.take()
+        return number
+
+    def point(self) -> tuple[float, float]:
+        self.take("[")
+        lat, lng = self.number(), self.number()
+        self.take("]")
+        return lat, lng
+
+
+class _Index:
+    """The documents and settings of one index, with an inverted index of their words."""
+
+    def __init__(self, uid: str, primary_key: str | None):
+        self.uid = uid
+        self.primary_key = primary_key
+        self.created_at = self.updated_at = _now()
+        self.settings = deepcopy(_DEFAULT_SETTINGS)
+        self.documents: dict[str, dict] = {}
+        # Each word, with the documents it appears in and the attributes it appears in there.
+        self.postings: dict[str, dict[str, set[str]]] = {}
+        self._vocabulary: list[str] | None = None
+
+    def describe(self) -> dict:
+        return {
+            "uid": self.uid,
+            "primaryKey": self.primary_key,
+            "createdAt": self.created_at,
+            "updatedAt": self.updated_at,
+        }
+
+    def searchable(self) -> list[str] | None:
+        """The searchable attributes, in ranking order, or None when every one is."""
+
+        attributes = self.settings["searchableAttributes"]
+        return None if "*" in attributes else attributes
+
+    def filterable(self, attribute: str) -> bool:
+        return any(
+            attribute == name or attribute.startswith(f"{name}.")
+            for name in self.settings["filterableAttributes"]
+            if isinstance(name, str)
+        )
+
+    def compile_filter(self, filter: str | list | None) -> Callable[[dict], bool]:
+        """Compile a filter, raising the error MeiliSearch answers an invalid one with."""
+
+        if not filter:
+            return lambda document: True
+        if isinstance(filter, list):
+            # Each item of the list must match; a nested list matches when any of its items do.
+            predicates = [
+                self.compile_filter(item if isinstance(item, str) else " OR ".join(f"({i})" for i in item))
+                for item in filter
+            ]
+            return lambda document: all(predicate(document) for predicate in predicates)
+        try:
+            return _FilterParser(filter, self.filterable).parse()
+        except PermissionError as e:
+            available = ", ".join(sorted(self.settings["filterableAttributes"]))
+            raise _error(
+                400,
+                "invalid_search_filter",
+                f"Index `{self.uid}`: Attribute `{e.args[0]}` is not filterable. "
+                f"Available filterable attributes are: `{available}`.",
+            )
+        except ValueError as e:
+            raise _error(400, "invalid_search_filter", f"{e}: `{filter}`.")
+
+    def put(self, documents: list[dict], primary_key: str | None, replace: bool):
+        if self.primary_key is None:
+            self.primary_key = primary_key or next(
+                (key for key in (documents[0] if documents else {}) if key.lower().endswith("id")),
+                None,
+            )
+            if self.primary_key is None:
+                raise _TaskError(
+                    "index_primary_key_no_candidate_found",
+                    "The primary key inference failed as the engine did not find any field ending with `id`.",
+                )
+        for document in documents:
+            if self.primary_key not in document:
+                raise _TaskError(
+                    "missing_document_id",
+                    f"Document doesn't have a `{self.primary_key}` attribute: `{dumps(document)}`.",
+                )
+        for document in documents:
+            id = str(document[self.primary_key])
+            old = self.documents.get(id)
+            if old is not None:
+                self._unindex(id, old)
+                if not replace:
+                    document = old | document
+            self.documents[id] = document
+            self._index(id, document)
+        self.updated_at = _now()
+
+    def delete(self, ids: Iterable[str]):
+        for id in ids:
+            document = self.documents.pop(str(id), None)
+            if document is not None:
+                self._unindex(str(id), document)
+        self.updated_at = _now()
+
+    def update_settings(self, settings: dict):
+        for name, value in settings.items():
+            self.settings[name] = deepcopy(_DEFAULT_SETTINGS.get(name)) if value is None else value
+        if "searchableAttributes" in settings:
+            self.postings = {}
+            self._vocabulary = None
+            for id, document in self.documents.items():
+                self._index(id, document)
+        self.updated_at = _now()
+
+    def _words(self, document: dict) -> Iterable[tuple[str, str]]:
+        """The searchable words of a document, with the attribute each is in."""
+
+        for attribute in self.searchable() or [
+            key for key in document if key not in ("_geo", "_vectors")
+        ]:
+            for text in _scalars(_lookup(document, attribute)):
+                for word in _split(text):
+                    yield word, attribute
+
+    def _index(self, id: str, document: dict):
+        for word, attribute in self._words(document):
+            documents = self.postings.get(word)
+            if documents is None:
+                documents = self.postings[word] = {}
+                self._vocabulary = None
+            documents.setdefault(id, set()).add(attribute)
+
+    def _unindex(self, id: str, document: dict):
+        for word, _ in self._words(document):
+            documents = self.postings.get(word)
+            if documents is not None and documents.pop(id, None) is not None and not documents:
+                del self.postings[word]
+                self._vocabulary = None
+
+    def _terms(self, word: str, prefix: bool) -> list[str]:
+        """The indexed words a query word matches; the last query word matches as a prefix."""
+
+        if not prefix:
+            return [word]
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        terms = []
+        for term in self._vocabulary[bisect_left(self._vocabulary, word) :]:
+            if not term.startswith(word):
+                break
+            terms.append(term)
+        return terms
+
+    def _matches(self, word: str, prefix: bool, attributes: set[str] | None) -> dict[str, int]:
+        """The documents containing a query word, with the rank of the best attribute it is in."""
+
+        order = self.searchable() or []
+        found: dict[str, int] = {}
+        for term in self._terms(word, prefix):
+            for id, where in self.postings.get(term, {}).items():
+                if attributes is not None:
+                    where = where & attributes
+                    if not where:
+                        continue
+                rank = min(order.index(a) if a in order else 0 for a in where)
+                found[id] = min(found.get(id, rank), rank)
+        return found
+
+    def rank(self, body: dict) -> tuple[list[tuple[str, float]], dict[str, int]]:
+        """Find and order the documents matching a search.
+
+        Returns the matching ids with their ranking scores, best first, and the
+        distance of each document to the point sorted by, if any.
+        """
+
+        query = _split(body.get("q") or "")
+        matches = self.compile_filter(body.get("filter"))
+        attributes = body.get("attributesToSearchOn")
+        attributes = set(attributes) if attributes and "*" not in attributes else None
+        if attributes is not None and self.searchable() is not None:
+            unknown = attributes - set(self.searchable())
+            if unknown:
+                raise _error(
+                    400,
+                    "invalid_search_attributes_to_search_on",
+                    f"Attribute `{min(unknown)}` is not searchable.",
+                )
+        order = {id: position for position, id in enumerate(self.documents)}
+
+        # Documents matching every word come first, then those matching the
+        # first words only, dropping words from the end (the "last" strategy).
+        candidates: list[tuple[str, int, int]] = []
+        if query:
+            found = [
+                self._matches(word, i == len(query) - 1, attributes)
+                for i, word in enumerate(query)
+            ]
+            counts = (
+                [len(query)]
+                if body.get("matchingStrategy") == "all"
+                else range(len(query), 0, -1)
+            )
+            seen: set[str] = set()
+            for count in counts:
+                ids = set(found[0]).intersection(*found[1:count])
+                for id in sorted(ids - seen, key=order.__getitem__):
+                    seen.add(id)
+                    candidates.append((id, count, min(f[id] for f in found[:count])))
+        else:
+            candidates = [(id, 0, 0) for id in self.documents]
+        candidates = [c for c in candidates if matches(self.documents[c[0]])]
+        scores = {id: count / len(query) if query else 1.0 for id, count, _ in candidates}
+
+        hybrid = body.get("hybrid") or {}
+        ratio = hybrid.get("semanticRatio", 0.5) if hybrid else 0.0
+        if body.get("vector") is not None and ratio > 0:
+            ids, scores = self._semantic(body, hybrid, ratio, matches, scores, order)
+            return [(id, scores[id]) for id in ids], {}
+
+        ids = [id for id, _, _ in sorted(candidates, key=lambda c: c[2])]
+        ids, distances = self._sort(ids, body.get("sort") or [])
+        # Sorting only orders documents matching the same number of words.
+        ids.sort(key=lambda id: -scores[id])
+        return [(id, scores[id]) for id in self._distinct(ids, body)], distances
+
+    def _semantic(self, body, hybrid, ratio, matches, keyword_scores, order):
+        embedder = hybrid.get("embedder") or "default"
+        similarities = {}
+        for id, document in self.documents.items():
+            similarity = _similarity(document, embedder, body["vector"])
+            if similarity is not None and matches(document):
+                similarities[id] = max(similarity, 0.0)
+        ids = set(similarities) if ratio >= 1 else set(similarities) | set(keyword_scores)
+        scores = {
+            id: (1 - ratio) * keyword_scores.get(id, 0.0) + ratio * similarities.get(id, 0.0)
+            for id in ids
+        }
+        ranked = sorted(ids, key=lambda id: (-scores[id], order[id]))
+        return self._distinct(ranked, body), scores
+
+    def _sort(self, ids: list[str], rules: list[str]) -> tuple[list[str], dict[str, int]]:
+        distances: dict[str, int] = {}
+        # Sorting by each rule from the last, stably, orders by the first rule first.
+        for rule in reversed(rules):
+            if point := _GEO_POINT.fullmatch(rule):
+                if "_geo" not in self.settings["sortableAttributes"]:
+                    raise self._not_sortable("_geo")
+                lat, lng, direction = float(point[1]), float(point[2]), point[3]
+                for id in ids:
+                    geo = self.documents[id].get("_geo")
+                    if isinstance(geo, dict):
+                        distances[id] = _distance(geo, lat, lng)
+                keys = distances
+            else:
+                attribute, _, direction = rule.rpartition(":")
+                if direction not in ("asc", "desc") or not attribute:
+                    raise _error(400, "invalid_search_sort", f"Invalid syntax for the sort parameter: `{rule}`.")
+                if attribute not in self.settings["sortableAttributes"]:
+                    raise self._not_sortable(attribute)
+                keys = {}
+                for id in ids:
+                    value = _lookup(self.documents[id], attribute)
+                    if isinstance(value, bool):
+                        value = "true" if value else "false"
+                    if isinstance(value, (int, float)):
+                        keys[id] = (0, float(value), "")
+                    elif isinstance(value, str):
+                        keys[id] = (1, 0.0, value.casefold())
+            # Documents without a value come last, whatever the direction.
+            present = sorted(
+                (id for id in ids if id in keys),
+                key=keys.__getitem__,
+                reverse=direction == "desc",
+            )
+            ids = present + [id for id in ids if id not in keys]
+        return ids, distances
+
+    def _not_sortable(self, attribute: str) -> MeilisearchApiError:
+        available = ", ".join(sorted(self.settings["sortableAttributes"]))
+        return _error(
+            400,
+            "invalid_search_sort",
+            f"Index `{self.uid}`: Attribute `{attribute}` is not sortable. "
+            f"Available sortable attributes are: `{available}`.",
+        )
+
+    def _distinct(self, ids: list[str], body: dict) -> list[str]:
+        attribute = body.get("distinct") or self.settings["distinctAttribute"]
+        if not attribute:
+            return ids
+        seen = set()
+        kept = []
+        for id in ids:
+            value = _lookup(self.documents[id], attribute)
+            if value is not _MISSING:
+                key = dumps(value, sort_keys=True)
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(id)
+        return kept
+
+    def hit(self, id: str, body: dict, score: float, distance: int | None) -> dict:
+        """Build a hit from a document, with what the search asked to add to it."""
+
+        document = self.documents[id]
+        displayed = self.settings["displayedAttributes"]
+        retrieved = body.get("attributesToRetrieve") or ["*"]
+        hit = {
+            key: deepcopy(value)
+            for key, value in document.items()
+            if key != "_vectors"
+            and ("*" in displayed or key in displayed)
+            and ("*" in retrieved or key in retrieved)
+        }
+        if body.get("retrieveVectors") and "_vectors" in document:
+            hit["_vectors"] = deepcopy(document["_vectors"])
+        highlighted = body.get("attributesToHighlight") or []
+        cropped = {
+            name: int(length) if length else body.get("cropLength", 10)
+            for name, _, length in (
+                attribute.partition(":") for attribute in body.get("attributesToCrop") or []
+            )
+        }
+        if highlighted or cropped:
+            query = _split(body.get("q") or "")
+            formatted = {}
+            for key, value in hit.items():
+                if isinstance(value, str):
+                    length = cropped.get(key, cropped.get("*"))
+                    if length is not None:
+                        value = _crop(value, query, length, body.get("cropMarker", "…"))
+                    if "*" in highlighted or key in highlighted:
+                        value = _highlight(
+                            value,
+                            query,
+                            body.get("highlightPreTag", "<em>"),
+                            body.get("highlightPostTag", "</em>"),
+                        )
+                formatted[key] = value
+            hit["_formatted"] = formatted
+        if distance is not None:
+            hit["_geoDistance"] = distance
+        if body.get("showRankingScore"):
+            hit["_rankingScore"] = round(score, 4)
+        return hit
+
+
+def _matched(word: str, query: list[str]) -> bool:
+    word = word.casefold()
+    return word in query or bool(query) and word.startswith(query[-1])
+
+
+def _highlight(text: str, query: list[str], pre_tag: str, post_tag: str) -> str:
+    if not query:
+        return text
+    return _WORD.sub(
+        lambda m: f"{pre_tag}{m[0]}{post_tag}" if _matched(m[0], query) else m[0], text
+    )
+
+
+def _crop(text: str, query: list[str], length: int, marker: str) -> str:
+    found = list(_WORD.finditer(text))
+    if len(found) <= length:
+        return text
+    first = next((i for i, m in enumerate(found) if _matched(m[0], query)), 0)
+    start = max(0, min(first - length // 2, len(found) - length)) if first else 0
+    end = start + length
+    cropped = text[found[start].start() : found[end - 1].end()]
+    return (marker if start > 0 else "") + cropped + (marker if end < len(found) else "")
+
+
+class MemoryBackend(Backend):
+    """Keeps indexes in the process, answering searches from an inverted index.
+
+    It implements the part of the MeiliSearch API django-meili uses: indexes,
+    documents, settings, searches with the filters, sorts, geo filters and
+    geo sorts `IndexQuerySet` builds, highlighting, cropping, ranking scores,
+    distinct attributes, multi-search and federated search, similar documents
+    and hybrid searches given a vector, and tasks. Every task is processed as
+    it is enqueued. Relevancy is simpler than MeiliSearch's: documents rank by
+    the number of query words they contain (the last word matching as a
+    prefix), then by `sort`, then by the searchable attribute they matched in,
+    with no typo tolerance.
+
+    Select it with `MEILISEARCH["BACKEND"] = "memory"`.
+    """
+
+    def __init__(self, config: Config | None = None):
+        super().__init__(config)
+        self.lock = RLock()
+        self.indexes: dict[str, _Index] = {}
+        self.tasks: list[dict] = []
+
+    def dump(self) -> tuple[dict, list]:
+        """Return a copy of the backend's indexes and tasks, for `load`."""
+
+        with self.lock:
+            return deepcopy((self.indexes, self.tasks))
+
+    def load(self, state: tuple[dict, list]):
+        """Restore indexes and tasks returned by `dump`."""
+
+        with self.lock:
+            self.indexes, self.tasks = deepcopy(state)
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Any = None,
+        content_type: str | None = None,
+    ) -> Any:
+        url = urlparse(path)
+        parts = [unquote(part) for part in url.path.split("/") if part]
+        params = dict(parse_qsl(url.query))
+        if isinstance(body, (bytes, str)):
+            text = body.decode() if isinstance(body, bytes) else body
+            if "ndjson" in (content_type or ""):
+                body = [loads(line) for line in text.splitlines() if line.strip()]
+            else:
+                body = loads(text) if text.strip() else None
+        elif body is not None:
+            # A copy, so nothing the caller changes later leaks into the index.
+            body = loads(dumps(body, default=str))
+        with self.lock:
+            return self._route(method.upper(), parts, params, body)
+
+    def _index(self, uid: str) -> _Index:
+        index = self.indexes.get(uid)
+        if index is None:
+            raise _error(404, "index_not_found", f"Index `{uid}` not found.")
+        return index
+
+    def _enqueue(self, index_uid: str | None, type: str, process: Callable[[], dict | None]) -> dict:
+        now = _now()
+        task = {
+            "uid": len(self.tasks),
+            "indexUid": index_uid,
+            "status": "succeeded",
+            "type": type,
+            "details": {},
+            "error": None,
+            "duration": "PT0S",
+            "enqueuedAt": now,
+            "startedAt": now,
+            "finishedAt": now,
+        }
+        try:
+            task["details"] = process() or {}
+        except _TaskError as e:
+            task["status"] = "failed"
+            task["error"] = {
+                "message": e.message,
+                "code": e.code,
+                "type": "invalid_request",
+                "link": f"https://docs.meilisearch.com/errors#{e.code}",
+            }
+        except MeilisearchApiError as e:
+            task["status"] = "failed"
+            task["error"] = {"message": e.message, "code": e.code, "type": e.type, "link": e.link}
+        self.tasks.append(task)
+        return {
+            "taskUid": task["uid"],
+            "indexUid": index_uid,
+            "status": "enqueued",
+            "type": type,
+            "enqueuedAt": now,
+        }
+
+    def _created(self, uid: str, primary_key: str | None = None) -> _Index:
+        """Get an index, creating it as writing to a missing index does."""
+
+        if uid not in self.indexes:
+            self.indexes[uid] = _Index(uid, primary_key)
+        return self.indexes[uid]
+
+    def _route(self, method: str, parts: list[str], params: dict, body: Any) -> Any:
+        match (method, parts):
+            case ("GET", ["health"]):
+                return {"status": "available"}
+            case ("GET", ["version"]):
+                return {"pkgVersion": "memory", "commitSha": "", "commitDate": ""}
+            case ("GET", ["indexes"]):
+                offset, limit = int(params.get("offset", 0)), int(params.get("limit", 20))
+                indexes = [index.describe() for index in self.indexes.values()]
+                return {
+                    "results": indexes[offset : offset + limit],
+                    "offset": offset,
+                    "limit": limit,
+                    "total": len(indexes),
+                }
+            case ("POST", ["indexes"]):
+                uid = body["uid"]
+
+                def create():
+                    if uid in self.indexes:
+                        raise _TaskError("index_already_exists", f"Index `{uid}` already exists.")
+                    self._created(uid, body.get("primaryKey"))
+                    return {"primaryKey": body.get("primaryKey")}
+
+                return self._enqueue(uid, "indexCreation", create)
+            case ("GET", ["indexes", uid]):
+                return self._index(uid).describe()
+            case ("PATCH", ["indexes", uid]):
+
+                def update():
+                    self._index(uid).primary_key = body.get("primaryKey")
+                    return {"primaryKey": body.get("primaryKey")}
+
+                return self._enqueue(uid, "indexUpdate", update)
+            case ("DELETE", ["indexes", uid]):
+
+                def delete():
+                    index = self._index(uid)
+                    del self.indexes[uid]
+                    return {"deletedDocuments": len(index.documents)}
+
+                return self._enqueue(uid, "indexDeletion", delete)
+            case ("POST", ["swap-indexes"]):
+
+                def swap():
+                    for swap in body:
+                        a, b = swap["indexes"]
+                        first, second = self._index(a), self._index(b)
+                        first.uid, second.uid = b, a
+                        self.indexes[a], self.indexes[b] = second, first
+                    return {"swaps": body}
+
+                return self._enqueue(None, "indexSwap", swap)
+            case ("GET", ["indexes", uid, "stats"]):
+                index = self._index(uid)
+                distribution: dict[str, int] = {}
+                for document in index.documents.values():
+                    for key in document:
+                        distribution[key] = distribution.get(key, 0) + 1
+                return {
+                    "numberOfDocuments": len(index.documents),
+                    "isIndexing": False,
+                    "fieldDistribution": distribution,
+                }
+            case ("GET", ["indexes", uid, "settings"]):
+                return deepcopy(self._index(uid).settings)
+            case ("PATCH" | "PUT", ["indexes", uid, "settings"]):
+                return self._enqueue(
+                    uid, "settingsUpdate", lambda: self._created(uid).update_settings(body)
+                )
+            case ("DELETE", ["indexes", uid, "settings"]):
+                return self._enqueue(
+                    uid,
+                    "settingsUpdate",
+                    lambda: self._index(uid).update_settings(dict.fromkeys(_DEFAULT_SETTINGS)),
+                )
+            case ("GET", ["indexes", uid, "settings", route]) if route in _SETTING_ROUTES:
+                return deepcopy(self._index(uid).settings[_SETTING_ROUTES[route]])
+            case ("PATCH" | "PUT" | "DELETE", ["indexes", uid, "settings", route]) if route in _SETTING_ROUTES:
+                name = _SETTING_ROUTES[route]
+                return self._enqueue(
+                    uid,
+                    "settingsUpdate",
+                    lambda: self._created(uid).update_settings(
+                        {name: None if method == "DELETE" else body}
+                    ),
+                )
+            case ("POST" | "PUT", ["indexes", uid, "documents"]):
+                documents = body if isinstance(body, list) else [body]
+                return self._enqueue(
+                    uid,
+                    "documentAdditionOrUpdate",
+                    lambda: self._created(uid).put(
+                        documents, params.get("primaryKey"), replace=method == "POST"
+                    ),
+                )
+            case ("GET", ["indexes", uid, "documents"]):
+                return self._documents(self._index(uid), params | {
+                    "fields": params["fields"].split(",") if "fields" in params else None
+                })
+            case ("POST", ["indexes", uid, "documents", "fetch"]):
+                return self._documents(self._index(uid), body or {})
+            case ("GET", ["indexes", uid, "documents", id]):
+                index = self._index(uid)
+                if id not in index.documents:
+                    raise _error(404, "document_not_found", f"Document `{id}` not found.")
+                fields = params["fields"].split(",") if "fields" in params else None
+                return _fields(index.documents[id], fields)
+            case ("POST", ["indexes", uid, "documents", "delete-batch"]):
+                return self._enqueue(
+                    uid, "documentDeletion", lambda: self._index(uid).delete(body)
+                )
+            case ("POST", ["indexes", uid, "documents", "delete"]):
+
+                def delete_by_filter():
+                    index = self._index(uid)
+                    matches = index.compile_filter(body.get("filter"))
+                    index.delete([id for id, d in index.documents.items() if matches(d)])
+
+                return self._enqueue(uid, "documentDeletion", delete_by_filter)
+            case ("DELETE", ["indexes", uid, "documents", id]):
+                return self._enqueue(
+                    uid, "documentDeletion", lambda: self._index(uid).delete([id])
+                )
+            case ("DELETE", ["indexes", uid, "documents"]):
+                return self._enqueue(
+                    uid,
+                    "documentDeletion",
+                    lambda: self._index(uid).delete(list(self._index(uid).documents)),
+                )
+            case ("POST", ["indexes", uid, "search"]):
+                return self._search(self._index(uid), body or {})
+            case ("POST", ["indexes", uid, "similar"]):
+                return self._similar(self._index(uid), body)
+            case ("POST", ["multi-search"]):
+                return self._multi_search(body)
+            case ("GET", ["tasks"]):
+                tasks = list(reversed(self.tasks))
+                limit = int(params.get("limit", 20))
+                return {
+                    "results": deepcopy(tasks[:limit]),
+                    "total": len(tasks),
+                    "limit": limit,
+                    "from": tasks[0]["uid"] if tasks else None,
+                    "next": tasks[limit]["uid"] if len(tasks) > limit else None,
+                }
+            case ("GET", ["tasks", uid]):
+                if not uid.isdigit() or int(uid) >= len(self.tasks):
+                    raise _error(404, "task_not_found", f"Task `{uid}` not found.")
+                return deepcopy(self.tasks[int(uid)])
+        raise _error(
+            404,
+            "not_implemented",
+            f"{method} /{'/'.join(parts)} is not implemented by the memory backend.",
+        )
+
+    def _documents(self, index: _Index, body: dict) -> dict:
+        matches = index.compile_filter(body.get("filter"))
+        if body.get("ids") is not None:
+            ids = [str(id) for id in body["ids"] if str(id) in index.documents]
+        else:
+            ids = list(index.documents)
+        documents = [index.documents[id] for id in ids if matches(index.documents[id])]
+        offset, limit = int(body.get("offset") or 0), int(body.get("limit") or 20)
+        return {
+            "results": [_fields(d, body.get("fields")) for d in documents[offset : offset + limit]],
+            "offset": offset,
+            "limit": limit,
+            "total": len(documents),
+        }
+
+    def _search(self, index: _Index, body: dict) -> dict:
+        ranked, distances = index.rank(body)
+        offset = body.get("offset") or 0
+        limit = body.get("limit") if body.get("limit") is not None else 20
+        return {
+            "hits": [
+                index.hit(id, body, score, distances.get(id))
+                for id, score in ranked[offset : offset + limit]
+            ],
+            "query": body.get("q") or "",
+            "processingTimeMs": 0,
+            "offset": offset,
+            "limit": limit,
+            "estimatedTotalHits": len(ranked),
+        }
+
+    def _similar(self, index: _Index, body: dict) -> dict:
+        id, embedder = str(body["id"]), body["embedder"]
+        if id not in index.documents:
+            raise _error(400, "invalid_similar_id", f"Document `{id}` not found.")
+        vector = (index.documents[id].get("_vectors") or {}).get(embedder)
+        if isinstance(vector, dict):
+            vector = vector.get("embeddings")
+        if not vector:
+            raise _error(400, "invalid_similar_id", f"Document `{id}` has no `{embedder}` vector.")
+        if isinstance(vector[0], list):
+            vector = vector[0]
+        matches = index.compile_filter(body.get("filter"))
+        scored = [
+            (similarity, other)
+            for other, document in index.documents.items()
+            if other != id
+            and matches(document)
+            and (similarity := _similarity(document, embedder, vector)) is not None
+        ]
+        scored.sort(key=lambda pair: -pair[0])
+        offset = body.get("offset") or 0
+        limit = body.get("limit") if body.get("limit") is not None else 20
+        return {
+            "hits": [
+                index.hit(other, body, max(similarity, 0.0), None)
+                for similarity, other in scored[offset : offset + limit]
+            ],
+            "id": body["id"],
+            "processingTimeMs": 0,
+            "offset": offset,
+            "limit": limit,
+            "estimatedTotalHits": len(scored),
+        }
+
+    def _multi_search(self, body: dict) -> dict:
+        federation = body.get("federation")
+        if federation is None:
+            return {
+                "results": [
+                    self._search(self._index(query["indexUid"]), query)
+                    | {"indexUid": query["indexUid"]}
+                    for query in body["queries"]
+                ]
+            }
+        # Hits are merged by ranking score, scaled by the weight of their query.
+        merged = []
+        for position, query in enumerate(body["queries"]):
+            index = self._index(query["indexUid"])
+            weight = (query.get("federationOptions") or {}).get("weight", 1.0)
+            ranked, distances = index.rank(query)
+            for rank, (id, score) in enumerate(ranked):
+                merged.append((-score * weight, position, rank, id, score, distances.get(id)))
+        merged.sort(key=lambda entry: entry[:3])
+        offset = federation.get("offset") or 0
+        limit = federation.get("limit") if federation.get("limit") is not None else 20
+        hits = []
+        for weighted, position, _, id, score, distance in merged[offset : offset + limit]:
+            query = body["queries"][position]
+            hit = self.indexes[query["indexUid"]].hit(id, query, score, distance)
+            hit["_federation"] = {
+                "indexUid": query["indexUid"],
+                "queriesPosition": position,
+                "weightedRankingScore": round(-weighted, 4),
+            }
+            hits.append(hit)
+        return {
+            "hits": hits,
+            "processingTimeMs": 0,
+            "offset": offset,
+            "limit": limit,
+            "estimatedTotalHits": len(merged),
+        }
+
+
+def _fields(document: dict, fields: list[str] | None) -> dict:
+    if not fields or "*" in fields:
+        return deepcopy(document)
+    return {key: deepcopy(value) for key, value in document.items() if key in fields}
@@ -0,0 +1,165 @@
+"""
+backends/recording.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the backends recording MeiliSearch traffic to a file and replaying it.
+"""
+
+from collections import deque
+from json import dumps, loads
+from os import PathLike
+from threading import Lock
+from time import perf_counter, sleep
+from typing import Any
+
+import requests
+from meilisearch._httprequests import HttpRequests
+from meilisearch.config import Config
+from meilisearch.errors import MeilisearchApiError
+
+from . import Backend, api_error
+
+
+def _body(body: Any) -> Any:
+    """The body as written to a recording: JSON values as they are, NDJSON as text."""
+
+    return body.decode() if isinstance(body, bytes) else body
+
+
+def _key(method: str, path: str, body: Any = None) -> str:
+    return dumps([method, path, body], sort_keys=True)
+
+
+class RecordingBackend(Backend):
+    """Sends requests to MeiliSearch, and appends each exchange to a file.
+
+    Every request is written as one JSON line, with its method, path, body,
+    the status and body of the response, and how long MeiliSearch took to
+    answer in seconds, for `ReplayBackend` to serve back later. Errors are
+    recorded too; requests that never got a response are not.
+
+    For example:
+    ```python
+    MEILISEARCH = {
+        "BACKEND": "record",
+        "BACKEND_OPTIONS": {"path": "meilisearch-traffic.jsonl"},
+    }
+    ```
+    """
+
+    def __init__(self, config: Config, path: str | PathLike):
+        super().__init__(config)
+        # HttpRequests is private to meilisearch-python, whose version is capped for it.
+        self.http = HttpRequests(config)
+        self.lock = Lock()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Any = None,
+        content_type: str | None = None,
+    ) -> Any:
+        started = perf_counter()
+        try:
+            response = self.http.send_request(
+                getattr(requests, method.lower()), path, body, content_type
+            )
+        except MeilisearchApiError as e:
+            error = {"message": e.message, "code": e.code, "type": e.type, "link": e.link}
+            self._write(method, path, body, content_type, e.status_code, error, started)
+            raise
+        self._write(method, path, body, content_type, 200, response, started)
+        return response
+
+    def _write(self, method, path, body, content_type, status, response, started):
+        exchange = {
+            "method": method,
+            "path": path,
+            "body": _body(body),
+            "content_type": content_type,
+            "status": status,
+            "response": response,
+            "duration": perf_counter() - started,
+        }
+        line = dumps(exchange) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ReplayBackend(Backend):
+    """Answers requests with the responses in a recording, as slowly as they came.
+
+    A request is answered with the next response recorded for the same method,
+    path and body, after sleeping for as long as MeiliSearch took, scaled by
+    `latency` (0 answers at once). Once every response to a request has been
+    served, they are served again from the first, so a load test can run longer
+    than the recording. With `strict=False`, a request that was never recorded
+    is answered with a response recorded for the same method and path; with the
+    default `strict=True`, it raises a `MeilisearchApiError`.
+
+    For example:
+    ```python
+    MEILISEARCH = {
+        "BACKEND": "replay",
+        "BACKEND_OPTIONS": {"path": "meilisearch-traffic.jsonl", "latency": 1.0},
+    }
+    ```
+    """
+
+    def __init__(
+        self,
+        config: Config | None,
+        path: str | PathLike,
+        latency: float = 1.0,
+        strict: bool = True,
+    ):
+        super().__init__(config)
+        self.latency = latency
+        self.strict = strict
+        self.lock = Lock()
+        self.exchanges: dict[str, deque[dict]] = {}
+        self.by_path: dict[str, deque[dict]] = {}
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    exchange = loads(line)
+                    key = _key(exchange["method"], exchange["path"], exchange["body"])
+                    self.exchanges.setdefault(key, deque()).append(exchange)
+                    self.by_path.setdefault(
+                        _key(exchange["method"], exchange["path"]), deque()
+                    ).append(exchange)
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Any = None,
+        content_type: str | None = None,
+    ) -> Any:
+        recorded = self.exchanges.get(_key(method, path, _body(body)))
+        if recorded is None and not self.strict:
+            recorded = self.by_path.get(_key(method, path))
+        if recorded is None:
+            raise api_error(
+                404,
+                {
+                    "message": f"No response to {method} /{path} was recorded.",
+                    "code": "not_recorded",
+                    "type": "invalid_request",
+                    "link": None,
+                },
+            )
+        with self.lock:
+            exchange = recorded[0]
+            recorded.rotate(-1)
+        if self.latency:
+            sleep(exchange["duration"] * self.latency)
+        if exchange["status"] >= 400:
+            raise api_error(exchange["status"], exchange["response"])
+        return loads(dumps(exchange["response"]))
@@ -0,0 +1,100 @@
+"""
+federation.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains federated search across several indexed models.
+"""
+
+from typing import TYPE_CHECKING, Iterable, Type
+
+from ._client import client
+from .querysets import IndexQuerySet
+
+if TYPE_CHECKING:
+    from .models import IndexMixin
+
+
+def federated_search(
+    q: str,
+    models: Iterable[Type["IndexMixin"] | IndexQuerySet],
+    weights: dict[Type["IndexMixin"], float] | None = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> list["IndexMixin"]:
+    """Search several models at once, returning their rows in a single ranked list.
+
+    Every model is searched in one federated multi-search request, so MeiliSearch
+    merges the hits by ranking score, scaled by each model's weight (1.0 by
+    default). Pass an IndexQuerySet instead of a model to filter, sort, hydrate
+    or route (`.using_index()`) that model's results. Rows are then loaded with
+    one `in_bulk` query per model, and each row's weighted ranking score is set
+    as `meili_score`.
+
+    Requires MeiliSearch 1.10 or newer.
+
+    For example:
+    ```python
+    from django_meili import federated_search
+
+    results = federated_search(
+        "hello",
+        models=[Post, PostNoGeo.meilisearch.filter(title="Hello")],
+        weights={Post: 2.0},
+    )
+    ```
+    """
+
+    querysets = [
+        model if isinstance(model, IndexQuerySet) else model.meilisearch
+        for model in models
+    ]
+    weights = weights or {}
+    queries = []
+    for queryset in querysets:
+        # The offset and limit apply to the merged results, not to each query.
+        params = {
+            key: value
+            for key, value in queryset._params().items()
+            if key not in ("offset", "limit")
+        }
+        queries.append(
+            params
+            | {
+                "indexUid": queryset.index_name,
+                "q": q,
+                "federationOptions": {"weight": weights.get(queryset.model, 1.0)},
+            }
+        )
+    with client.instrumentation.operation(
+        "federated_search", None, query=q, indexes=len(queries)
+    ) as op:
+        results = client.client.multi_search(
+            queries, federation={"offset": offset, "limit": limit}
+        )
+        op.set(hits=len(results.get("hits", [])))
+
+    # Chunks of the same row are collapsed into the row, at its best-ranked hit.
+    ranked: dict[tuple[int, object], float | None] = {}
+    for hit in results.get("hits", []):
+        federation = hit["_federation"]
+        position = federation["queriesPosition"]
+        key = (position, querysets[position]._hit_pk(hit))
+        ranked.setdefault(key, federation.get("weightedRankingScore"))
+
+    pks: dict[int, list] = {}
+    for position, pk in ranked:
+        pks.setdefault(position, []).append(pk)
+    rows: dict[int, dict] = {}
+    for position, ids in pks.items():
+        codec = querysets[position].model._meili_pk_codec()
+        values = codec.to_python(ids)
+        found = querysets[position]._hydration_queryset().in_bulk(values, field_name=codec.lookup)
+        rows[position] = {id: found.get(value) for id, value in zip(ids, values)}
+
+    instances = []
+    for (position, pk), score in ranked.items():
+        # Rows deleted since they were indexed are skipped.
+        if (instance := rows[position].get(pk)) is not None:
+            instance.meili_score = score
+            instances.append(instance)
+    return instances
@@ -5,40 +5,52 @@ Ian Kollipara <ian.kollipara@gmail.com>
 This module contains the ClearIndexCommand class for the Django MeiliSearch app.
 """
 
-from django.apps import apps
+from django.conf import settings
 from django.core.management.base import BaseCommand
 
 from django_meili._client import client as _client
-from django_meili.models import IndexMixin
+from django_meili._registry import resolve_models
+from django_meili.models import DocumentHash
 
 
 class Command(BaseCommand):
-    help = "Clears the MeiliSearch index for the given model."
+    help = "Clears the MeiliSearch index for the given models."
 
     def add_arguments(self, parser):
-        parser.add_argument("model", type=str, help="The model to clear the index for.")
+        parser.add_argument(
+            "models",
+            nargs="*",
+            type=str,
+            help="The models to clear the index for, as <app_name>.<model_name>, an app name, or a glob.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            default=False,
+            help="Clear the index of every model using IndexMixin",
+        )
 
     def handle(self, *args, **options):
-        model = self._resolve_model(options["model"])
-        index = _client.get_index(model._meilisearch["index_name"])
-        task = index.delete_all_documents()
-        finished = _client.wait_for_task(task.task_uid)
-        if finished.status == "failed":
-            raise Exception(finished)
-        self.stdout.write(self.style.SUCCESS(f"Cleared index for {model}"))
-
-    def _resolve_model(self, model: str) -> type[IndexMixin]:
-        """
-        Resolve the model from the given string.
-        """
         try:
-            Model = apps.get_model(model)
-            if IndexMixin not in Model.__mro__:
-                raise ValueError("Model does not inherit from IndexMixin")
+            models = resolve_models(options["models"], options["all"])
         except LookupError as e:
-            self.stdout.write(self.style.ERROR(f"Model not found: {model}"))
-            exit(1)
-        except ValueError as e:
-            self.stdout.write(self.style.ERROR(f"Invalid model: {model}"))
+            self.stderr.write(self.style.ERROR(str(e)))
             exit(1)
-        return Model
+        # Models can share an index, which only needs clearing once. Routed
+        # models clear every index they route documents to.
+        index_names = dict.fromkeys(
+            index_name for model in models for index_name in model._meili_index_names()
+        )
+        # Every index is cleared at once, then waited on.
+        tasks = {}
+        for index_name in index_names:
+            with _client.instrumentation.operation("delete_all_documents", index_name):
+                tasks[index_name] = _client.get_index(index_name).delete_all_documents()
+        for index_name, task in tasks.items():
+            finished = _client.wait_for_task(task.task_uid)
+            if finished.status == "failed":
+                raise Exception(finished)
+            if settings.MEILISEARCH.get("CONTENT_HASHES", False):
+                DocumentHash.objects.forget(index_name)
+        for model in models:
+            self.stdout.write(self.style.SUCCESS(f"Cleared index for {model}"))
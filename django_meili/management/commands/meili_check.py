@@ -0,0 +1,172 @@
+"""
+meili_check.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the MeiliCheckCommand class for the Django MeiliSearch app.
+"""
+
+from collections import deque
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from meilisearch.task import TaskInfo
+
+from django_meili._batching import AdaptiveBatcher, add_batch, delete_documents
+from django_meili._chunking import CHUNK, CHUNKS, chunk_filter, parent_id, row_pk
+from django_meili._client import client as _client
+from django_meili._consistency import compare_rows, orphaned_ids
+from django_meili._registry import resolve_model
+from django_meili.models import DocumentHash, IndexMixin
+
+DEFAULT_BATCH_SIZE = settings.MEILISEARCH.get("DEFAULT_BATCH_SIZE", 1000)
+DEFAULT_MAX_BYTES = settings.MEILISEARCH.get("BATCH_MAX_BYTES", 10_485_760)
+
+# How many ids of each kind of discrepancy are printed in the report.
+SAMPLE_SIZE = 10
+
+
+class Command(BaseCommand):
+    help = "Checks that the MeiliSearch index for the given model matches the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "model",
+            type=str,
+            help="The model to check the index for. This should be in the format <app_name>.<model_name>",
+        )
+        parser.add_argument(
+            "--batch_size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"The number of rows and documents compared at a time (default: {DEFAULT_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--max_bytes",
+            type=int,
+            default=DEFAULT_MAX_BYTES,
+            help=f"The largest payload to send in a single batch when repairing (default: {DEFAULT_MAX_BYTES})",
+        )
+        parser.add_argument(
+            "--content",
+            action="store_true",
+            default=False,
+            help="Also compare the content of every document, not just whether it exists",
+        )
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            default=False,
+            help="Index missing and stale documents, and delete extra ones",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            Model = resolve_model(options["model"])
+        except LookupError as e:
+            self.stderr.write(self.style.ERROR(str(e)))
+            exit(1)
+        if Model._meilisearch["routed"]:
+            # Rows would be compared with the model's index, not the one they are routed to.
+            self.stderr.write(
+                self.style.ERROR(f"{Model._meta.label} routes its documents, which meili_check does not support")
+            )
+            exit(1)
+        index_name = Model._meilisearch["index_name"]
+        index = _client.get_index(index_name)
+        batch_size = options["batch_size"]
+        batcher = AdaptiveBatcher(max_bytes=options["max_bytes"], batch_size=batch_size)
+        counts = {"missing": 0, "stale": 0, "extra": 0}
+        samples = {"missing": [], "stale": [], "extra": []}
+        pending: deque[TaskInfo] = deque()
+        chunked = bool(Model._meilisearch["chunk_fields"])
+
+        def record(kind: str, ids: list[str]):
+            counts[kind] += len(ids)
+            samples[kind].extend(ids[: SAMPLE_SIZE - len(samples[kind])])
+
+        for comparison in compare_rows(Model, index, batch_size, options["content"]):
+            # Rows are reported once, by their first chunk.
+            record("missing", [d["id"] for d in comparison.missing if not d.get(CHUNK)])
+            record("stale", [d["id"] for d in comparison.stale if not d.get(CHUNK)])
+            record("extra", comparison.extra)
+            if options["repair"]:
+                documents = comparison.missing + comparison.stale
+                if documents and settings.MEILISEARCH.get("CONTENT_HASHES", False):
+                    # The stored hashes claimed these documents were indexed.
+                    DocumentHash.objects.forget(
+                        index_name, {parent_id(document) for document in documents}
+                    )
+                if Model._meilisearch["embeds"]:
+                    self._embed(Model, documents)
+                for batch in batcher.batches(documents):
+                    pending.append(add_batch(Model, index_name, batch))
+                if chunked and comparison.stale:
+                    # Stale rows may have had more chunks than they have now.
+                    chunk_counts = {parent_id(d): d[CHUNKS] for d in comparison.stale}
+                    pending.append(
+                        delete_documents(index_name, [], chunk_filter(counts=chunk_counts))
+                    )
+                if comparison.extra:
+                    filter = chunk_filter(comparison.extra) if chunked else None
+                    pending.append(delete_documents(index_name, comparison.extra, filter))
+
+        # Deleting while paging through the index would shift the pages, so
+        # orphans are only deleted once the whole index has been read.
+        orphans = [
+            id for ids in orphaned_ids(Model, index, batch_size) for id in ids
+        ]
+        record("extra", orphans)
+        if options["repair"]:
+            for start in range(0, len(orphans), batch_size):
+                pending.append(
+                    delete_documents(index_name, orphans[start : start + batch_size])
+                )
+        while pending:
+            self._wait(pending.popleft())
+
+        for kind, count in counts.items():
+            if count:
+                sample = ", ".join(samples[kind])
+                more = ", ..." if count > len(samples[kind]) else ""
+                self.stdout.write(f"{count} {kind} documents: {sample}{more}")
+        if not any(counts.values()):
+            self.stdout.write(
+                self.style.SUCCESS(f"Index for {options['model']} is consistent")
+            )
+        elif options["repair"]:
+            self.stdout.write(
+                self.style.SUCCESS(f"Repaired index for {options['model']}")
+            )
+        else:
+            self.stdout.write(
+                self.style.ERROR(f"Index for {options['model']} is inconsistent")
+            )
+            exit(1)
+
+    def _embed(self, Model: type[IndexMixin], documents: list[dict]):
+        """
+        Add the vectors of their rows to the first documents of the given rows.
+        """
+
+        primary_key = Model._meilisearch["primary_key"]
+        firsts = [document for document in documents if not document.get(CHUNK)]
+        rows = Model._base_manager.in_bulk([row_pk(d, primary_key) for d in firsts])
+        # Rows deleted since they were compared are left to the orphan check.
+        found = [
+            (document, rows[pk])
+            for document in firsts
+            if (pk := Model._meta.pk.to_python(row_pk(document, primary_key))) in rows
+        ]
+        vectors = Model._meili_vectors([instance for _, instance in found])
+        for (document, _), row_vectors in zip(found, vectors):
+            document["_vectors"] = row_vectors
+
+    def _wait(self, task: TaskInfo):
+        """
+        Wait for the given task, exiting if it failed.
+        """
+
+        finished = _client.wait_for_task(task.task_uid)
+        if finished.status == "failed":
+            self.stderr.write(self.style.ERROR(finished.error))
+            exit(1)
@@ -0,0 +1,49 @@
+"""
+replayoutbox.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the ReplayOutboxCommand class for the Django MeiliSearch app.
+"""
+
+from django.core.management.base import BaseCommand
+from meilisearch.errors import MeilisearchError
+
+from django_meili._breaker import is_unavailable
+from django_meili._outbox import DEFAULT_BATCH_SIZE, replay_outbox
+from django_meili.models import PendingWrite
+
+
+class Command(BaseCommand):
+    help = "Sends the writes kept while MeiliSearch was unavailable."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch_size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"The number of writes replayed at a time (default: {DEFAULT_BATCH_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        pending = PendingWrite.objects.count()
+        if not pending:
+            self.stdout.write(self.style.SUCCESS("The outbox is empty"))
+            return
+        self.stdout.write(f"Replaying {pending} writes")
+        try:
+            stats = replay_outbox(options["batch_size"])
+        except MeilisearchError as e:
+            if not is_unavailable(e):
+                raise
+            self.stderr.write(
+                self.style.ERROR(
+                    f"MeiliSearch is still unavailable ({e}), "
+                    f"{PendingWrite.objects.count()} writes are left"
+                )
+            )
+            exit(1)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {stats['indexed']} and deleted {stats['deleted']} documents"
+            )
+        )
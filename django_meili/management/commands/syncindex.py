@@ -5,88 +5,503 @@ Ian Kollipara <ian.kollipara@gmail.com>
 This module contains the SyncIndexCommand class for the Django MeiliSearch app.
 """
 
-from typing import TYPE_CHECKING
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import chain, groupby
+from operator import itemgetter
+from threading import BoundedSemaphore
 
-from django.apps import apps
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import connections
+from meilisearch.task import TaskInfo
 
+from django_meili._batching import AdaptiveBatcher, TaskQueue, add_batch, delete_documents
+from django_meili._chunking import (
+    CHUNKS,
+    chunk_filter,
+    is_last_chunk,
+    parent_id,
+    row_pk,
+)
 from django_meili._client import client as _client
-from django_meili.models import IndexMixin
+from django_meili._consistency import orphaned_ids
+from django_meili._progress import Progress
+from django_meili._registry import resolve_models
+from django_meili._sharding import setup_worker, shard_bounds, sync_shard
+from django_meili.models import DocumentHash, IndexMixin, SyncCheckpoint
 
 DEFAULT_BATCH_SIZE = settings.MEILISEARCH.get("DEFAULT_BATCH_SIZE", 1000)
+DEFAULT_MAX_BYTES = settings.MEILISEARCH.get("BATCH_MAX_BYTES", 10_485_760)
+DEFAULT_TARGET_DURATION = settings.MEILISEARCH.get("BATCH_TARGET_DURATION", 5.0)
 
+# How many batches may be enqueued in MeiliSearch before waiting on the oldest.
+# Waiting is what feeds task durations back into the batcher, so keep it small.
+MAX_IN_FLIGHT = 2
 
-def batch_qs(qs, batch_size=DEFAULT_BATCH_SIZE):
-    """
-    Returns a (start, end, total, queryset) tuple for each batch in the given
-    queryset.
-
-    Usage:
-        # Make sure to order your querset
-        article_qs = Article.objects.order_by('id')
-        for start, end, total, qs in batch_qs(article_qs):
-            print "Now processing %s - %s of %s" % (start + 1, end, total)
-            for article in qs:
-                print article.body
-    """
-    total = qs.count()
-    for start in range(0, total, batch_size):
-        end = min(start + batch_size, total)
-        yield qs[start:end]
+# How many tasks may be in flight across every model synced at once.
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_CONCURRENCY = 4
 
 
 class Command(BaseCommand):
-    help = "Syncs the MeiliSearch index for the given model."
+    help = "Syncs the MeiliSearch index for the given models."
+
+    # Bounds the tasks in flight across the models synced concurrently.
+    in_flight: BoundedSemaphore | None = None
 
     def add_arguments(self, parser):
         parser.add_argument(
-            "model",
+            "models",
+            nargs="*",
             type=str,
-            help="The model to sync the index for. This should be in the format <app_name>.<model_name>",
+            help="The models to sync the index for, as <app_name>.<model_name>, an app name, or a glob like posts.Post*",
         )
         parser.add_argument(
-            "--batch_size",
+            "--all",
             action="store_true",
+            default=False,
+            help="Sync the index of every model using IndexMixin",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=DEFAULT_CONCURRENCY,
+            help=f"The number of indexes to sync at the same time (default: {DEFAULT_CONCURRENCY})",
+        )
+        parser.add_argument(
+            "--max_in_flight",
+            type=int,
+            default=DEFAULT_MAX_IN_FLIGHT,
+            help=f"The number of MeiliSearch tasks in flight across every index (default: {DEFAULT_MAX_IN_FLIGHT})",
+        )
+        parser.add_argument(
+            "--batch_size",
+            type=int,
             default=DEFAULT_BATCH_SIZE,
-            help="The batch size you want to import in (default: 1000)",
+            help=f"The number of documents to start batching with (default: {DEFAULT_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--max_bytes",
+            type=int,
+            default=DEFAULT_MAX_BYTES,
+            help=f"The largest payload to send in a single batch (default: {DEFAULT_MAX_BYTES})",
+        )
+        parser.add_argument(
+            "--target_duration",
+            type=float,
+            default=DEFAULT_TARGET_DURATION,
+            help="The seconds MeiliSearch should spend per batch, used to grow or shrink batches",
+        )
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            default=False,
+            help="Also delete documents whose rows no longer exist in the database",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            default=False,
+            help="Send every document, even if its stored content hash is unchanged",
+        )
+        parser.add_argument(
+            "--shards",
+            type=int,
+            default=1,
+            help="The number of pk ranges to split the table into (default: 1)",
+        )
+        parser.add_argument(
+            "--shard",
+            type=int,
+            default=None,
+            help="Only sync this shard, counting from 0. Use one per host to spread a sync across hosts",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="The number of processes to sync shards in, one shard per process unless --shards is given",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            default=False,
+            help="Continue from the checkpoint of an interrupted sync, instead of starting over",
         )
 
     def handle(self, *args, **options):
-        Model = self._resolve_model(options["model"])
-        tasks = []
-        for qs in batch_qs(Model.objects.all(), options["batch_size"]):
-            tasks.append(_client.get_index(Model._meilisearch["index_name"]).add_documents(
-                [self._serialize(m) for m in qs if m.meili_filter()]
-            ))
-        for task in tasks:
-            finished = _client.wait_for_task(task.task_uid)
-            if finished.status == "failed":
-                self.stderr.write(self.style.ERROR(finished.error))
+        try:
+            Models = resolve_models(options["models"], options["all"])
+        except LookupError as e:
+            self.stderr.write(self.style.ERROR(str(e)))
+            exit(1)
+        shards, shard, processes = options["shards"], options["shard"], options["processes"]
+        if processes > 1 and shard is not None:
+            self.stderr.write(self.style.ERROR("--shard cannot be used with --processes"))
+            exit(1)
+        if processes > 1 and shards == 1:
+            shards = processes
+        if shard is not None and not 0 <= shard < shards:
+            self.stderr.write(self.style.ERROR(f"--shard must be between 0 and {shards - 1}"))
+            exit(1)
+
+        self.in_flight = BoundedSemaphore(max(options["max_in_flight"], 1))
+        # Models sharing an index are synced one after the other, so their
+        # deletes and pruning never race; separate indexes run concurrently.
+        groups: dict[str, list[type[IndexMixin]]] = {}
+        for Model in Models:
+            groups.setdefault(Model._meilisearch["index_name"], []).append(Model)
+        concurrency = 1 if processes > 1 else min(options["concurrency"], len(groups))
+
+        def sync_group(group: list[type[IndexMixin]]) -> Counter:
+            stats = Counter()
+            for Model in group:
+                stats += self._sync_model(Model, options, shards, shard, processes)
+            return stats
+
+        stats = Counter()
+        if concurrency <= 1:
+            for group in groups.values():
+                stats += sync_group(group)
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                futures = [
+                    pool.submit(self._in_thread, sync_group, group)
+                    for group in groups.values()
+                ]
+                for future in as_completed(futures):
+                    stats += future.result()
+        if len(Models) > 1:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Synced {len(Models)} models: {stats['indexed']} documents indexed, "
+                    f"{stats['unchanged']} unchanged, {stats['deleted']} deleted"
+                )
+            )
+
+    def _in_thread(self, function, *args):
+        """
+        Run the function in a worker thread, closing the thread's database connections after.
+        """
+
+        try:
+            return function(*args)
+        finally:
+            connections.close_all()
+
+    def _sync_model(
+        self,
+        Model: type[IndexMixin],
+        options: dict,
+        shards: int,
+        shard: int | None,
+        processes: int,
+    ) -> Counter:
+        """
+        Sync the index of a single model, by shard if requested.
+        """
+
+        bounds, tags = self._plan(Model, shards, options["resume"])
+        if processes > 1:
+            stats = self._sync_in_processes(Model, options, bounds, tags, processes)
+        elif shard is not None:
+            stats = self._sync(Model, options, *bounds[shard], tags[shard])
+        else:
+            stats = Counter()
+            for k, (lower, upper) in enumerate(bounds):
+                stats += self._sync(Model, options, lower, upper, tags[k])
+                if shards > 1:
+                    self._progress(k, shards, stats)
+
+        # Orphans can be anywhere in the index, so only one shard looks for them.
+        if options["prune"] and shard in (None, 0):
+            stats["deleted"] += self._prune(Model, options)
+        model = Model._meta.label
+        if stats["unchanged"]:
+            self.stdout.write(f"Skipped {stats['unchanged']} unchanged documents for {model}")
+        if stats["deleted"]:
+            self.stdout.write(f"Deleted {stats['deleted']} stale documents for {model}")
+        label = model if shard is None else f"{model} (shard {shard + 1}/{shards})"
+        self.stdout.write(self.style.SUCCESS(f"Synced index for {label}"))
+        return stats
+
+    def _plan(
+        self, Model: type[IndexMixin], shards: int, resume: bool = False
+    ) -> tuple[list[tuple], list[str]]:
+        """
+        Return the pk range and checkpoint name of each shard.
+
+        The ranges are saved by the first syncindex to plan them, and read back
+        by every later one until each shard finished, so hosts running
+        `--shard K` split the table the same way however its rows change.
+        Resuming with another number of shards than the checkpoints were
+        saved for is refused, as their ranges would not line up.
+        """
+
+        model = Model._meta.label
+        # Each shard keeps its own checkpoint, named after its position.
+        tags = [f"{k + 1}/{shards}" if shards > 1 else "" for k in range(shards)]
+        while True:
+            plan = SyncCheckpoint.objects.plan(model)
+            if sorted(plan) == sorted(tags):
+                break
+            if resume and plan:
+                self.stderr.write(
+                    self.style.ERROR(
+                        f"The checkpoints of {model} are for --shards {len(plan)}, "
+                        "resume with the same --shards"
+                    )
+                )
                 exit(1)
-        self.stdout.write(self.style.SUCCESS(f"Synced index for {options['model']}"))
+            bounds = shard_bounds(Model, shards)
+            if SyncCheckpoint.objects.create_plan(model, dict(zip(tags, bounds)), plan.values()):
+                return bounds, tags
+
+        def to_python(pk: str | None):
+            return None if pk is None else Model._meta.pk.to_python(pk)
+
+        return [(to_python(plan[tag].lower), to_python(plan[tag].upper)) for tag in tags], tags
+
+    def _sync_in_processes(
+        self,
+        Model: type[IndexMixin],
+        options: dict,
+        bounds: list[tuple],
+        tags: list[str],
+        processes: int,
+    ) -> Counter:
+        """
+        Sync every shard in a pool of processes, reporting each one as it finishes.
+        """
 
-    def _serialize(self, model: IndexMixin) -> dict:
+        # Only plain values can be sent to the workers, not e.g. the stdout wrapper.
+        shard_options = {
+            key: options[key]
+            for key in ("batch_size", "max_bytes", "target_duration", "force", "resume")
+        }
+        # Forked workers must not share the parent's database connections.
+        connections.close_all()
+        stats = Counter()
+        with ProcessPoolExecutor(max_workers=processes, initializer=setup_worker) as pool:
+            futures = [
+                pool.submit(sync_shard, Model._meta.label, shard_options, lower, upper, tag)
+                for (lower, upper), tag in zip(bounds, tags)
+            ]
+            for done, future in enumerate(as_completed(futures)):
+                stats += future.result()
+                self._progress(done, len(futures), stats)
+        return stats
+
+    def _progress(self, done: int, shards: int, stats: Counter):
+        self.stdout.write(
+            f"Synced {done + 1}/{shards} shards: {stats['indexed']} documents indexed"
+        )
+
+    def _sync(
+        self,
+        Model: type[IndexMixin],
+        options: dict,
+        lower=None,
+        upper=None,
+        shard: str = "",
+    ) -> Counter:
         """
-        Serialize the model instance into a dictionary.
+        Sync the rows with a pk in [lower, upper), or every row when unbounded.
+
+        Progress is checkpointed under the given shard name after every
+        acknowledged batch, and the shard is marked as finished at the end.
+        Returns how many documents were indexed, skipped as unchanged and deleted.
+
+        For models overriding meili_index_name, each chunk of rows is grouped by
+        index so every index still gets full batches, and the checkpoint only
+        moves once a whole chunk is acknowledged.
         """
 
-        serialized = model.meili_serialize()
-        pk = model._meta.pk.value_to_string(model)
-        return serialized | {"id": pk, "pk": pk}
+        batcher = AdaptiveBatcher(
+            max_bytes=options["max_bytes"],
+            batch_size=options["batch_size"],
+            target_duration=options["target_duration"],
+        )
+        content_hashes = settings.MEILISEARCH.get("CONTENT_HASHES", False)
+        queryset = Model.objects.order_by("pk")
+        if lower is not None:
+            queryset = queryset.filter(pk__gte=lower)
+        if upper is not None:
+            queryset = queryset.filter(pk__lt=upper)
+        label = f"{Model._meta.label} shard {shard}: " if shard else f"{Model._meta.label}: "
+        checkpoint = None
+        if options.get("resume"):
+            if SyncCheckpoint.objects.finished(Model._meta.label, shard):
+                self.stdout.write(f"{label}Already synced")
+                return Counter()
+            checkpoint = SyncCheckpoint.objects.last_pk(Model._meta.label, shard)
+        else:
+            SyncCheckpoint.objects.start(Model._meta.label, shard)
+        if checkpoint is not None:
+            self.stdout.write(f"{label}Resuming after pk {checkpoint}")
+            queryset = queryset.filter(pk__gt=Model._meta.pk.to_python(checkpoint))
+        progress = Progress(queryset.count(), self.stdout.write, label=label)
+        chunked = bool(Model._meilisearch["chunk_fields"])
+        routed = Model._meilisearch["routed"]
+        # Rows that fail meili_filter may still have a document from before they
+        # stopped qualifying, so their ids are collected and deleted in batches.
+        filtered_out: dict[str, list[str]] = {}
+        # The number of chunks of each chunked row sent, to delete any past it.
+        chunk_counts: dict[str, dict[str, int]] = {}
+        # The pk closing each chunk of rows, by the last document sent for it.
+        chunk_ends: dict[int, str] = {}
+        stats = Counter()
+        queue = TaskQueue(lambda task: self._wait(task, batcher), MAX_IN_FLIGHT, self.in_flight)
+
+        def flush_deletes():
+            # Deletes are enqueued before the next batch, so once that batch is
+            # acknowledged every row up to its last pk has been handled.
+            for index_name in filtered_out.keys() | chunk_counts.keys():
+                ids = filtered_out.get(index_name, [])
+                stats["deleted"] += len(ids)
+                filter = chunk_filter(ids, chunk_counts.get(index_name)) if chunked else None
+                Model._meili_ensure_index(index_name)
+                queue.submit(
+                    lambda index_name=index_name, ids=ids, filter=filter: delete_documents(
+                        index_name, ids, filter
+                    )
+                )
+            filtered_out.clear()
+            chunk_counts.clear()
+
+        def documents():
+            # Chunks are read by seeking past the last pk rather than through one long
+            # cursor, so no read lock or transaction is held while documents upload.
+            rows = queryset
+            while chunk := list(rows[: options["batch_size"]]):
+                rows = queryset.filter(pk__gt=chunk[-1].pk)
+                progress.advance(len(chunk))
+                qualifying: dict[str, list[IndexMixin]] = {}
+                for instance in chunk:
+                    index_name = instance.meili_index_name()
+                    if instance.meili_filter():
+                        qualifying.setdefault(index_name, []).append(instance)
+                    else:
+                        filtered_out.setdefault(index_name, []).append(
+                            instance._meili_document_id()
+                        )
+                if sum(map(len, filtered_out.values())) >= options["batch_size"]:
+                    flush_deletes()
+                # The last document is held back until the chunk is done, so it can
+                # be marked as closing the chunk before the batcher sees it.
+                last = None
+                for index_name, instances in qualifying.items():
+                    stored = (
+                        DocumentHash.objects.lookup(
+                            index_name, [i._meili_document_id() for i in instances]
+                        )
+                        if content_hashes and not options["force"]
+                        else None
+                    )
+                    # Documents are built a row at a time, so a row split into many
+                    # chunks streams into the batches without being held at once.
+                    # Geo points are read and validated column-wise for the whole chunk.
+                    geos = (
+                        Model._meili_geo_points(instances)
+                        if Model._meilisearch["supports_geo"]
+                        else [None] * len(instances)
+                    )
+                    pending = []
+                    for instance, geo in zip(instances, geos):
+                        row = instance._meili_documents(geo=geo)
+                        first = next(row)
+                        if stored is not None and stored.get(parent_id(first)) == first["_hash"]:
+                            stats["unchanged"] += first.get(CHUNKS, 1)
+                            continue
+                        pending.append((instance, first, row))
+                    # Vectors are computed for the whole chunk at once, skipping unchanged rows.
+                    vectors = Model._meili_vectors([instance for instance, _, _ in pending])
+                    for (_, first, row), row_vectors in zip(pending, vectors):
+                        if row_vectors is not None:
+                            first["_vectors"] = row_vectors
+                        if chunked:
+                            chunk_counts.setdefault(index_name, {})[parent_id(first)] = first[CHUNKS]
+                        for document in chain((first,), row):
+                            if last is not None:
+                                yield last
+                            last = (index_name, document)
+                if last is not None:
+                    if routed:
+                        chunk_ends[id(last[1])] = str(chunk[-1].pk)
+                    yield last
+
+        def indexed(index_name, batch):
+            # Tasks finish in the order they are enqueued, so once a batch is
+            # indexed every row whose last document it holds is a safe checkpoint.
+            complete = [d for d in batch.documents if is_last_chunk(d)]
+            if content_hashes and complete:
+                DocumentHash.objects.remember(
+                    index_name, {parent_id(d): d["_hash"] for d in complete}
+                )
+            if routed:
+                # Rows are regrouped by index within a chunk, so only whole chunks count.
+                ends = [chunk_ends.pop(id(d)) for d in batch.documents if id(d) in chunk_ends]
+                if ends:
+                    SyncCheckpoint.objects.record(Model._meta.label, shard, ends[-1])
+            elif complete:
+                SyncCheckpoint.objects.record(
+                    Model._meta.label,
+                    shard,
+                    row_pk(complete[-1], Model._meilisearch["primary_key"]),
+                )
+
+        # Consecutive documents for the same index are batched together.
+        for index_name, documents_for_index in groupby(documents(), key=itemgetter(0)):
+            Model._meili_ensure_index(index_name)
+            for batch in batcher.batches(document for _, document in documents_for_index):
+                flush_deletes()
+                queue.submit(
+                    lambda: add_batch(Model, index_name, batch),
+                    lambda task, index_name=index_name, batch=batch: indexed(index_name, batch),
+                )
+                stats["indexed"] += len(batch.documents)
+        flush_deletes()
+        queue.join()
+        SyncCheckpoint.objects.finish(Model._meta.label, shard)
+        progress.report()
+        return stats
 
-    def _resolve_model(self, model: str):
+    def _prune(self, Model: type[IndexMixin], options: dict) -> int:
         """
-        Resolve the model from the given string.
+        Delete the documents whose rows no longer exist, returning how many there were.
+
+        For models overriding meili_index_name, every routed index in
+        MeiliSearch (see meili_routes_to) is pruned as well.
         """
-        try:
-            Model = apps.get_model(model)
-            if IndexMixin not in Model.__mro__:
-                raise ValueError("Model does not inherit from IndexMixin")
-        except LookupError as e:
-            self.stdout.write(self.style.ERROR(f"Model not found: {model}"))
-            exit(1)
-        except ValueError as e:
-            self.stdout.write(self.style.ERROR(f"Invalid model: {model}"))
+
+        index_names = Model._meili_index_names()
+        batcher = AdaptiveBatcher(max_bytes=options["max_bytes"], batch_size=options["batch_size"])
+        queue = TaskQueue(lambda task: self._wait(task, batcher), MAX_IN_FLIGHT, self.in_flight)
+        deleted = 0
+        for index_name in index_names:
+            # Deleting while paging through the index would shift the pages,
+            # so orphans are only deleted once the whole index has been read.
+            orphans = [
+                id
+                for ids in orphaned_ids(Model, _client.get_index(index_name), options["batch_size"])
+                for id in ids
+            ]
+            for start in range(0, len(orphans), options["batch_size"]):
+                ids = orphans[start : start + options["batch_size"]]
+                queue.submit(lambda: delete_documents(index_name, ids))
+            deleted += len(orphans)
+        queue.join()
+        return deleted
+
+    def _wait(self, task: TaskInfo, batcher: AdaptiveBatcher):
+        """
+        Wait for the given task and feed its duration back into the batcher.
+        """
+
+        finished = _client.wait_for_task(task.task_uid)
+        if finished.status == "failed":
+            self.stderr.write(self.style.ERROR(finished.error))
             exit(1)
-        return Model
+        if finished.type == "documentAdditionOrUpdate":
+            batcher.record(finished)
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_meili', '0002_synccheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingWrite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=255)),
+                ('index_name', models.CharField(max_length=255)),
+                ('document_id', models.CharField(max_length=511)),
+                ('action', models.CharField(choices=[('index', 'Index'), ('delete', 'Delete')], max_length=6)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('model', 'index_name', 'document_id'), name='django_meili_pending_write')],
+            },
+        ),
+    ]
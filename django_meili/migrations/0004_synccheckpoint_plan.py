@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_meili', '0003_pendingwrite'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='synccheckpoint',
+            name='finished',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='synccheckpoint',
+            name='lower',
+            field=models.CharField(max_length=511, null=True),
+        ),
+        migrations.AddField(
+            model_name='synccheckpoint',
+            name='upper',
+            field=models.CharField(max_length=511, null=True),
+        ),
+        migrations.AlterField(
+            model_name='synccheckpoint',
+            name='last_pk',
+            field=models.CharField(max_length=511, null=True),
+        ),
+    ]
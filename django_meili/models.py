@@ -5,14 +5,20 @@ Ian Kollipara <ian.kollipara@gmail.com>
 This module contains the models for the Django MeiliSearch app.
 """
 
-from typing import Iterable, TypedDict
+from typing import Iterable, Iterator, Self, Sequence, TypedDict
 
 from django.conf import settings
-from django.db import models
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, connections, models, transaction
+from django.utils import timezone
 from meilisearch.models.task import TaskInfo
 
+from ._chunking import CHUNK, CHUNKS, PARENT, split_text
 from ._client import client as _client
-from .querysets import IndexQuerySet
+from ._consistency import content_hash
+from ._hits import Hit, make_hit_class
+from ._pk import PkCodec
+from .querysets import IndexQuerySet, valid_coordinates
 
 # Create your models here.
 
@@ -30,9 +36,22 @@ class _Meili(TypedDict):
     filterable_fields: Iterable[str] | None
     sortable_fields: Iterable[str] | None
     supports_geo: bool
+    geo_fields: tuple[str, str] | None
+    include_pk_in_search: bool
+    tracked_fields: Iterable[str] | None
+    truncate_fields: dict[str, int] | None
+    chunk_fields: dict[str, int] | None
+    tenant_field: str | None
+    embedders: dict[str, dict] | None
+    embeds: bool
+    routed: bool
     tasks: list[TaskInfo]
 
 
+# Marks a tracked field whose value was not loaded (e.g. because of .only() or .defer()).
+_UNKNOWN = object()
+
+
 class IndexMixin(models.Model):
     """
     Mixin to provide Meilisearch Index for the given model.
@@ -47,14 +66,30 @@ class IndexMixin(models.Model):
     - filterable_fields: The fields to filter on.
     - sortable_fields: The fields to sort on.
     - supports_geo: Whether the model supports geolocation.
+    - geo_fields: The latitude and longitude fields, read by the default meili_geo (implies supports_geo).
     - index_name: The name of the index in Meilisearch.
     - primary_key: The primary key for the model.
     - include_pk_in_search: include the pk in the search results
+    - tracked_fields: The fields whose changes trigger reindexing on save.
+      Defaults to the serialized fields, unless meili_serialize, meili_geo or
+      meili_filter is overridden, in which case every save reindexes the document.
+    - truncate_fields: Map of field name to the most characters of it to index.
+    - chunk_fields: Map of field name to the most characters of it per document.
+      Longer values are split across several documents sharing a `_parent`
+      attribute, and search collapses them back into one result per row.
+      The index must be keyed by an integer or UUID field.
+    - tenant_field: The field tenant tokens restrict searches on (see `Client.tenant_token_for`).
+    - embedders: Map of embedder name to its MeiliSearch settings, for semantic and hybrid search.
 
     This mixin also defines a few methods that can be overridden:
     - meili_filter: A function to decide if the model should be added to meilisearch.
     - meili_serialize: How to serialize the model to a dictionary to be used by meilisearch.
     - meili_geo: Return the geo-location for the model. (If the model supports geolocation, else raise a ValueError.)
+    - meili_queryset: The base queryset search results are loaded from.
+    - meili_fallback_search: How to search the database while MeiliSearch is unavailable.
+    - meili_index_name: The index the instance's document is stored in, to route documents into several indexes.
+    - meili_routes_to: Whether an index in MeiliSearch is one of the indexes meili_index_name routes to.
+    - meili_embed: Compute the vectors of many instances at once, for `userProvided` embedders.
 
     Example:
     ```python
@@ -78,15 +113,30 @@ class IndexMixin(models.Model):
     meilisearch: IndexQuerySet
     _meilisearch: _Meili
 
+    # Whether this instance's document is known to be in the index (None when unknown).
+    _meili_in_index: bool | None = None
+
+    # Set on search results by IndexQuerySet.highlight, crop and with_ranking_score.
+    meili_formatted: dict | None = None
+    meili_score: float | None = None
+    # Set on search results sorted by geoPoint, in meters.
+    meili_geo_distance: int | None = None
+
     class MeiliMeta:
         displayed_fields: Iterable[str] = None
         searchable_fields: Iterable[str] = None
         filterable_fields: Iterable[str] = None
         sortable_fields: Iterable[str] = None
         supports_geo: bool = False
+        geo_fields: tuple[str, str] = None
         index_name: str = None
         primary_key: str = "pk"
         include_pk_in_search: bool = False
+        tracked_fields: Iterable[str] = None
+        truncate_fields: dict[str, int] = None
+        chunk_fields: dict[str, int] = None
+        tenant_field: str = None
+        embedders: dict[str, dict] = None
 
     def __init_subclass__(cls) -> None:
         index_name = getattr(cls.MeiliMeta, "index_name", cls.__name__)
@@ -95,13 +145,49 @@ class IndexMixin(models.Model):
         searchable_fields = getattr(cls.MeiliMeta, "searchable_fields", None)
         filterable_fields = getattr(cls.MeiliMeta, "filterable_fields", None)
         sortable_fields = getattr(cls.MeiliMeta, "sortable_fields", None)
-        supports_geo = getattr(cls.MeiliMeta, "supports_geo", False)
+        geo_fields = getattr(cls.MeiliMeta, "geo_fields", None)
+        supports_geo = getattr(cls.MeiliMeta, "supports_geo", False) or geo_fields is not None
         include_pk_in_search = getattr(cls.MeiliMeta, "include_pk_in_search", False)
+        tracked_fields = getattr(cls.MeiliMeta, "tracked_fields", None)
+        truncate_fields = getattr(cls.MeiliMeta, "truncate_fields", None)
+        chunk_fields = getattr(cls.MeiliMeta, "chunk_fields", None)
+        tenant_field = getattr(cls.MeiliMeta, "tenant_field", None)
+        embedders = getattr(cls.MeiliMeta, "embedders", None)
+        embeds = cls.meili_embed.__func__ is not IndexMixin.meili_embed.__func__
+        routed = cls.meili_index_name is not IndexMixin.meili_index_name
+
+        # Without an explicit list, changes can only be detected when the
+        # document is built from the model's fields by the default methods.
+        if tracked_fields is None and (
+            cls.meili_serialize is IndexMixin.meili_serialize
+            and cls.meili_geo is IndexMixin.meili_geo
+            and cls.meili_filter is IndexMixin.meili_filter
+        ):
+            tracked_fields = tuple(
+                {
+                    *(displayed_fields or []),
+                    *(searchable_fields or []),
+                    *(filterable_fields or []),
+                    *([tenant_field] if tenant_field is not None else []),
+                    *(geo_fields or []),
+                }
+            )
 
         if supports_geo:
             filterable_fields = ("_geo",) + (filterable_fields or ())
             sortable_fields = ("_geo",) + (sortable_fields or ())
 
+        if tenant_field is not None and tenant_field not in (filterable_fields or ()):
+            # Tenant tokens filter on it, so it has to be filterable.
+            filterable_fields = (tenant_field,) + (filterable_fields or ())
+
+        if chunk_fields:
+            # The chunks of a row are found by their parent, both to collapse
+            # search hits and to delete the chunks a row no longer has.
+            filterable_fields = (PARENT, CHUNK) + (filterable_fields or ())
+            if displayed_fields is not None:
+                displayed_fields = (*displayed_fields, PARENT)
+
         if settings.MEILISEARCH.get("OFFLINE", False):
             cls._meilisearch = _Meili(
                 primary_key=primary_key,
@@ -111,7 +197,15 @@ class IndexMixin(models.Model):
                 filterable_fields=filterable_fields,
                 sortable_fields=sortable_fields,
                 supports_geo=supports_geo,
+                geo_fields=geo_fields,
                 include_pk_in_search=include_pk_in_search,
+                tracked_fields=tracked_fields,
+                truncate_fields=truncate_fields,
+                chunk_fields=chunk_fields,
+                tenant_field=tenant_field,
+                embedders=embedders,
+                embeds=embeds,
+                routed=routed,
                 tasks=[],
             )
         else:
@@ -121,6 +215,8 @@ class IndexMixin(models.Model):
                 searchable_fields,
                 filterable_fields,
                 sortable_fields,
+                distinct_attribute=PARENT if chunk_fields else None,
+                embedders=embedders,
             )
 
         cls._meilisearch = _Meili(
@@ -131,13 +227,137 @@ class IndexMixin(models.Model):
             filterable_fields=filterable_fields,
             sortable_fields=sortable_fields,
             supports_geo=supports_geo,
+            geo_fields=geo_fields,
             include_pk_in_search=include_pk_in_search,
+            tracked_fields=tracked_fields,
+            truncate_fields=truncate_fields,
+            chunk_fields=chunk_fields,
+            tenant_field=tenant_field,
+            embedders=embedders,
+            embeds=embeds,
+            routed=routed,
             tasks=[task for task in _client.tasks],
         )
         _client.flush_tasks()
 
         cls.meilisearch = IndexQuerySet(cls)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._meili_snapshot()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        self._meili_snapshot(fields)
+
+    @classmethod
+    def _meili_tracked_attnames(cls) -> dict[str, str] | None:
+        """Map each tracked field name to its attname, or None if changes are not tracked."""
+
+        if "_meili_attnames" not in cls.__dict__:
+            tracked = cls._meilisearch["tracked_fields"]
+            cls._meili_attnames = (
+                {
+                    field.name: field.attname
+                    for field in cls._meta.concrete_fields
+                    if field.name in tracked and not field.primary_key
+                }
+                if tracked is not None
+                else None
+            )
+        return cls._meili_attnames
+
+    @classmethod
+    def _meili_hit_class(cls) -> type[Hit]:
+        """Return the class raw search hits are built as, generated on first use."""
+
+        if "_meili_hits" not in cls.__dict__:
+            cls._meili_hits = make_hit_class(cls)
+        return cls._meili_hits
+
+    @classmethod
+    def _meili_pk_codec(cls) -> PkCodec:
+        """Return the converter between key field values and document ids, built on first use."""
+
+        # The model's fields don't exist yet in __init_subclass__, so it can't be built there.
+        if "_meili_pk" not in cls.__dict__:
+            codec = PkCodec(cls)
+            if cls._meilisearch["chunk_fields"] and not codec.chunkable:
+                raise ImproperlyConfigured(
+                    f"{cls._meta.label} uses chunk_fields, so its index must be keyed by an "
+                    f"integer or UUID field, not {codec.field.get_internal_type()}"
+                )
+            cls._meili_pk = codec
+        return cls._meili_pk
+
+    def _meili_snapshot(self, fields: Iterable[str] | None = None) -> None:
+        """Remember the indexed field values, to compare against on save."""
+
+        custom_filter = type(self).meili_filter is not IndexMixin.meili_filter
+        if fields is None and custom_filter:
+            # An overridden meili_filter may read deferred fields or relations, so
+            # rather than running it for every loaded row, the loaded values are
+            # kept for `_meili_was_indexed` to evaluate it on, if a save needs it.
+            self.__dict__["_meili_loaded"] = {
+                field.attname: self.__dict__.get(field.attname, _UNKNOWN)
+                for field in self._meta.concrete_fields
+            }
+        attnames = self._meili_tracked_attnames()
+        if attnames is None:
+            return
+        snapshot = self.__dict__.setdefault("_meili_indexed", {})
+        for name, attname in attnames.items():
+            if fields is None or name in fields or attname in fields:
+                snapshot[name] = self.__dict__.get(attname, _UNKNOWN)
+        if fields is None and not custom_filter and _UNKNOWN not in snapshot.values():
+            self._meili_in_index = self.meili_filter()
+
+    def _meili_was_indexed(self) -> bool | None:
+        """Return whether the instance's document is in the index, or None when unknown.
+
+        For a model overriding meili_filter, it is evaluated on the values the
+        instance was loaded with, the first time a save or delete needs to know,
+        so saving a row that never qualified makes no request.
+        """
+
+        if self._meili_in_index is None:
+            loaded = self.__dict__.pop("_meili_loaded", None)
+            if loaded is not None and _UNKNOWN not in loaded.values():
+                # A fresh instance, so no related object cached since loading is reused.
+                previous = type(self).from_db(self._state.db, list(loaded), list(loaded.values()))
+                self._meili_in_index = previous.meili_filter()
+        return self._meili_in_index
+
+    def _meili_changed_fields(
+        self, update_fields: Iterable[str] | None = None
+    ) -> set[str] | None:
+        """Return the tracked fields that changed since the model was loaded or saved.
+
+        Returns None when changes cannot be known (untracked model, or an instance
+        that was never loaded from the database), meaning the whole document
+        should be reindexed.
+        """
+
+        attnames = self._meili_tracked_attnames()
+        snapshot = self.__dict__.get("_meili_indexed")
+        if attnames is None or snapshot is None:
+            return None
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            attnames = {
+                name: attname
+                for name, attname in attnames.items()
+                if name in update_fields or attname in update_fields
+            }
+        return {
+            name
+            for name, attname in attnames.items()
+            if snapshot.get(name, _UNKNOWN) is _UNKNOWN
+            or snapshot[name] != self.__dict__.get(attname, _UNKNOWN)
+        }
+
     def meili_filter(self) -> bool:
         """
         A function to decide if the model should be added to meilisearch.
@@ -155,19 +375,30 @@ class IndexMixin(models.Model):
         How to serialize the model to a dictionary to be used by meilisearch.
 
         By default uses django.core.serializers.serialize and json.loads
-        Only serializes fields defined in displayed_fields, searchable_fields, and filterable_fields.
+        Only serializes fields defined in displayed_fields, searchable_fields, filterable_fields and tenant_field.
         """
 
-        from json import loads
+        return self._meili_serialize_fields(self._meili_document_fields())
 
-        from django.core.serializers import serialize
+    @classmethod
+    def _meili_document_fields(cls) -> set[str]:
+        """The fields the default meili_serialize puts in the document."""
 
-        fields = {
-            *(self.MeiliMeta.displayed_fields or []),
-            *(self.MeiliMeta.searchable_fields or []),
-            *(self.MeiliMeta.filterable_fields or []),
+        tenant_field = cls._meilisearch["tenant_field"]
+        return {
+            *(cls.MeiliMeta.displayed_fields or []),
+            *(cls.MeiliMeta.searchable_fields or []),
+            *(cls.MeiliMeta.filterable_fields or []),
+            *([tenant_field] if tenant_field is not None else []),
         }
 
+    def _meili_serialize_fields(self, fields: Iterable[str]) -> dict:
+        """Serialize only the given fields, the way meili_serialize does."""
+
+        from json import loads
+
+        from django.core.serializers import serialize
+
         serialized_model = loads(
             serialize(
                 "json",
@@ -185,13 +416,544 @@ class IndexMixin(models.Model):
 
         return serialized_model["fields"]
 
+    def _meili_truncate(self, document: dict) -> dict:
+        """Cut the fields in truncate_fields down to their maximum length."""
+
+        for field, length in (self._meilisearch["truncate_fields"] or {}).items():
+            if isinstance(document.get(field), str):
+                document[field] = document[field][:length]
+        return document
+
+    def _meili_document(self) -> dict:
+        """Build the full document sent to MeiliSearch for this instance.
+
+        For a model with chunk_fields, this is the first of its documents.
+        """
+
+        return next(self._meili_documents())
+
+    def _meili_documents(
+        self,
+        vectors: dict[str, list[float]] | None = None,
+        geo: MeiliGeo | None = _UNKNOWN,
+    ) -> Iterator[dict]:
+        """Yield the documents sent to MeiliSearch for this instance.
+
+        Without chunk_fields there is a single document. Otherwise each chunked
+        field is split with `split_text` and the n-th piece of every field goes
+        into the n-th document, alongside the row's other fields. The first
+        document keeps the row's id and the others get `<id>-<n>`; all of them
+        carry the row's id in `_parent`, their position in `_chunk` and their
+        number in `_chunks`. Documents are built one at a time, so a caller
+        streaming them holds the split text once plus the current document.
+
+        The row's vectors, if given, are only added to its first document, and
+        are left out of its hash since they follow from its content. Its geo
+        point is computed unless given, as syncindex does for whole chunks.
+        """
+
+        codec = type(self)._meili_pk_codec()
+        id = codec.document_id(self)
+        pk = id if codec.lookup == "pk" else self._meta.pk.value_to_string(self)
+        document = self._meili_truncate(self.meili_serialize()) | {"id": id, "pk": pk}
+        if self._meilisearch["supports_geo"]:
+            if geo is _UNKNOWN:
+                geo = type(self)._meili_geo_points([self])[0]
+            if geo is not None:
+                document["_geo"] = geo
+        # Every document of a row shares the hash of its whole content, so
+        # that syncindex can skip or resend a row's documents together.
+        hash = (
+            content_hash(document)
+            if settings.MEILISEARCH.get("CONTENT_HASHES", False)
+            else None
+        )
+        chunk_fields = self._meilisearch["chunk_fields"]
+        if not chunk_fields:
+            if vectors is not None:
+                document["_vectors"] = vectors
+            yield document if hash is None else document | {"_hash": hash}
+            return
+
+        pieces = {}
+        for field, size in chunk_fields.items():
+            value = document.pop(field, None)
+            pieces[field] = split_text(value, size) if isinstance(value, str) else [value]
+        chunks = max(len(values) for values in pieces.values())
+        primary_key = self._meilisearch["primary_key"]
+        for n in range(chunks):
+            chunk = document | {
+                field: values[n] if n < len(values) else ""
+                for field, values in pieces.items()
+            }
+            chunk |= {PARENT: id, CHUNK: n, CHUNKS: chunks}
+            if n:
+                chunk["id"] = chunk[primary_key] = f"{id}-{n}"
+            elif vectors is not None:
+                chunk["_vectors"] = vectors
+            if hash is not None:
+                chunk["_hash"] = hash
+            yield chunk
+
+    def _meili_document_id(self) -> str:
+        """Return the value of the index's primary key for this instance."""
+
+        return type(self)._meili_pk_codec().document_id(self)
+
+    @classmethod
+    def meili_queryset(cls) -> models.QuerySet:
+        """
+        The base queryset search results are loaded from.
+
+        Override this to hydrate search results through a custom manager,
+        or to always apply select_related/prefetch_related/only.
+
+        By default it returns all objects from the default manager.
+        """
+
+        return cls._default_manager.all()
+
+    @classmethod
+    def meili_fallback_search(cls, queryset: models.QuerySet, q: str) -> models.QuerySet:
+        """
+        Search the given queryset for q, in place of MeiliSearch while it is unavailable.
+
+        Used by `search` when `MEILISEARCH["SEARCH_FALLBACK"]` is "database".
+        Override this to use your database's full-text search instead.
+
+        By default it keeps the rows containing every word of q, case-insensitively,
+        in any of the searchable text fields (every text field without searchable_fields).
+
+        Example:
+        ```python
+        @classmethod
+        def meili_fallback_search(cls, queryset, q):
+            return queryset.filter(search_vector=SearchQuery(q))
+        ```
+        """
+
+        searchable = cls._meilisearch["searchable_fields"]
+        fields = [
+            field.name
+            for field in cls._meta.concrete_fields
+            if isinstance(field, (models.CharField, models.TextField))
+            and (searchable is None or field.name in searchable)
+        ]
+        if not fields:
+            return queryset.none()
+        for word in q.split():
+            match = models.Q()
+            for field in fields:
+                match |= models.Q(**{f"{field}__icontains": word})
+            queryset = queryset.filter(match)
+        return queryset
+
+    def meili_index_name(self) -> str:
+        """
+        The name of the index this instance's document is stored in.
+
+        Override this to split documents into several smaller indexes, e.g. one
+        per tenant or per month, and search one of them with `.using_index()`.
+        Each routed index is created with the model's settings the first time a
+        document is sent to it. An instance must keep the same index once indexed,
+        and the routed indexes must be recognised by meili_routes_to.
+
+        By default it returns the MeiliMeta index_name.
+        """
+
+        return self._meilisearch["index_name"]
+
+    @classmethod
+    def meili_routes_to(cls, index_name: str) -> bool:
+        """
+        Whether the given index holds documents routed by meili_index_name.
+
+        `syncindex --prune` and `clearindex` find the routed indexes by listing
+        every index in MeiliSearch and keeping the ones this returns True for.
+        The index of another model is never taken for a routed one.
+
+        By default it matches the MeiliMeta index_name followed by an underscore.
+
+        Example:
+        ```python
+        @classmethod
+        def meili_routes_to(cls, index_name):
+            return index_name.startswith("posts_")
+        ```
+        """
+
+        return index_name.startswith(f"{cls._meilisearch['index_name']}_")
+
+    @classmethod
+    def _meili_index_names(cls) -> list[str]:
+        """The model's index, followed by every routed index of it in MeiliSearch."""
+
+        index_names = {cls._meilisearch["index_name"]: None}
+        if not cls._meilisearch["routed"]:
+            return list(index_names)
+        # Routed indexes this process created are known to be the model's.
+        index_names.update(
+            (index_name, None)
+            for index_name, Model in _client.known_indexes.items()
+            if Model is cls
+        )
+        if not settings.MEILISEARCH.get("OFFLINE", False):
+            others = {
+                Model._meilisearch["index_name"]
+                for Model in cls._meta.apps.get_models()
+                if issubclass(Model, IndexMixin) and Model is not cls
+            }
+            index_names.update(
+                (index.uid, None)
+                for index in _client.get_indexes()
+                if index.uid not in others and cls.meili_routes_to(index.uid)
+            )
+        return list(index_names)
+
+    @classmethod
+    def meili_embed(cls, instances: Sequence[Self]) -> dict[str, Sequence[Sequence[float]]]:
+        """
+        Compute the vectors of the given instances, for each `userProvided` embedder.
+
+        Return a map of embedder name to one vector per instance, in order, such
+        as a 2D NumPy array. syncindex calls this once per chunk of rows, so a
+        local embedding model encodes whole batches rather than a row at a time.
+
+        Example:
+        ```python
+        @classmethod
+        def meili_embed(cls, instances):
+            return {"default": model.encode([post.body for post in instances])}
+        ```
+        """
+
+        raise NotImplementedError
+
+    @classmethod
+    def _meili_vectors(cls, instances: Sequence[Self]) -> list[dict[str, list[float]] | None]:
+        """The `_vectors` of each instance, or None for each if meili_embed isn't defined."""
+
+        if not cls._meilisearch["embeds"] or not instances:
+            return [None] * len(instances)
+        embeddings = {
+            name: vectors.tolist() if hasattr(vectors, "tolist") else [list(v) for v in vectors]
+            for name, vectors in cls.meili_embed(instances).items()
+        }
+        return [
+            {name: vectors[i] for name, vectors in embeddings.items()}
+            for i in range(len(instances))
+        ]
+
+    @classmethod
+    def _meili_ensure_index(cls, index_name: str) -> None:
+        """Create a routed index with the model's settings, the first time it is used."""
+
+        if index_name == cls._meilisearch["index_name"] or index_name in _client.known_indexes:
+            return
+        if not settings.MEILISEARCH.get("OFFLINE", False):
+            cls._meili_create_index(index_name)
+        _client.known_indexes[index_name] = cls
+
+    @classmethod
+    def _meili_create_index(cls, index_name: str) -> None:
+        """Create the given index, if missing, and apply the model's settings to it."""
+
+        meili = cls._meilisearch
+        _client.create_index(index_name, meili["primary_key"]).with_settings(
+            index_name,
+            meili["displayed_fields"],
+            meili["searchable_fields"],
+            meili["filterable_fields"],
+            meili["sortable_fields"],
+            distinct_attribute=PARENT if meili["chunk_fields"] else None,
+            embedders=meili["embedders"],
+        )
+
+    @classmethod
+    def _meili_geo_points(cls, instances: Sequence[Self]) -> list[MeiliGeo | None]:
+        """The `_geo` of each instance, validated.
+
+        With geo_fields, the coordinates are read column-wise and each column's
+        range is checked at once; rows are only checked one by one to report
+        the invalid ones. Rows without coordinates get no `_geo`.
+
+        Raises a ValueError for coordinates MeiliSearch would reject.
+        """
+
+        geo_fields = cls._meilisearch["geo_fields"]
+        if geo_fields is None or cls.meili_geo is not IndexMixin.meili_geo:
+            return [instance.meili_geo() for instance in instances]
+        lat_field, lng_field = geo_fields
+        lats = [getattr(instance, lat_field) for instance in instances]
+        lngs = [getattr(instance, lng_field) for instance in instances]
+        try:
+            valid = not instances or (
+                -90 <= min(lats) and max(lats) <= 90 and -180 <= min(lngs) and max(lngs) <= 180
+            )
+        except TypeError:
+            # A column holds missing coordinates, so every row has to be checked.
+            valid = False
+        if not valid:
+            invalid = [
+                instance.pk
+                for instance, lat, lng in zip(instances, lats, lngs)
+                if not (lat is None and lng is None) and not valid_coordinates(lat, lng)
+            ]
+            if invalid:
+                raise ValueError(f"Invalid coordinates for {cls.__name__} rows: {invalid}")
+        return [
+            None if lat is None and lng is None else {"lat": lat, "lng": lng}
+            for lat, lng in zip(lats, lngs)
+        ]
+
     def meili_geo(self) -> MeiliGeo:
         """Return the geo-location for the model.
 
-        If the model does not support geolocation, raise a ValueError.
+        By default it reads MeiliMeta.geo_fields. If the model does not support
+        geolocation, raise a ValueError.
         """
 
-        raise ValueError("Model does not support geolocation")
+        geo_fields = self._meilisearch["geo_fields"]
+        if geo_fields is None:
+            raise ValueError("Model does not support geolocation")
+        return type(self)._meili_geo_points([self])[0]
 
     class Meta:
         abstract = True
+
+
+def _upsert(
+    manager: models.Manager,
+    objs: list[models.Model],
+    unique_fields: list[str],
+    update_fields: list[str],
+) -> None:
+    """Insert the rows, updating the given fields of those that conflict, in one statement.
+
+    MySQL and MariaDB can't name the conflicting fields, and update on any
+    unique constraint instead, which is the same one here.
+    """
+
+    if not connections[manager.db].features.supports_update_conflicts_with_target:
+        unique_fields = None
+    manager.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=update_fields,
+    )
+
+
+class DocumentHashManager(models.Manager):
+    def lookup(self, index_name: str, ids: Iterable[str]) -> dict[str, str]:
+        """Return the stored hash of each of the given documents that has one."""
+
+        return dict(
+            self.filter(index_name=index_name, document_id__in=list(ids)).values_list(
+                "document_id", "hash"
+            )
+        )
+
+    def remember(self, index_name: str, hashes: dict[str, str]) -> None:
+        """Store the hashes of documents MeiliSearch has finished indexing."""
+
+        _upsert(
+            self,
+            [
+                self.model(index_name=index_name, document_id=id, hash=hash)
+                for id, hash in hashes.items()
+            ],
+            unique_fields=["index_name", "document_id"],
+            update_fields=["hash"],
+        )
+
+    def forget(self, index_name: str, ids: Iterable[str] | None = None) -> None:
+        """Drop the stored hashes of the given documents, or of the whole index."""
+
+        queryset = self.filter(index_name=index_name)
+        if ids is not None:
+            queryset = queryset.filter(document_id__in=list(ids))
+        queryset.delete()
+
+
+class DocumentHash(models.Model):
+    """
+    The content hash of a document as it was last indexed by syncindex.
+
+    Used when `MEILISEARCH["CONTENT_HASHES"]` is on, so that syncindex only sends
+    documents whose content changed. Hashes are only stored once MeiliSearch has
+    finished indexing the document, and are dropped whenever the document is
+    written or deleted by any other path.
+    """
+
+    index_name = models.CharField(max_length=255)
+    document_id = models.CharField(max_length=511)
+    hash = models.CharField(max_length=32)
+
+    objects = DocumentHashManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["index_name", "document_id"], name="django_meili_document_hash"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.index_name}/{self.document_id}"
+
+
+class SyncCheckpointManager(models.Manager):
+    def plan(self, model: str) -> dict[str, "SyncCheckpoint"]:
+        """Return the saved checkpoint of each shard of the model, by shard name."""
+
+        return {checkpoint.shard: checkpoint for checkpoint in self.filter(model=model)}
+
+    def create_plan(
+        self, model: str, bounds: dict[str, tuple], stale: Iterable["SyncCheckpoint"] = ()
+    ) -> bool:
+        """Save the (lower, upper) pk range of each shard, replacing the stale checkpoints.
+
+        Returns False if another syncindex saved a plan for the model first, in
+        which case that plan should be read back and used instead.
+        """
+
+        try:
+            with transaction.atomic():
+                # Only the rows that were read are deleted, so a plan another
+                # syncindex just saved in their place is never lost.
+                self.filter(pk__in=[checkpoint.pk for checkpoint in stale]).delete()
+                self.bulk_create(
+                    self.model(
+                        model=model,
+                        shard=shard,
+                        lower=None if lower is None else str(lower),
+                        upper=None if upper is None else str(upper),
+                    )
+                    for shard, (lower, upper) in bounds.items()
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    def last_pk(self, model: str, shard: str = "") -> str | None:
+        """Return the last pk syncindex had acknowledged for the model, if any."""
+
+        return (
+            self.filter(model=model, shard=shard)
+            .values_list("last_pk", flat=True)
+            .first()
+        )
+
+    def finished(self, model: str, shard: str = "") -> bool:
+        """Return whether the shard was synced to the end by an earlier run."""
+
+        return self.filter(model=model, shard=shard, finished=True).exists()
+
+    def start(self, model: str, shard: str = "") -> None:
+        """Forget the progress of the shard, as it is synced from the start again."""
+
+        self.filter(model=model, shard=shard).update(
+            last_pk=None, finished=False, updated_at=timezone.now()
+        )
+
+    def record(self, model: str, shard: str, last_pk: str) -> None:
+        """Remember that every row of the shard up to `last_pk` has been indexed."""
+
+        self.filter(model=model, shard=shard).update(last_pk=last_pk, updated_at=timezone.now())
+
+    def finish(self, model: str, shard: str = "") -> None:
+        """Mark the shard as synced, and forget the plan once every shard is."""
+
+        self.filter(model=model, shard=shard).update(finished=True, updated_at=timezone.now())
+        if not self.filter(model=model, finished=False).exists():
+            self.filter(model=model).delete()
+
+
+class SyncCheckpoint(models.Model):
+    """
+    The pk range of each shard of a syncindex run, and how far it got.
+
+    The ranges are saved by the first syncindex to start, so every host running
+    `--shard K` syncs the same ranges, and `syncindex --resume` continues from
+    them. The plan is removed once every shard finished.
+    """
+
+    model = models.CharField(max_length=255)
+    shard = models.CharField(max_length=32, blank=True, default="")
+    lower = models.CharField(max_length=511, null=True)
+    upper = models.CharField(max_length=511, null=True)
+    last_pk = models.CharField(max_length=511, null=True)
+    finished = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = SyncCheckpointManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model", "shard"], name="django_meili_sync_checkpoint"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.shard}".strip()
+
+
+class PendingWriteManager(models.Manager):
+    def divert(self, model: str, index_name: str, document_id: str, action: str) -> None:
+        """Keep a write MeiliSearch could not take, replacing any earlier one for the document."""
+
+        _upsert(
+            self,
+            [
+                self.model(
+                    model=model, index_name=index_name, document_id=document_id, action=action
+                )
+            ],
+            unique_fields=["model", "index_name", "document_id"],
+            update_fields=["action", "updated_at"],
+        )
+
+    def settle(self, writes: Iterable["PendingWrite"]) -> None:
+        """Drop the given writes once replayed, unless they were diverted again since."""
+
+        query = models.Q()
+        for write in writes:
+            query |= models.Q(pk=write.pk, updated_at=write.updated_at)
+        if query:
+            self.filter(query).delete()
+
+
+class PendingWrite(models.Model):
+    """
+    A document write kept while MeiliSearch was unavailable, for `replayoutbox` to send later.
+
+    Used when `MEILISEARCH["CIRCUIT_BREAKER"]` is on. Only the latest write of each
+    document is kept, and the row is read again when the write is replayed, so
+    the document sent is always current.
+    """
+
+    INDEX = "index"
+    DELETE = "delete"
+
+    model = models.CharField(max_length=255)
+    index_name = models.CharField(max_length=255)
+    document_id = models.CharField(max_length=511)
+    action = models.CharField(
+        max_length=6, choices=[(INDEX, "Index"), (DELETE, "Delete")]
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PendingWriteManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model", "index_name", "document_id"],
+                name="django_meili_pending_write",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.index_name}/{self.document_id}"
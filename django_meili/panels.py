@@ -0,0 +1,65 @@
+"""
+panels.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the Django Debug Toolbar panel for the Django MeiliSearch app.
+
+Add it to the toolbar with:
+```python
+DEBUG_TOOLBAR_PANELS = [
+    # ...,
+    "django_meili.panels.MeiliSearchPanel",
+]
+```
+"""
+
+from debug_toolbar.panels import Panel
+from django.utils.translation import gettext_lazy as _
+from django.utils.translation import ngettext
+
+from ._client import client as _client
+
+
+class MeiliSearchPanel(Panel):
+    """Lists every MeiliSearch call made while handling the request."""
+
+    title = _("MeiliSearch")
+    template = "django_meili/panels/meilisearch.html"
+    capturing = False
+    initial = 0
+
+    @property
+    def nav_subtitle(self):
+        stats = self.get_stats()
+        searches = stats.get("searches", 0)
+        return ngettext(
+            "%(searches)d search in %(time).2fms",
+            "%(searches)d searches in %(time).2fms",
+            searches,
+        ) % {"searches": searches, "time": stats.get("total_time", 0)}
+
+    def enable_instrumentation(self):
+        if self.capturing:
+            return
+        log = _client.instrumentation.log
+        log.forced += 1
+        self.capturing = True
+        self.initial = log.count
+
+    def disable_instrumentation(self):
+        if self.capturing:
+            _client.instrumentation.log.forced -= 1
+            self.capturing = False
+
+    def generate_stats(self, request, response):
+        queries = [
+            query | {"duration": query["duration"] * 1000}
+            for query in _client.instrumentation.log.since(self.initial)
+        ]
+        self.record_stats(
+            {
+                "queries": queries,
+                "searches": sum(1 for q in queries if q["operation"] == "search"),
+                "total_time": sum(q["duration"] for q in queries),
+            }
+        )
@@ -6,11 +6,20 @@ This module contains the QuerySet classes for the Django MeiliSearch app.
 """
 
 # Imports
-from typing import TYPE_CHECKING, Literal, NamedTuple, Self, Type
-
-from django.db.models import Case, When
-
+from copy import copy
+from json import dumps
+from typing import TYPE_CHECKING, Any, Iterable, Literal, NamedTuple, Self, Sequence, Type
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Case, QuerySet, When
+from django.db.models.query import ModelIterable
+from meilisearch.errors import MeilisearchError
+
+from ._breaker import is_unavailable
+from ._chunking import PARENT
 from ._client import client
+from .signals import search_finished, search_started
 
 if TYPE_CHECKING:
     from .models import IndexMixin
@@ -38,22 +47,108 @@ class Point(NamedTuple):
     lng: float | str
 
 
+def valid_coordinates(lat, lng) -> bool:
+    """Whether the latitude and longitude are numbers MeiliSearch accepts as a point."""
+
+    try:
+        return -90 <= float(lat) <= 90 and -180 <= float(lng) <= 180
+    except (TypeError, ValueError):
+        return False
+
+
+def _valid_radius(radius) -> bool:
+    try:
+        return float(radius) >= 0
+    except (TypeError, ValueError):
+        return False
+
+
+# The search parameters whose results are attached to hydrated instances.
+_ANNOTATING_PARAMS = {"attributesToHighlight", "attributesToCrop", "showRankingScore"}
+
+# The search parameters the similar documents route accepts.
+_SIMILAR_PARAMS = {"offset", "limit", "filter", "attributesToRetrieve", "showRankingScore"}
+
+
+class HydrationIterable(ModelIterable):
+    """Model iterable that measures how long search results take to load from the database.
+
+    Subclasses made by `with_hits` also attach the highlighted fields, ranking
+    score and geo distance of each hit to its instance, as `meili_formatted`,
+    `meili_score` and `meili_geo_distance`.
+    """
+
+    # The hit of each result, by its key field value.
+    hits: dict | None = None
+
+    @classmethod
+    def with_hits(cls, hits: dict) -> type["HydrationIterable"]:
+        # The class is what a QuerySet copies to its clones, so the hits live on it.
+        return type(cls.__name__, (cls,), {"hits": hits})
+
+    def __iter__(self):
+        if client.instrumentation.enabled:
+            index_name = self.queryset.model._meilisearch["index_name"]
+            with client.instrumentation.operation("hydrate", index_name) as op:
+                results = list(super().__iter__())
+                op.set(hits=len(results))
+        else:
+            results = super().__iter__()
+        codec = self.queryset.model._meili_pk_codec()
+        for instance in results:
+            if self.hits is not None and (hit := self.hits.get(codec.value(instance))):
+                instance.meili_formatted = hit.get("_formatted")
+                instance.meili_score = hit.get("_rankingScore")
+                instance.meili_geo_distance = hit.get("_geoDistance")
+            yield instance
+
+
+def _fallback_lookup(filter: str, value) -> tuple[str, Any] | None:
+    """The Django lookup matching a `filter` keyword, for the database fallback, if there is one."""
+
+    field, _, lookup = filter.partition("__")
+    if lookup in ("", "exact"):
+        if value is None:
+            return f"{field}__isnull", True
+        if isinstance(value, (list, dict)):
+            return None
+        return field, value
+    if lookup in ("gte", "gt", "lte", "lt", "in", "isnull"):
+        return filter, value
+    if lookup == "range":
+        return filter, (value.start, value.stop) if isinstance(value, range) else tuple(value)
+    return None
+
+
 class IndexQuerySet:
     """QuerySet for a MeiliSearch index.
 
     This class provides a way to interact with a MeiliSearch index for a given model.
     The queryset mimics the Django QuerySet API and provides methods to filter, sort, and search the index.
+    Like a Django QuerySet, every method returns a new IndexQuerySet, so `Model.meilisearch` itself is never modified.
     """
 
     def __init__(self, model: Type["IndexMixin"]):
         self.model = model
-        self.index = client.get_index(model._meilisearch["index_name"])
+        self.index_name = model._meilisearch["index_name"]
+        self.index = client.get_index(self.index_name)
         self.__offset = 0
         self.__limit = 20
         self.__filters: list[str] = []
         self.__sort: list[str] = []
         self.__matching_strategy: Literal["last", "all"] = "last"
         self.__attributes_to_search_on: list[str] = ["*"]
+        self.__queryset: QuerySet | None = None
+        self.__select_related: tuple[str, ...] = ()
+        self.__prefetch_related: tuple[str, ...] = ()
+        self.__only: tuple[str, ...] = ()
+        self.__raw = False
+        self.__display: dict = {}
+        self.__semantic: dict = {}
+        # The filters and ordering as Django lookups, for the database fallback,
+        # or None once one of them has no Django equivalent.
+        self.__fallback_filters: dict | None = {}
+        self.__fallback_order: list[str] | None = []
 
     def __repr__(self):
         return f"<IndexQuerySet for {self.model.__name__}>"
@@ -63,20 +158,53 @@ class IndexQuerySet:
 
     def __getitem__(self, index):
         if isinstance(index, slice):
-            self.__offset = index.start
-            self.__limit = index.stop
-            return self
+            clone = self._clone()
+            clone.__offset = index.start or 0
+            if index.stop is not None:
+                clone.__limit = index.stop - clone.__offset
+            return clone
         else:
             raise TypeError("IndexQuerySet indices must be slices")
 
+    def _clone(self) -> Self:
+        clone = copy(self)
+        clone.__filters = [*self.__filters]
+        clone.__sort = [*self.__sort]
+        clone.__attributes_to_search_on = [*self.__attributes_to_search_on]
+        clone.__display = {**self.__display}
+        clone.__semantic = {**self.__semantic}
+        if self.__fallback_filters is not None:
+            clone.__fallback_filters = {**self.__fallback_filters}
+        if self.__fallback_order is not None:
+            clone.__fallback_order = [*self.__fallback_order]
+        return clone
+
     def count(self) -> int:
         """Returns the number of documents in the index.
 
         Note: This method is not specific to the current queryset and will return the total number of documents in the index.
+        For a model with chunk_fields, every chunk counts as a document.
         """
 
         return self.index.get_stats().number_of_documents
 
+    def using_index(self, index_name: str) -> Self:
+        """Search the given index instead of the model's.
+
+        This is how a model overriding `meili_index_name` is searched, one routed
+        index at a time.
+
+        For example:
+        ```python
+        Post.meilisearch.using_index(f"posts_{organization.pk}").search("hello")
+        ```
+        """
+
+        clone = self._clone()
+        clone.index_name = index_name
+        clone.index = client.get_index(index_name)
+        return clone
+
     def order_by(self, *fields: str):
         """Orders the queryset by the given fields.
 
@@ -97,13 +225,18 @@ class IndexQuerySet:
         ```
         """
 
+        clone = self._clone()
         for field in fields:
             geopoint = "_" if "geoPoint" in field else ""
+            if geopoint:
+                clone.__fallback_order = None
+            elif clone.__fallback_order is not None:
+                clone.__fallback_order.append(field)
             if field.startswith("-"):
-                self.__sort.append(f"{geopoint}{field[1:]}:desc")
+                clone.__sort.append(f"{geopoint}{field[1:]}:desc")
             else:
-                self.__sort.append(f"{geopoint}{field}:asc")
-        return self
+                clone.__sort.append(f"{geopoint}{field}:asc")
+        return clone
 
     def filter(self, *geo_filters, **filters) -> Self:
         """Filters the queryset by the given filters.
@@ -128,6 +261,7 @@ class IndexQuerySet:
         For geosearch, the Radius and BoundingBox classes can be used, and should be passed as unnamed arguments.
         If the model does not support geosearch, a TypeError will be raised.
         If the provided positional arguments are not of type Radius or BoundingBox, a TypeError will be raised.
+        Coordinates out of range, or a negative radius, raise a ValueError.
 
         For example:
         ```python
@@ -136,6 +270,9 @@ class IndexQuerySet:
         ```
         """
 
+        clone = self._clone()
+        if geo_filters:
+            clone.__fallback_filters = None
         for geo_filter in geo_filters:
             if not self.model._meilisearch["supports_geo"]:
                 raise TypeError(
@@ -145,56 +282,70 @@ class IndexQuerySet:
                 raise TypeError(
                     f"Unnamed Argument must be of type Radius or BoundingBox, not {type(geo_filter)}"
                 )
+            points = (
+                [geo_filter[:2]] if isinstance(geo_filter, Radius) else list(geo_filter)
+            )
+            # Invalid points are rejected here rather than by MeiliSearch, after a round-trip.
+            if not all(valid_coordinates(*point) for point in points):
+                raise ValueError(f"Invalid coordinates in {geo_filter}")
             if isinstance(geo_filter, Radius):
-                self.__filters.append(
+                if not _valid_radius(geo_filter.radius):
+                    raise ValueError(f"Invalid radius in {geo_filter}")
+                clone.__filters.append(
                     f"_geoRadius({geo_filter.lat}, {geo_filter.lng}, {geo_filter.radius})"
                 )
             elif isinstance(geo_filter, BoundingBox):
-                self.__filters.append(
+                clone.__filters.append(
                     f"_geoBoundingBox([{geo_filter.top_right[0]}, {geo_filter.top_right[1]}], [{geo_filter.bottom_left[0]}, {geo_filter.bottom_left[1]}])"
                 )
         for filter, value in filters.items():
+            lookup = _fallback_lookup(filter, value)
+            if lookup is None:
+                clone.__fallback_filters = None
+            elif clone.__fallback_filters is not None:
+                clone.__fallback_filters[lookup[0]] = lookup[1]
             if "__" not in filter or "__exact" in filter:
                 if (
                     value == ""
                     or (isinstance(value, list) and len(value) == 0)
                     or value == {}
                 ):
-                    self.__filters.append(f"{filter.split('__')[0]} IS EMPTY")
+                    clone.__filters.append(f"{filter.split('__')[0]} IS EMPTY")
                 elif value is None:
-                    self.__filters.append(f"{filter.split('__')[0]} IS NULL")
+                    clone.__filters.append(f"{filter.split('__')[0]} IS NULL")
                 else:
-                    self.__filters.append(
-                        f"{filter.split('__')[0]} = '{value}'"
+                    # Strings are quoted and escaped, so no value can alter the filter.
+                    clone.__filters.append(
+                        f"{filter.split('__')[0]} = {dumps(value, ensure_ascii=False)}"
                         if isinstance(value, str)
                         else f"{filter.split('__')[0]} = {value}"
                     )
             elif "__gte" in filter:
                 if not isinstance(value, (int, float)):
                     raise TypeError(f"Cannot compare {type(value)} with int or float")
-                self.__filters.append(f"{filter.split('__')[0]} >= {value}")
+                clone.__filters.append(f"{filter.split('__')[0]} >= {value}")
             elif "__gt" in filter:
                 if not isinstance(value, (int, float)):
                     raise TypeError(f"Cannot compare {type(value)} with int or float")
-                self.__filters.append(f"{filter.split('__')[0]} > {value}")
+                clone.__filters.append(f"{filter.split('__')[0]} > {value}")
             elif "__lte" in filter:
                 if not isinstance(value, (int, float)):
                     raise TypeError(f"Cannot compare {type(value)} with int or float")
-                self.__filters.append(f"{filter.split('__')[0]} <= {value}")
+                clone.__filters.append(f"{filter.split('__')[0]} <= {value}")
             elif "__lt" in filter:
                 if not isinstance(value, (int, float)):
                     raise TypeError(f"Cannot compare {type(value)} with int or float")
-                self.__filters.append(f"{filter.split('__')[0]} < {value}")
+                clone.__filters.append(f"{filter.split('__')[0]} < {value}")
             elif "__in" in filter:
                 if not isinstance(value, list):
                     raise TypeError(f"Cannot compare {type(value)} with list")
-                self.__filters.append(f"{filter.split('__')[0]} IN {value}")
+                clone.__filters.append(f"{filter.split('__')[0]} IN {value}")
             elif "__range" in filter:
                 if not isinstance(value, (range, list, tuple)):
                     raise TypeError(
                         f"Cannot compare {type(value)} with range, list or tuple"
                     )
-                self.__filters.append(
+                clone.__filters.append(
                     f"{filter.split('__')[0]} {value[0]} TO {value[1]}"
                     if not isinstance(value, range)
                     else f"{filter.split('__')[0]} {value.start} TO {value.stop}"
@@ -202,17 +353,17 @@ class IndexQuerySet:
             elif "__exists" in filter:
                 if not isinstance(value, bool):
                     raise TypeError(f"Cannot compare {type(value)} with bool")
-                self.__filters.append(
+                clone.__filters.append(
                     f"{filter.split('__')[0]} {'NOT ' if not value else ''}EXISTS"
                 )
             elif "__isnull" in filter:
                 if not isinstance(value, bool):
                     raise TypeError(f"Cannot compare {type(value)} with bool")
-                self.__filters.append(
+                clone.__filters.append(
                     f"{filter.split('__')[0]} {'NOT ' if not value else ''}IS NULL"
                 )
 
-        return self
+        return clone
 
     def matching_strategy(self, strategy: Literal["last", "all"]):
         """Sets the matching strategy for the search.
@@ -220,8 +371,9 @@ class IndexQuerySet:
         The matching strategy can be either "last" or "all".
         """
 
-        self.__matching_strategy = strategy
-        return self
+        clone = self._clone()
+        clone.__matching_strategy = strategy
+        return clone
 
     def attributes_to_search_on(self, *attributes):
         """Sets the attributes to search on.
@@ -234,13 +386,171 @@ class IndexQuerySet:
         ```
         """
 
-        self.__attributes_to_search_on.append(*attributes)
-        return self
+        clone = self._clone()
+        clone.__attributes_to_search_on = list(attributes)
+        return clone
+
+    def attributes_to_retrieve(self, *attributes) -> Self:
+        """Sets the attributes returned in each hit.
+
+        Only useful with `raw()`, since hydrated results are loaded from the database.
+
+        For example:
+        ```python
+        Model.meilisearch.attributes_to_retrieve("id", "title").raw().search("Hello")
+        ```
+        """
+
+        clone = self._clone()
+        clone.__display["attributesToRetrieve"] = list(attributes)
+        return clone
+
+    def highlight(
+        self, *attributes: str, pre_tag: str = "<em>", post_tag: str = "</em>"
+    ) -> Self:
+        """Highlights the query terms in the given attributes, or in every attribute.
+
+        The highlighted fields are returned in the same search request and set on each
+        result as `meili_formatted`, or on each raw hit as `formatted`.
+
+        For example:
+        ```python
+        for post in Model.meilisearch.highlight("title", "body").search("Hello"):
+            post.meili_formatted["title"]  # "<em>Hello</em> World"
+        ```
+        """
+
+        clone = self._clone()
+        clone.__display |= {
+            "attributesToHighlight": list(attributes) or ["*"],
+            "highlightPreTag": pre_tag,
+            "highlightPostTag": post_tag,
+        }
+        return clone
+
+    def crop(self, *attributes: str, length: int = 10, marker: str = "…") -> Self:
+        """Crops the given attributes, or every attribute, around the query terms.
+
+        `length` is the number of words kept. Like `highlight`, the cropped fields
+        are set on each result as `meili_formatted`.
+
+        For example:
+        ```python
+        Model.meilisearch.crop("body", length=20).highlight("body").search("Hello")
+        ```
+        """
+
+        clone = self._clone()
+        clone.__display |= {
+            "attributesToCrop": list(attributes) or ["*"],
+            "cropLength": length,
+            "cropMarker": marker,
+        }
+        return clone
+
+    def with_ranking_score(self) -> Self:
+        """Sets the ranking score of each result as `meili_score`, between 0 and 1.
+
+        For example:
+        ```python
+        [post.meili_score for post in Model.meilisearch.with_ranking_score().search("Hello")]
+        ```
+        """
+
+        clone = self._clone()
+        clone.__display["showRankingScore"] = True
+        return clone
+
+    def hybrid(
+        self,
+        semantic_ratio: float = 0.5,
+        embedder: str | None = None,
+        vector: Sequence[float] | None = None,
+    ) -> Self:
+        """Mixes semantic search with keyword search, using one of the model's embedders.
+
+        The semantic_ratio goes from 0 (keyword search only) to 1 (semantic search only).
+        The embedder defaults to the first of `MeiliMeta.embedders`. For a `userProvided`
+        embedder, pass the query's vector, e.g. from the model `meili_embed` uses.
+
+        For example:
+        ```python
+        Model.meilisearch.hybrid(semantic_ratio=0.8).search("warm drinks for winter")
+        ```
+        """
+
+        clone = self._clone()
+        clone.__semantic = {
+            "hybrid": {"semanticRatio": semantic_ratio, "embedder": self._embedder(embedder)}
+        }
+        if vector is not None:
+            clone.__semantic["vector"] = vector.tolist() if hasattr(vector, "tolist") else list(vector)
+        return clone
+
+    def _embedder(self, embedder: str | None) -> str:
+        return embedder or next(iter(self.model._meilisearch["embedders"] or {}), "default")
+
+    def hydrate(
+        self,
+        *,
+        select_related: Iterable[str] = (),
+        prefetch_related: Iterable[str] = (),
+        only: Iterable[str] = (),
+        queryset: QuerySet | None = None,
+    ) -> Self:
+        """Sets how the search results are loaded from the database.
+
+        The options are applied to the Django QuerySet returned by `search`, so the
+        results are fetched with the joins and columns the caller needs in one or two queries.
+        By default results are loaded from `Model.meili_queryset()`; pass `queryset` to use
+        another manager or base queryset for this search.
+
+        For example:
+        ```python
+        Model.meilisearch.hydrate(select_related=["author"], only=["title", "author__name"]).search("Hello")
+        Model.meilisearch.hydrate(queryset=Model.published.all()).search("Hello")
+        ```
+        """
+
+        clone = self._clone()
+        clone.__select_related = (*self.__select_related, *select_related)
+        clone.__prefetch_related = (*self.__prefetch_related, *prefetch_related)
+        clone.__only = (*self.__only, *only)
+        if queryset is not None:
+            clone.__queryset = queryset
+        return clone
+
+    def raw(self) -> Self:
+        """Makes `search` return the hits themselves instead of a Django QuerySet.
+
+        Each hit is an instance of a slotted dataclass generated once per model from
+        its displayed fields, so large pages of hits stay small in memory and their
+        fields can be read as attributes, including in templates. The `formatted`,
+        `matches_position` and `ranking_score` properties return the matching
+        MeiliSearch attributes, when they were requested.
+
+        For example:
+        ```python
+        for hit in Model.meilisearch.raw()[:1000].search("Hello"):
+            print(hit.id, hit.title)
+        ```
+        """
+
+        clone = self._clone()
+        clone.__raw = True
+        return clone
 
     def search(self, q: str = ""):
         """Searches the index for the given query.
 
-        This method searches the index for the given query and returns the results as an actual Django QuerySet.
+        This method searches the index for the given query and returns the results as an actual Django QuerySet,
+        or as a list of hit objects after `raw()`.
+
+        While MeiliSearch is unavailable, or the circuit breaker is open, the error is raised unless
+        `MEILISEARCH["SEARCH_FALLBACK"]` is "database". Then the rows are searched with the model's
+        `meili_fallback_search` instead, with the filters and ordering applied as Django lookups;
+        searches with geo filters or sorts, on fields that aren't model fields, or after `raw()`
+        still raise.
 
         For example:
         ```python
@@ -248,20 +558,164 @@ class IndexQuerySet:
         ```
         """
 
-        results = self.index.search(
-            q,
-            {
-                "offset": self.__offset,
-                "limit": self.__limit,
-                "filter": self.__filters,
-                "sort": self.__sort,
-                "matchingStrategy": self.__matching_strategy,
-                "attributesToSearchOn": self.__attributes_to_search_on,
-            },
+        try:
+            results = self._search(q)
+        except MeilisearchError as e:
+            fallback = self._fallback(q) if is_unavailable(e) else None
+            if fallback is None:
+                raise
+            return fallback
+        return self._results(results)
+
+    def similar_to(self, instance: "IndexMixin", embedder: str | None = None):
+        """Returns the rows closest to the given instance, by the vectors of an embedder.
+
+        Like `search`, it returns a Django QuerySet, or hit objects after `raw()`. Filters,
+        slicing, `attributes_to_retrieve` and `with_ranking_score` apply; the instance
+        itself is left out. Requires MeiliSearch 1.9 or newer.
+
+        For example:
+        ```python
+        Model.meilisearch.filter(published=True)[:5].similar_to(post)
+        ```
+        """
+
+        params = {
+            key: value for key, value in self._params().items() if key in _SIMILAR_PARAMS
+        } | {"id": instance._meili_document_id(), "embedder": self._embedder(embedder)}
+        with client.instrumentation.operation("similar", self.index_name, params=params) as op:
+            results = self.index.get_similar_documents(params)
+            op.set(hits=len(results.get("hits", [])))
+        return self._results(results)
+
+    def _fallback(self, q: str) -> QuerySet | None:
+        """Search the database in place of MeiliSearch, or return None when the search can't be."""
+
+        filters, order = self.__fallback_filters, self.__fallback_order
+        if (
+            settings.MEILISEARCH.get("SEARCH_FALLBACK", "raise") != "database"
+            or self.__raw
+            or filters is None
+            or order is None
+        ):
+            return None
+        fields = {lookup.split("__")[0] for lookup in filters} | {f.lstrip("-") for f in order}
+        try:
+            for field in fields - {"pk"}:
+                self.model._meta.get_field(field)
+        except FieldDoesNotExist:
+            return None
+        queryset = self._hydration_queryset().filter(**filters)
+        if q:
+            queryset = self.model.meili_fallback_search(queryset, q)
+        if order:
+            queryset = queryset.order_by(*order)
+        elif not queryset.ordered:
+            queryset = queryset.order_by("pk")
+        lookup = self.model._meili_pk_codec().lookup
+        # The page is read as keys first, so the result is an unsliced QuerySet like a search's.
+        values = list(
+            queryset.values_list(lookup, flat=True)[self.__offset : self.__offset + self.__limit]
+        )
+        return self._hydrate(values)
+
+    def _results(self, results: dict):
+        """Turn MeiliSearch's response into hit objects or a Django QuerySet."""
+
+        if self.__raw:
+            Hit = self.model._meili_hit_class()
+            return [Hit.from_hit(hit) for hit in results.get("hits", [])]
+        # Chunks of the same row are collapsed into the row, at its best-ranked hit.
+        hits: dict = {}
+        for hit in results.get("hits", []):
+            hits.setdefault(self._hit_pk(hit), hit)
+        # The ids are converted to the key field's type at once, so the lookup needs no casts.
+        values = self.model._meili_pk_codec().to_python(hits)
+        return self._hydrate(
+            values,
+            (
+                dict(zip(values, hits.values()))
+                if self.__display.keys() & _ANNOTATING_PARAMS
+                # MeiliSearch returns the distance of each hit when sorting by a point.
+                or any(sort.startswith("_geoPoint(") for sort in self.__sort)
+                else None
+            ),
+        )
+
+    def _hit_pk(self, hit: dict):
+        """Return the id of the row a hit was built from."""
+
+        return hit.get(PARENT, hit[self.model._meili_pk_codec().hit_key])
+
+    def _search(self, q: str) -> dict:
+        """Send the search request, returning MeiliSearch's response as is."""
+
+        index_name = self.index_name
+        params = self._params()
+        search_started.send(
+            sender=self.model, index_name=index_name, query=q, params=params
+        )
+        with client.instrumentation.operation(
+            "search", index_name, query=q, params=params
+        ) as op:
+            results = self.index.search(q, params)
+            op.set(
+                hits=len(results.get("hits", [])),
+                processing_time_ms=results.get("processingTimeMs"),
+            )
+        search_finished.send(
+            sender=self.model,
+            index_name=index_name,
+            query=q,
+            params=params,
+            results=results,
+            duration=op.duration,
         )
-        id_field = getattr(self.model.MeiliMeta, "primary_key", "id")
-        pk_list = [hit[id_field] for hit in results.get("hits", [])]
+        return results
+
+    def _params(self) -> dict:
+        """The search parameters sent to MeiliSearch."""
+
+        return {
+            "offset": self.__offset,
+            "limit": self.__limit,
+            "filter": self.__filters,
+            "sort": self.__sort,
+            "matchingStrategy": self.__matching_strategy,
+            "attributesToSearchOn": self.__attributes_to_search_on,
+        } | self.__display | self.__semantic
+
+    def _hydration_queryset(self) -> QuerySet:
+        """The base queryset search results are loaded from, with the `hydrate` options applied."""
+
+        queryset = (
+            self.__queryset
+            if self.__queryset is not None
+            else self.model.meili_queryset()
+        )
+        if self.__select_related:
+            queryset = queryset.select_related(*self.__select_related)
+        if self.__prefetch_related:
+            queryset = queryset.prefetch_related(*self.__prefetch_related)
+        if self.__only:
+            queryset = queryset.only(*self.__only)
+        return queryset
+
+    def _hydrate(self, pk_list: list, hits: dict | None = None) -> QuerySet:
+        """Build the Django QuerySet for the given key field values, in hit order.
+
+        When `hits` maps each value to its hit, what the search returned about it
+        is attached to the loaded instances.
+        """
+
+        lookup = self.model._meili_pk_codec().lookup
+        queryset = self._hydration_queryset()
         preserved_order = Case(
-            *[When(pk=pk, then=pos) for pos, pk in enumerate(pk_list)]
+            *[When(**{lookup: pk}, then=pos) for pos, pk in enumerate(pk_list)]
         )
-        return self.model.objects.filter(pk__in=pk_list).order_by(preserved_order)
+        queryset = queryset.filter(**{f"{lookup}__in": pk_list}).order_by(preserved_order)
+        if hits is not None:
+            queryset._iterable_class = HydrationIterable.with_hits(hits)
+        elif client.instrumentation.enabled:
+            queryset._iterable_class = HydrationIterable
+        return queryset
@@ -0,0 +1,41 @@
+"""
+signals.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the Django signals sent by the Django MeiliSearch app.
+
+Every signal except task_failed and circuit_state_changed is sent with the
+indexed model class as the sender, so receivers can be limited to a single
+model with `sender=`. task_failed and circuit_state_changed are sent by the
+client, which does not know the model.
+
+- search_started: before a search request is sent.
+    kwargs: index_name, query, params
+- search_finished: after a search response is received.
+    kwargs: index_name, query, params, results, duration
+- documents_indexed: after documents are enqueued in MeiliSearch.
+    kwargs: index_name, documents, payload_bytes, duration, task
+- task_failed: when a MeiliSearch task finishes with a failed status.
+    kwargs: index_name, task
+- circuit_state_changed: when the circuit breaker opens, goes half-open or closes.
+    kwargs: state, previous
+
+Example:
+```python
+from django.dispatch import receiver
+from django_meili.signals import search_finished
+
+@receiver(search_finished)
+def log_slow_searches(sender, index_name, query, duration, **kwargs):
+    if duration > 0.1:
+        logger.warning("Slow search on %s for %r", index_name, query)
+```
+"""
+
+from django.dispatch import Signal
+
+search_started = Signal()
+search_finished = Signal()
+documents_indexed = Signal()
+task_failed = Signal()
+circuit_state_changed = Signal()
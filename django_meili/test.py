@@ -0,0 +1,172 @@
+"""
+test.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains test helpers for counting MeiliSearch calls, in the
+spirit of Django's `assertNumQueries`, and for searching without MeiliSearch.
+"""
+
+from typing import Iterable
+
+from django.core.signals import request_started
+
+from ._client import client as _client
+from ._registry import indexed_models
+from .backends.memory import MemoryBackend
+
+
+class CaptureSearchesContext:
+    """Context manager that captures the MeiliSearch operations made inside it.
+
+    Capturing works whether or not `MEILISEARCH["DEBUG"]` is on. Only the
+    operations named in `operations` are kept; pass None to keep every
+    operation (searches, document writes, task waits, hydration).
+
+    Example:
+    ```python
+    with CaptureSearchesContext() as ctx:
+        Post.meilisearch.search("hello")
+    assert len(ctx) == 1
+    ```
+    """
+
+    def __init__(self, operations: Iterable[str] | None = ("search",)):
+        self.operations = set(operations) if operations is not None else None
+        self.log = _client.instrumentation.log
+        self.initial = 0
+        self.final = 0
+        self.queries: list[dict] = []
+        self.reset_connected = False
+
+    def __enter__(self):
+        self.log.forced += 1
+        # Keep test client requests from clearing the log mid-capture.
+        self.reset_connected = request_started.disconnect(self.log.reset)
+        self.initial = self.log.count
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.log.forced -= 1
+        if self.reset_connected:
+            request_started.connect(self.log.reset, weak=False)
+        self.final = self.log.count
+        self.queries = self.log.since(self.initial)
+
+    def __iter__(self):
+        return iter(self.captured_queries)
+
+    def __getitem__(self, index):
+        return self.captured_queries[index]
+
+    def __len__(self):
+        return len(self.captured_queries)
+
+    @property
+    def captured_queries(self) -> list[dict]:
+        return [
+            query
+            for query in self.queries
+            if self.operations is None or query["operation"] in self.operations
+        ]
+
+
+class _AssertNumSearchesContext(CaptureSearchesContext):
+    def __init__(self, test_case, num: int, operations: Iterable[str] | None):
+        self.test_case = test_case
+        self.num = num
+        super().__init__(operations)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+        executed = len(self)
+        self.test_case.assertEqual(
+            executed,
+            self.num,
+            "%d MeiliSearch calls executed, %d expected\nCaptured calls were:\n%s"
+            % (
+                executed,
+                self.num,
+                "\n".join(
+                    f"{i}. {query['operation']} on {query['index']}: {query.get('query', '')!r}"
+                    for i, query in enumerate(self.captured_queries, start=1)
+                ),
+            ),
+        )
+
+
+class SearchAssertionsMixin:
+    """TestCase mixin providing `assertNumSearches`.
+
+    Example:
+    ```python
+    class PostViewTests(SearchAssertionsMixin, TestCase):
+        def test_search_page_searches_once(self):
+            with self.assertNumSearches(1):
+                self.client.get("/search/?q=hello")
+    ```
+    """
+
+    def assertNumSearches(
+        self, num: int, func=None, *args, operations=("search",), **kwargs
+    ):
+        """Assert that `num` MeiliSearch searches are made.
+
+        Like `assertNumQueries`, it can be used as a context manager or
+        called with a function and its arguments.
+        """
+
+        context = _AssertNumSearchesContext(self, num, operations)
+        if func is None:
+            return context
+        with context:
+            func(*args, **kwargs)
+
+
+class MemoryBackendMixin:
+    """TestCase mixin answering MeiliSearch requests from an in-memory backend.
+
+    A fresh `MemoryBackend` holding every indexed model's index, with its
+    settings, is set up before `setUpTestData` runs. Before each test, the
+    indexes are put back as `setUpTestData` left them, the way TestCase puts
+    back the database, so no request reaches MeiliSearch and tests don't see
+    each other's documents.
+
+    Example:
+    ```python
+    class PostSearchTests(MemoryBackendMixin, TestCase):
+        @classmethod
+        def setUpTestData(cls):
+            Post.objects.create(title="Hello World")
+
+        def test_search(self):
+            self.assertEqual(Post.meilisearch.search("hello").count(), 1)
+    ```
+    """
+
+    meili_backend: MemoryBackend
+
+    @classmethod
+    def setUpClass(cls):
+        cls._meili_previous = (_client.backend, _client.known_indexes)
+        cls.meili_backend = _client.backend = MemoryBackend()
+        _client.known_indexes = {}
+        for model in indexed_models():
+            model._meili_create_index(model._meilisearch["index_name"])
+        _client.flush_tasks()
+        try:
+            super().setUpClass()
+        except Exception:
+            _client.backend, _client.known_indexes = cls._meili_previous
+            raise
+        cls._meili_state = cls.meili_backend.dump()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        _client.backend, _client.known_indexes = cls._meili_previous
+
+    def setUp(self):
+        self.meili_backend.load(self._meili_state)
+        super().setUp()
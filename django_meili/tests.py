@@ -1,15 +1,49 @@
+import json
+import time
+from datetime import datetime, timedelta
 from io import StringIO
+from pathlib import Path
 from random import uniform
-from unittest import skip
+from tempfile import TemporaryDirectory
+from unittest import skip, skipIf
 
 from django.core import management
 from django.db import models
-from django.test import TestCase, override_settings
+from django.test import RequestFactory, TestCase, override_settings
 from django.test.utils import isolate_apps
-from posts.models import IndexNamePost, NonStandardIdPost, Post, PostNoGeo, UuidIdPost
-
-from django_meili.models import IndexMixin, MeiliGeo
+from meilisearch.errors import MeilisearchApiError, MeilisearchCommunicationError
+from posts.models import (
+    ChunkedPost,
+    IndexNamePost,
+    NonStandardIdPost,
+    PlacePost,
+    Post,
+    PostNoGeo,
+    UuidIdPost,
+)
+
+from django_meili._batching import AdaptiveBatcher, TaskQueue
+from django_meili._breaker import CircuitBreaker, CircuitOpenError
+from django_meili._chunking import chunk_filter, split_text
+from django_meili._consistency import content_hash
+from django_meili._instrumentation import Instrumentation, prometheus_client
+from django_meili._progress import Progress
+from django_meili._registry import resolve_model, resolve_models, select_models
+from django_meili._sharding import shard_bounds
+from django_meili.backends import Backend
+from django_meili.models import (
+    DocumentHash,
+    IndexMixin,
+    MeiliGeo,
+    PendingWrite,
+    SyncCheckpoint,
+)
 from django_meili.querysets import Radius
+from django_meili.test import (
+    CaptureSearchesContext,
+    MemoryBackendMixin,
+    SearchAssertionsMixin,
+)
 
 # Create your tests here.
 
@@ -63,8 +97,19 @@ class OfflineDjangoMeiliTestCase(TestCase):
                 displayed_fields = ("id", "title", "body")
                 supports_geo = True
 
+        class DraftPost(IndexMixin, models.Model):
+            title = models.CharField(max_length=255)
+            published = models.BooleanField(default=False)
+
+            class MeiliMeta:
+                index_name = "draft_posts"
+
+            def meili_filter(self) -> bool:
+                return self.published
+
         cls.Post = Post
         cls.PostNoGeo = PostNoGeo
+        cls.DraftPost = DraftPost
         return super().setUpTestData()
 
     def test_offline_is_set(self):
@@ -76,6 +121,889 @@ class OfflineDjangoMeiliTestCase(TestCase):
         self.assertEqual(self.Post._meilisearch["tasks"], [])
         self.assertEqual(self.PostNoGeo._meilisearch["tasks"], [])
 
+    def test_queryset_methods_do_not_modify_the_model_queryset(self):
+        filtered = self.Post.meilisearch.filter(title="Hello").order_by("-title")[5:15]
+        self.assertEqual(self.Post.meilisearch._params()["filter"], [])
+        self.assertEqual(self.Post.meilisearch._params()["sort"], [])
+        self.assertEqual(filtered._params()["filter"], ['title = "Hello"'])
+        self.assertEqual(filtered._params()["offset"], 5)
+        self.assertEqual(filtered._params()["limit"], 10)
+
+    def test_hydrate_options_are_applied(self):
+        queryset = self.Post.meilisearch.hydrate(
+            only=["title"], prefetch_related=["comments"]
+        )._hydrate([1, 2])
+        self.assertEqual(queryset.query.deferred_loading, ({"title"}, False))
+        self.assertEqual(queryset._prefetch_related_lookups, ("comments",))
+
+    def test_changed_fields_are_detected_from_the_loaded_values(self):
+        from posts.models import PostNoGeo
+
+        post = PostNoGeo.objects.create(title="Hello", body="World")
+        post = PostNoGeo.objects.get(pk=post.pk)
+        self.assertEqual(post._meili_changed_fields(), set())
+        post.title = "Goodbye"
+        self.assertEqual(post._meili_changed_fields(), {"title"})
+        self.assertEqual(post._meili_changed_fields(update_fields=["body"]), set())
+
+    def test_loaded_instances_know_whether_they_are_indexed(self):
+        from posts.models import PostNoGeo
+
+        post = PostNoGeo.objects.create(title="Hello", body="World")
+        self.assertTrue(PostNoGeo.objects.get(pk=post.pk)._meili_in_index)
+        self.assertIsNone(PostNoGeo.objects.only("title").get(pk=post.pk)._meili_in_index)
+
+    def test_untracked_instances_know_whether_they_were_indexed(self):
+        fields = ["id", "title", "published"]
+        draft = self.DraftPost.from_db("default", fields, [1, "Hello", False])
+        self.assertIsNone(self.DraftPost._meilisearch["tracked_fields"])
+        draft.published = True
+        # Decided by the values it was loaded with, not the current ones.
+        self.assertFalse(draft._meili_was_indexed())
+        published = self.DraftPost.from_db("default", fields, [2, "Hello", True])
+        self.assertTrue(published._meili_was_indexed())
+        deferred = self.DraftPost.from_db("default", ["id", "title"], [3, "Hello"])
+        self.assertIsNone(deferred._meili_was_indexed())
+
+    def test_overridden_meili_filter_is_not_run_on_load(self):
+        calls = []
+
+        class TrackedDraft(IndexMixin, models.Model):
+            title = models.CharField(max_length=255)
+            published = models.BooleanField(default=False)
+
+            class MeiliMeta:
+                index_name = "tracked_drafts"
+                searchable_fields = ("title",)
+                tracked_fields = ("title", "published")
+
+            def meili_filter(self) -> bool:
+                calls.append(self.pk)
+                return self.published
+
+        draft = TrackedDraft.from_db("default", ["id", "title", "published"], [1, "Hello", True])
+        self.assertEqual(calls, [])
+        self.assertIsNone(draft._meili_in_index)
+        draft.published = False
+        self.assertTrue(draft._meili_was_indexed())
+        self.assertEqual(calls, [1])
+
+    def test_deferred_fields_count_as_changed(self):
+        from posts.models import PostNoGeo
+
+        post = PostNoGeo.objects.create(title="Hello", body="World")
+        post = PostNoGeo.objects.only("title").get(pk=post.pk)
+        self.assertEqual(post._meili_changed_fields(), {"body"})
+
+    def test_overridden_meili_geo_disables_change_tracking(self):
+        from posts.models import Post
+
+        self.assertIsNone(Post._meilisearch["tracked_fields"])
+        post = Post.objects.create(title="Hello", body="World", lat=0, lng=0)
+        self.assertIsNone(Post.objects.get(pk=post.pk)._meili_changed_fields())
+
+    def test_content_hash_ignores_key_order_and_hidden_fields(self):
+        document = {"id": "1", "title": "Hello", "body": "World"}
+        self.assertEqual(
+            content_hash(document), content_hash(dict(reversed(document.items())))
+        )
+        self.assertNotEqual(content_hash(document), content_hash(document | {"title": "Bye"}))
+        self.assertEqual(
+            content_hash(document, ["id", "title"]),
+            content_hash({"title": "Hello", "id": "1"}, ["id", "title"]),
+        )
+
+    def test_document_hashes_are_stored_per_index(self):
+        DocumentHash.objects.remember("posts", {"1": "a", "2": "b"})
+        DocumentHash.objects.remember("posts", {"2": "c"})
+        DocumentHash.objects.remember("other", {"1": "d"})
+        self.assertEqual(
+            DocumentHash.objects.lookup("posts", ["1", "2", "3"]), {"1": "a", "2": "c"}
+        )
+        DocumentHash.objects.forget("posts", ["1"])
+        self.assertEqual(DocumentHash.objects.lookup("posts", ["1", "2"]), {"2": "c"})
+        DocumentHash.objects.forget("posts")
+        self.assertEqual(DocumentHash.objects.lookup("other", ["1"]), {"1": "d"})
+        self.assertFalse(DocumentHash.objects.filter(index_name="posts").exists())
+
+    def test_upserts_leave_the_conflict_target_to_mysql(self):
+        from unittest import mock
+
+        from django.db import connection
+
+        with (
+            mock.patch.object(
+                connection.features, "supports_update_conflicts_with_target", False
+            ),
+            mock.patch.object(DocumentHash.objects, "bulk_create") as bulk_create,
+        ):
+            DocumentHash.objects.remember("posts", {"1": "a"})
+        self.assertIsNone(bulk_create.call_args.kwargs["unique_fields"])
+        self.assertTrue(bulk_create.call_args.kwargs["update_conflicts"])
+
+    def test_documents_carry_their_hash(self):
+        from posts.models import PostNoGeo
+
+        post = PostNoGeo(pk=1, title="Hello", body="World")
+        self.assertNotIn("_hash", post._meili_document())
+        with override_settings(MEILISEARCH={"OFFLINE": True, "CONTENT_HASHES": True}):
+            document = post._meili_document()
+        self.assertEqual(document["_hash"], content_hash(document))
+
+    def test_sync_checkpoints_are_kept_per_shard(self):
+        bounds = {"1/2": (None, 10), "2/2": (10, None)}
+        self.assertTrue(SyncCheckpoint.objects.create_plan("posts.PostNoGeo", bounds))
+        # Another syncindex planning at the same time keeps the saved plan.
+        self.assertFalse(SyncCheckpoint.objects.create_plan("posts.PostNoGeo", bounds))
+        plan = SyncCheckpoint.objects.plan("posts.PostNoGeo")
+        self.assertEqual((plan["2/2"].lower, plan["2/2"].upper), ("10", None))
+
+        SyncCheckpoint.objects.record("posts.PostNoGeo", "1/2", "5")
+        SyncCheckpoint.objects.record("posts.PostNoGeo", "2/2", "20")
+        self.assertEqual(SyncCheckpoint.objects.last_pk("posts.PostNoGeo", "1/2"), "5")
+        SyncCheckpoint.objects.start("posts.PostNoGeo", "1/2")
+        self.assertIsNone(SyncCheckpoint.objects.last_pk("posts.PostNoGeo", "1/2"))
+        self.assertEqual(SyncCheckpoint.objects.last_pk("posts.PostNoGeo", "2/2"), "20")
+
+        SyncCheckpoint.objects.finish("posts.PostNoGeo", "1/2")
+        self.assertEqual(len(SyncCheckpoint.objects.plan("posts.PostNoGeo")), 2)
+        SyncCheckpoint.objects.finish("posts.PostNoGeo", "2/2")
+        self.assertEqual(SyncCheckpoint.objects.plan("posts.PostNoGeo"), {})
+
+    def test_shard_bounds_cover_every_row_once(self):
+        from posts.models import PostNoGeo
+
+        PostNoGeo.objects.bulk_create(
+            [PostNoGeo(title=f"Post {i}", body="Body") for i in range(10)]
+        )
+        for shards in (1, 3, 20):
+            bounds = shard_bounds(PostNoGeo, shards)
+            self.assertEqual(len(bounds), shards)
+            covered = []
+            for lower, upper in bounds:
+                queryset = PostNoGeo.objects.all()
+                if lower is not None:
+                    queryset = queryset.filter(pk__gte=lower)
+                if upper is not None:
+                    queryset = queryset.filter(pk__lt=upper)
+                covered += queryset.values_list("pk", flat=True)
+            self.assertCountEqual(covered, PostNoGeo.objects.values_list("pk", flat=True))
+
+    def test_long_fields_are_chunked_into_sub_documents(self):
+        class ChunkedPost(IndexMixin, models.Model):
+            title = models.CharField(max_length=255)
+            body = models.TextField()
+            summary = models.TextField()
+
+            class MeiliMeta:
+                filterable_fields = ("title",)
+                searchable_fields = ("title", "body", "summary")
+                displayed_fields = ("id", "title", "body")
+                truncate_fields = {"summary": 5}
+                chunk_fields = {"body": 10}
+
+        post = ChunkedPost(pk=1, title="Hello", body="one two three four five", summary="0123456789")
+        documents = list(post._meili_documents())
+        self.assertEqual([d["id"] for d in documents], ["1", "1-1", "1-2"])
+        self.assertEqual([d["pk"] for d in documents], ["1", "1-1", "1-2"])
+        self.assertEqual("".join(d["body"] for d in documents), post.body)
+        self.assertTrue(all(d["_parent"] == "1" and d["_chunks"] == 3 for d in documents))
+        self.assertTrue(all(d["title"] == "Hello" and d["summary"] == "01234" for d in documents))
+        self.assertEqual(post._meili_document(), documents[0])
+        self.assertIn("_parent", ChunkedPost._meilisearch["displayed_fields"])
+        self.assertIn("_chunk", ChunkedPost._meilisearch["filterable_fields"])
+
+        from django.core.exceptions import ImproperlyConfigured
+
+        class ChunkedPage(IndexMixin, models.Model):
+            slug = models.SlugField(primary_key=True)
+            body = models.TextField()
+
+            class MeiliMeta:
+                searchable_fields = ("body",)
+                chunk_fields = {"body": 10}
+
+        # A row keyed "hello-1" would share its id with the second chunk of "hello".
+        with self.assertRaises(ImproperlyConfigured):
+            list(ChunkedPage(slug="hello", body="one two three four five")._meili_documents())
+
+    def test_display_options_are_sent_with_the_search(self):
+        params = self.Post.meilisearch.highlight("title").crop(length=5)._params()
+        self.assertEqual(params["attributesToHighlight"], ["title"])
+        self.assertEqual(params["attributesToCrop"], ["*"])
+        self.assertEqual(params["cropLength"], 5)
+        self.assertNotIn("showRankingScore", params)
+        self.assertNotIn("attributesToHighlight", self.Post.meilisearch._params())
+
+    def test_tenant_tokens_are_minted_locally_and_cached(self):
+        from base64 import urlsafe_b64decode
+        from unittest.mock import patch
+        from uuid import uuid4
+
+        from django.core.exceptions import ImproperlyConfigured
+
+        from django_meili._client import TenantTokens, client
+
+        class TenantPost(IndexMixin, models.Model):
+            organization_id = models.IntegerField()
+            title = models.CharField(max_length=255)
+
+            class MeiliMeta:
+                filterable_fields = ("title",)
+                searchable_fields = ("title",)
+                displayed_fields = ("id", "title")
+                tenant_field = "organization_id"
+
+        self.assertIn("organization_id", TenantPost._meilisearch["filterable_fields"])
+        post = TenantPost(pk=1, organization_id=5, title="Hello")
+        self.assertEqual(post.meili_serialize()["organization_id"], 5)
+
+        tokens = TenantTokens(client.client, "search-key", str(uuid4()), 60)
+        with patch.object(client, "tenant_tokens", tokens):
+            token = client.tenant_token_for(5, TenantPost)
+            self.assertEqual(client.tenant_token_for(5, TenantPost), token)
+            self.assertNotEqual(client.tenant_token_for(6, TenantPost), token)
+        payload = json.loads(urlsafe_b64decode(token.split(".")[1] + "=="))
+        self.assertEqual(
+            payload["searchRules"], {"TenantPost": {"filter": 'organization_id = "5"'}}
+        )
+        # A model without a tenant_field is only searchable in full when asked for.
+        with self.assertRaises(ImproperlyConfigured):
+            client.tenant_token_for(5, TenantPost, self.Post)
+        with patch.object(client, "tenant_token") as tenant_token:
+            client.tenant_token_for(5, TenantPost, unrestricted=[self.Post])
+        self.assertEqual(
+            tenant_token.call_args.args[0],
+            {"Post": {}, "TenantPost": {"filter": 'organization_id = "5"'}},
+        )
+        with self.assertRaises(ImproperlyConfigured):
+            TenantTokens(client.client, None, None, 60).get({"TenantPost": {}})
+
+    def test_documents_can_be_routed_to_other_indexes(self):
+        class RoutedPost(IndexMixin, models.Model):
+            organization_id = models.IntegerField()
+            title = models.CharField(max_length=255)
+
+            class MeiliMeta:
+                filterable_fields = ("title",)
+                searchable_fields = ("title",)
+
+            def meili_index_name(self):
+                return f"RoutedPost_{self.organization_id}"
+
+        self.assertTrue(RoutedPost._meilisearch["routed"])
+        self.assertFalse(self.Post._meilisearch["routed"])
+        post = RoutedPost(pk=1, organization_id=5, title="Hello")
+        self.assertEqual(post.meili_index_name(), "RoutedPost_5")
+        self.assertEqual(self.Post(title="Hello").meili_index_name(), "Post")
+        queryset = RoutedPost.meilisearch.using_index("RoutedPost_5")
+        self.assertEqual((queryset.index_name, queryset.index.uid), ("RoutedPost_5", "RoutedPost_5"))
+        self.assertEqual(RoutedPost.meilisearch.index_name, "RoutedPost")
+
+        from unittest import mock
+
+        from django.core.exceptions import ImproperlyConfigured
+
+        from django_meili._client import client
+
+        with self.assertRaises(ImproperlyConfigured):
+            client.tenant_token_for(5, RoutedPost)
+        with mock.patch.object(client, "tenant_token") as tenant_token:
+            client.tenant_token_for(5, unrestricted=[(RoutedPost, "RoutedPost_5")])
+        self.assertEqual(tenant_token.call_args.args[0], {"RoutedPost_5": {}})
+
+    def test_vectors_are_computed_in_batches(self):
+        calls = []
+
+        class EmbeddedPost(IndexMixin, models.Model):
+            title = models.CharField(max_length=255)
+
+            class MeiliMeta:
+                filterable_fields = ("title",)
+                searchable_fields = ("title",)
+                displayed_fields = ("id", "title")
+                embedders = {"local": {"source": "userProvided", "dimensions": 2}}
+
+            @classmethod
+            def meili_embed(cls, instances):
+                calls.append(len(instances))
+                return {"local": [[len(post.title), 1.0] for post in instances]}
+
+        posts = [EmbeddedPost(pk=1, title="Hi"), EmbeddedPost(pk=2, title="Hello")]
+        vectors = EmbeddedPost._meili_vectors(posts)
+        self.assertEqual(calls, [2])
+        self.assertEqual(vectors, [{"local": [2, 1.0]}, {"local": [5, 1.0]}])
+        document = next(posts[0]._meili_documents(vectors[0]))
+        self.assertEqual(document["_vectors"], {"local": [2, 1.0]})
+        self.assertEqual(self.Post._meili_vectors(posts), [None, None])
+
+        params = EmbeddedPost.meilisearch.hybrid(semantic_ratio=0.8, vector=(1.0, 0.0))._params()
+        self.assertEqual(params["hybrid"], {"semanticRatio": 0.8, "embedder": "local"})
+        self.assertEqual(params["vector"], [1.0, 0.0])
+        self.assertNotIn("hybrid", EmbeddedPost.meilisearch._params())
+
+    def test_geo_points_are_read_from_geo_fields(self):
+        class PlacePost(IndexMixin, models.Model):
+            title = models.CharField(max_length=255)
+            lat = models.FloatField(null=True)
+            lng = models.FloatField(null=True)
+
+            class MeiliMeta:
+                filterable_fields = ("title",)
+                searchable_fields = ("title",)
+                displayed_fields = ("id", "title")
+                geo_fields = ("lat", "lng")
+
+        self.assertTrue(PlacePost._meilisearch["supports_geo"])
+        self.assertIn("lat", PlacePost._meilisearch["tracked_fields"])
+        posts = [
+            PlacePost(pk=1, title="a", lat=10.5, lng=-20),
+            PlacePost(pk=2, title="b", lat=None, lng=None),
+        ]
+        self.assertEqual(
+            PlacePost._meili_geo_points(posts), [{"lat": 10.5, "lng": -20}, None]
+        )
+        self.assertEqual(posts[0].meili_geo(), {"lat": 10.5, "lng": -20})
+        self.assertNotIn("_geo", posts[1]._meili_document())
+        with self.assertRaisesMessage(ValueError, "[3, 4]"):
+            PlacePost._meili_geo_points(
+                [*posts, PlacePost(pk=3, lat=91, lng=0), PlacePost(pk=4, lat=1, lng=None)]
+            )
+
+        with self.assertRaises(ValueError):
+            self.Post.meilisearch.filter(Radius(100, 0, 10))
+        with self.assertRaises(ValueError):
+            self.Post.meilisearch.filter(Radius(0, 0, -1))
+        self.Post.meilisearch.filter(Radius("45.5", "-73.5", 1000))
+
+    def test_raw_hits_are_slotted_objects(self):
+        Hit = self.PostNoGeo._meili_hit_class()
+        hit = Hit.from_hit({"id": "1", "title": "Hello", "body": "World", "_rankingScore": 0.5})
+        self.assertEqual((hit.id, hit.title, hit.body), ("1", "Hello", "World"))
+        self.assertEqual(hit.ranking_score, 0.5)
+        self.assertIsNone(hit.formatted)
+        self.assertFalse(hasattr(hit, "__dict__"))
+        self.assertIs(self.PostNoGeo._meili_hit_class(), Hit)
+
+    def test_hydrate_uses_the_given_queryset(self):
+        base = self.Post.objects.filter(title="Hello")
+        queryset = self.Post.meilisearch.hydrate(queryset=base)._hydrate([1])
+        self.assertIn("title", str(queryset.query))
+
+
+class AdaptiveBatcherTestCase(TestCase):
+    @staticmethod
+    def finished_task(seconds: float):
+        from meilisearch.models.task import Task
+
+        started_at = datetime(2024, 1, 1)
+        finished_at = started_at + timedelta(seconds=seconds)
+        return Task(
+            uid=1,
+            status="succeeded",
+            type="documentAdditionOrUpdate",
+            enqueuedAt=started_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            startedAt=started_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            finishedAt=finished_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        )
+
+    def test_batches_are_bounded_by_count(self):
+        batcher = AdaptiveBatcher(max_bytes=10_000, batch_size=2)
+        batches = list(batcher.batches({"id": i} for i in range(5)))
+        self.assertEqual([len(b.documents) for b in batches], [2, 2, 1])
+        self.assertEqual(batches[0].payload, b'{"id":0}\n{"id":1}')
+
+    def test_batches_are_bounded_by_bytes(self):
+        batcher = AdaptiveBatcher(max_bytes=20, batch_size=1000)
+        batches = list(batcher.batches({"id": i} for i in range(5)))
+        self.assertTrue(all(len(b.payload) <= 20 for b in batches))
+        self.assertEqual(sum(len(b.documents) for b in batches), 5)
+
+    def test_oversized_document_is_sent_alone(self):
+        batcher = AdaptiveBatcher(max_bytes=5, batch_size=1000)
+        batches = list(batcher.batches([{"body": "x" * 10}, {"id": 1}]))
+        self.assertEqual(len(batches), 2)
+
+    def test_batch_size_adapts_to_task_duration(self):
+        batcher = AdaptiveBatcher(max_bytes=10_000, batch_size=100, target_duration=2.0)
+        batcher.record(self.finished_task(4.0))
+        self.assertEqual(batcher.batch_size, 50)
+        batcher.record(self.finished_task(0.5))
+        self.assertEqual(batcher.batch_size, 100)
+        batcher.record(self.finished_task(1.5))
+        self.assertEqual(batcher.batch_size, 100)
+
+
+class ChunkingTestCase(TestCase):
+    def test_text_is_split_at_whitespace(self):
+        self.assertEqual(split_text("hello big world", 10), ["hello big ", "world"])
+        self.assertEqual(split_text("abcdefghij", 4), ["abcd", "efgh", "ij"])
+        self.assertEqual(split_text("", 4), [""])
+
+    def test_chunk_filter_matches_parents_and_surplus_chunks(self):
+        self.assertEqual(
+            chunk_filter(["1"], {"2": 3, "4": 3}),
+            '_parent IN ["1"] OR (_parent IN ["2", "4"] AND _chunk >= 3)',
+        )
+
+
+class SelectModelsTestCase(TestCase):
+    def test_models_are_selected_by_label_app_or_glob(self):
+        self.assertIn(PostNoGeo, select_models(["posts.PostNoGeo"]))
+        self.assertNotIn(Post, select_models(["posts.PostNoGeo"]))
+        selected = select_models(["posts.postnogeo", "posts.Post*"])
+        self.assertLess(selected.index(PostNoGeo), selected.index(Post))
+        self.assertEqual(len(selected), len(set(selected)))
+        self.assertIn(UuidIdPost, select_models(["posts"]))
+        self.assertLessEqual(set(select_models(["posts"])), set(select_models(["*"])))
+        with self.assertRaises(LookupError):
+            select_models(["posts.Comment"])
+
+    def test_command_arguments_are_resolved_to_models(self):
+        self.assertEqual(resolve_models(["posts.PostNoGeo", "posts.PostNoGeo"]), [PostNoGeo])
+        self.assertEqual(resolve_models([], all=True), select_models(["*"]))
+        self.assertIs(resolve_model("posts.Post"), Post)
+        for patterns, message in (
+            ([], "Give at least one model, or --all"),
+            (["posts.Comment"], "Model not found: posts.Comment"),
+            (["django_meili.DocumentHash"], "Invalid model: django_meili.DocumentHash"),
+            (["blog_*"], "No indexed models match: blog_*"),
+        ):
+            with self.assertRaisesMessage(LookupError, message):
+                resolve_models(patterns)
+
+
+class TaskQueueTestCase(TestCase):
+    def test_tasks_are_waited_on_in_order_within_the_shared_limit(self):
+        from threading import BoundedSemaphore
+
+        waited, done = [], []
+        shared = BoundedSemaphore(2)
+        queue = TaskQueue(waited.append, limit=10, shared=shared)
+        for i in range(3):
+            queue.submit(lambda i=i: i, done.append)
+        # Only two tasks fit in the shared slots, so the oldest was waited on first.
+        self.assertEqual(waited, [0])
+        self.assertFalse(shared.acquire(blocking=False))
+        queue.join()
+        self.assertEqual(waited, [0, 1, 2])
+        self.assertEqual(done, [0, 1, 2])
+        self.assertEqual(len(queue), 0)
+        self.assertTrue(shared.acquire(blocking=False))
+
+    def test_queue_waits_once_its_own_limit_is_reached(self):
+        waited = []
+        queue = TaskQueue(waited.append, limit=2)
+        for i in range(3):
+            queue.submit(lambda i=i: i)
+        self.assertEqual(waited, [0, 1])
+
+
+class ProgressTestCase(TestCase):
+    def test_progress_reports_rate_and_eta(self):
+        lines = []
+        progress = Progress(100, lines.append, interval=0, label="Shard 1/2: ")
+        progress.advance(25)
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].startswith("Shard 1/2: 25/100 rows ("))
+        self.assertIn("ETA", lines[0])
+        self.assertIsNone(Progress(100, lines.append).eta)
+
+
+class InstrumentationTestCase(TestCase):
+    def test_operation_records_duration_and_attributes(self):
+        instrumentation = Instrumentation()
+        with instrumentation.operation("search", "posts", query="hello") as op:
+            op.set(hits=3)
+        self.assertFalse(instrumentation.enabled)
+        self.assertGreater(op.duration, 0)
+        self.assertEqual(op.attributes, {"query": "hello", "hits": 3})
+
+    def test_operation_records_duration_on_error(self):
+        with self.assertRaises(ValueError):
+            with Instrumentation().operation("search", "posts") as op:
+                raise ValueError
+        self.assertGreater(op.duration, 0)
+
+    @skipIf(prometheus_client is None, "prometheus-client is not installed")
+    def test_metrics_are_recorded(self):
+        instrumentation = Instrumentation(metrics=True)
+        with instrumentation.operation("search", "instrumented") as op:
+            op.set(hits=3)
+        self.assertEqual(
+            prometheus_client.REGISTRY.get_sample_value(
+                "django_meili_requests_total",
+                {"operation": "search", "index": "instrumented", "outcome": "ok"},
+            ),
+            1.0,
+        )
+
+
+class QueryLogTestCase(SearchAssertionsMixin, TestCase):
+    def setUp(self):
+        from django_meili._client import client
+
+        self.instrumentation = client.instrumentation
+
+    def test_capture_only_keeps_requested_operations(self):
+        with CaptureSearchesContext() as ctx:
+            with self.instrumentation.operation("search", "posts", query="hello"):
+                pass
+            with self.instrumentation.operation("add_documents", "posts"):
+                pass
+        self.assertEqual([q["operation"] for q in ctx], ["search"])
+        self.assertEqual(ctx[0]["query"], "hello")
+
+    def test_assert_num_searches(self):
+        with self.assertNumSearches(1):
+            with self.instrumentation.operation("search", "posts"):
+                pass
+        with self.assertRaises(AssertionError):
+            with self.assertNumSearches(0):
+                with self.instrumentation.operation("search", "posts"):
+                    pass
+
+    def test_capture_counts_once_the_log_is_full(self):
+        log = self.instrumentation.log
+        log.forced += 1
+        self.addCleanup(setattr, log, "forced", log.forced - 1)
+        for _ in range(log.max_entries):
+            with self.instrumentation.operation("search", "posts"):
+                pass
+        with self.assertNumSearches(2):
+            for _ in range(2):
+                with self.instrumentation.operation("search", "posts"):
+                    pass
+
+
+@override_settings(MEILISEARCH={"SYNC": True}, DEBUG=True)
+class MemoryBackendTestCase(MemoryBackendMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.lincoln = Post.objects.create(
+            title="Hello World", body="Coffee in Lincoln", lat=40.8136, lng=-96.7026
+        )
+        cls.omaha = Post.objects.create(
+            title="Hello Moon", body="Tea in Omaha", lat=41.2565, lng=-95.9345
+        )
+
+    def test_search_ranks_by_matched_words(self):
+        with CaptureSearchesContext() as ctx:
+            posts = list(Post.meilisearch.with_ranking_score().search("hello wor"))
+        self.assertEqual(len(ctx), 1)
+        self.assertEqual(posts, [self.lincoln, self.omaha])
+        self.assertEqual([post.meili_score for post in posts], [1.0, 0.5])
+        self.assertEqual(list(Post.meilisearch.search("tea")), [self.omaha])
+        self.assertEqual(Post.meilisearch.search("nothing").count(), 0)
+        post = Post.meilisearch.highlight("title").search("hello").first()
+        self.assertEqual(post.meili_formatted["title"], "<em>Hello</em> World")
+
+    def test_filters_and_geo_are_evaluated(self):
+        self.assertEqual(
+            list(Post.meilisearch.filter(title="hello moon").search()), [self.omaha]
+        )
+        self.assertEqual(
+            list(Post.meilisearch.filter(title__in=["Hello World", "Other"]).search()),
+            [self.lincoln],
+        )
+        self.assertEqual(
+            list(Post.meilisearch.filter(Radius(41.25, -95.93, 10_000)).search()),
+            [self.omaha],
+        )
+        nearest = list(Post.meilisearch.order_by("geoPoint(41.2565, -95.9345)").search())
+        self.assertEqual(nearest, [self.omaha, self.lincoln])
+        self.assertEqual(nearest[0].meili_geo_distance, 0)
+        # Like MeiliSearch, attributes missing from the index settings are rejected.
+        with self.assertRaises(MeilisearchApiError):
+            Post.meilisearch.filter(body="Tea in Omaha").search()
+        with self.assertRaises(MeilisearchApiError):
+            Post.meilisearch.order_by("title").search()
+
+    def test_partial_updates_send_coordinates_as_geo_only(self):
+        from django_meili._client import client
+
+        created = PlacePost.objects.create(title="Lincoln", lat=40.8136, lng=-96.7026)
+        post = PlacePost.objects.get(pk=created.pk)
+        post.lat = 41.2565
+        post.save()
+        index = client.get_index(PlacePost._meilisearch["index_name"])
+        document = dict(index.get_document(post._meili_document_id()))
+        self.assertNotIn("lat", document)
+        self.assertEqual(document["_geo"], {"lat": 41.2565, "lng": -96.7026})
+        self.assertEqual(document["title"], "Lincoln")
+
+        post.lat = post.lng = None
+        post.save()
+        document = dict(index.get_document(post._meili_document_id()))
+        self.assertIsNone(document["_geo"])
+
+    @isolate_apps("django_meili")
+    def test_routed_indexes_are_listed_from_meilisearch(self):
+        from django.core.exceptions import ImproperlyConfigured
+
+        from django_meili._client import client
+        from django_meili.views import autocomplete
+
+        class RoutedPost(IndexMixin, models.Model):
+            organization_id = models.IntegerField()
+            title = models.CharField(max_length=255)
+
+            class MeiliMeta:
+                filterable_fields = ("title",)
+                searchable_fields = ("title",)
+
+            def meili_index_name(self):
+                return f"RoutedPost_{self.organization_id}"
+
+        class ArchivedPost(IndexMixin, models.Model):
+            class MeiliMeta:
+                index_name = "RoutedPost_archive"
+
+        # Indexes created by other processes, or emptied since, are found too.
+        for index_name in ("RoutedPost_1", "RoutedPost_2", "RoutedPosts"):
+            client.create_index(index_name, "pk")
+        client.flush_tasks()
+        self.assertEqual(
+            RoutedPost._meili_index_names(), ["RoutedPost", "RoutedPost_1", "RoutedPost_2"]
+        )
+        self.assertEqual(Post._meili_index_names(), [Post._meilisearch["index_name"]])
+
+        request = RequestFactory().get("/autocomplete/", {"q": "Hello"})
+        with self.assertRaises(ImproperlyConfigured):
+            autocomplete(request, RoutedPost)
+        response = autocomplete(request, RoutedPost, index_name=lambda request: "RoutedPost_1")
+        self.assertEqual(json.loads(response.content)["hits"], [])
+
+    def test_http_wrapper_matches_the_client_signature(self):
+        from inspect import signature
+
+        from meilisearch._httprequests import HttpRequests
+
+        from django_meili._client import _Http
+
+        # _Http overrides a private method, so a new meilisearch release must not change it.
+        expected = signature(HttpRequests.send_request).parameters
+        self.assertEqual(
+            [(name, p.kind) for name, p in expected.items()],
+            [(name, p.kind) for name, p in signature(_Http.send_request).parameters.items()],
+        )
+        self.assertEqual(
+            list(expected), ["self", "http_method", "path", "body", "content_type", "serializer"]
+        )
+
+    def test_indexes_are_restored_before_each_test(self):
+        self.omaha.delete()
+        self.assertEqual(list(Post.meilisearch.search("hello")), [self.lincoln])
+        self.meili_backend.load(self._meili_state)
+        self.assertEqual(len(Post.meilisearch.raw().search("hello")), 2)
+
+
+class UnavailableBackend(Backend):
+    def request(self, method, path, body=None, content_type=None):
+        raise MeilisearchCommunicationError("Connection refused")
+
+
+class ServerErrorBackend(Backend):
+    def request(self, method, path, body=None, content_type=None):
+        from django_meili.backends import api_error
+
+        raise api_error(503, {"message": "Overloaded", "code": "internal", "type": "internal"})
+
+
+class CircuitBreakerTestCase(MemoryBackendMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.hello = PostNoGeo.objects.create(title="Hello World", body="Coffee")
+        cls.moon = PostNoGeo.objects.create(title="Hello Moon", body="Tea")
+
+    def use_outage(self, backend: Backend | None = None):
+        from django_meili._client import client
+
+        previous = client.backend, client.breaker
+        # Probing on every request, the breaker closes as soon as MeiliSearch is back.
+        client.backend = backend or UnavailableBackend()
+        client.breaker = CircuitBreaker(reset_timeout=0)
+        self.addCleanup(setattr, client, "backend", previous[0])
+        self.addCleanup(setattr, client, "breaker", previous[1])
+
+    def test_breaker_opens_on_failures_and_closes_after_a_probe(self):
+        from django_meili.signals import circuit_state_changed
+
+        now = [0.0]
+        breaker = CircuitBreaker(
+            failure_rate=0.5,
+            slow_call=1.0,
+            window=4,
+            min_calls=2,
+            reset_timeout=10,
+            clock=lambda: now[0],
+        )
+        states = []
+
+        def receiver(state, **kwargs):
+            states.append(state)
+
+        circuit_state_changed.connect(receiver)
+        self.addCleanup(circuit_state_changed.disconnect, receiver)
+
+        def fail():
+            raise MeilisearchCommunicationError("Connection refused")
+
+        def slow():
+            now[0] += 1.0
+
+        with self.assertRaises(MeilisearchCommunicationError):
+            breaker.call(fail)
+        self.assertEqual(breaker.state, "closed")
+        breaker.call(slow)
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(CircuitOpenError):
+            breaker.call(lambda: self.fail("The breaker is open"))
+
+        now[0] += 10
+        with self.assertRaises(MeilisearchCommunicationError):
+            breaker.call(fail)
+        self.assertEqual(breaker.state, "open")
+        now[0] += 10
+        self.assertEqual(breaker.call(lambda: "ok"), "ok")
+        self.assertEqual(states, ["open", "half_open", "open", "half_open", "closed"])
+
+    def test_document_writes_are_never_slow_calls(self):
+        from django_meili._client import client
+
+        now = [0.0]
+        meili_backend = self.meili_backend
+
+        class SlowBackend(Backend):
+            def request(self, method, path, body=None, content_type=None):
+                now[0] += 5
+                return meili_backend.request(method, path, body, content_type)
+
+        self.use_outage(SlowBackend())
+        client.breaker = CircuitBreaker(slow_call=1.0, window=1, min_calls=1, clock=lambda: now[0])
+        with override_settings(DEBUG=True):
+            PostNoGeo.objects.create(title="Hello Slow", body="Uploaded and waited on")
+        self.assertEqual(client.breaker.state, "closed")
+        PostNoGeo.meilisearch.search("slow")
+        self.assertEqual(client.breaker.state, "open")
+
+    def test_search_falls_back_to_the_database(self):
+        self.use_outage()
+        with self.assertRaises(MeilisearchCommunicationError):
+            PostNoGeo.meilisearch.search("hello")
+        with override_settings(MEILISEARCH={"SEARCH_FALLBACK": "database"}):
+            self.assertEqual(
+                list(PostNoGeo.meilisearch.order_by("-title").search("hello")),
+                [self.hello, self.moon],
+            )
+            self.assertEqual(
+                list(PostNoGeo.meilisearch.filter(title__in=["Hello Moon"]).search("tea")),
+                [self.moon],
+            )
+            self.assertEqual(list(PostNoGeo.meilisearch[1:].search("hello")), [self.moon])
+            with self.assertRaises(MeilisearchCommunicationError):
+                PostNoGeo.meilisearch.raw().search("hello")
+
+    def test_server_errors_count_as_unavailable(self):
+        self.use_outage(ServerErrorBackend())
+        with override_settings(MEILISEARCH={"SEARCH_FALLBACK": "database"}):
+            self.assertEqual(list(PostNoGeo.meilisearch.search("moon")), [self.moon])
+        self.moon.title = "Goodbye Moon"
+        self.moon.save()
+        self.assertEqual(
+            list(PendingWrite.objects.values_list("document_id", "action")),
+            [(self.moon._meili_document_id(), "index")],
+        )
+
+    def test_writes_are_diverted_and_replayed(self):
+        self.use_outage()
+        added = PostNoGeo.objects.create(title="Hello Outage", body="Written while down")
+        moon_id = self.moon._meili_document_id()
+        self.moon.delete()
+        self.assertEqual(
+            sorted(PendingWrite.objects.values_list("document_id", "action")),
+            sorted([(added._meili_document_id(), "index"), (moon_id, "delete")]),
+        )
+        with self.assertRaises(SystemExit):
+            management.call_command("replayoutbox", stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(PendingWrite.objects.count(), 2)
+
+        from django_meili._client import client
+
+        client.backend = self.meili_backend
+        out = StringIO()
+        management.call_command("replayoutbox", stdout=out)
+        self.assertIn("Indexed 1 and deleted 1 documents", out.getvalue())
+        self.assertFalse(PendingWrite.objects.exists())
+        self.assertEqual(list(PostNoGeo.meilisearch.search("outage")), [added])
+        self.assertEqual(PostNoGeo.meilisearch.search("moon").count(), 0)
+
+
+@override_settings(MEILISEARCH={"SYNC": True}, DEBUG=True)
+class RecordingBackendTestCase(TestCase):
+    def use_backend(self, backend):
+        from django_meili._client import client
+
+        previous = client.backend
+        client.backend = backend
+        self.addCleanup(setattr, client, "backend", previous)
+
+    def test_backends_are_selected_by_name_or_path(self):
+        from django.core.exceptions import ImproperlyConfigured
+
+        from django_meili.backends import get_backend
+        from django_meili.backends.memory import MemoryBackend
+
+        self.assertIsNone(get_backend("http"))
+        self.assertIsInstance(get_backend("memory"), MemoryBackend)
+        self.assertIsInstance(
+            get_backend("django_meili.backends.memory.MemoryBackend"), MemoryBackend
+        )
+        with self.assertRaises(ImproperlyConfigured):
+            get_backend("posts.backends.Missing")
+
+    def test_recording_uses_the_client_http_signatures(self):
+        from inspect import signature
+
+        from meilisearch._httprequests import HttpRequests
+
+        # RecordingBackend builds and calls the private HttpRequests directly.
+        self.assertEqual(list(signature(HttpRequests).parameters)[:1], ["config"])
+        self.assertEqual(
+            list(signature(HttpRequests.send_request).parameters)[1:5],
+            ["http_method", "path", "body", "content_type"],
+        )
+
+    def test_replay_serves_recorded_traffic(self):
+        from django_meili._client import client
+        from django_meili.backends.recording import RecordingBackend, ReplayBackend
+
+        PostNoGeo.objects.create(title="Recorded", body="Played back")
+        path = Path(self.enterContext(TemporaryDirectory())) / "traffic.jsonl"
+        recorder = RecordingBackend(client.client.config, path=path)
+        self.addCleanup(recorder.close)
+        self.use_backend(recorder)
+        recorded = PostNoGeo.meilisearch.raw().search("Recorded")
+        self.assertEqual(json.loads(path.read_text())["path"], "indexes/posts_not_geo/search")
+
+        self.use_backend(ReplayBackend(client.client.config, path=path, latency=0))
+        self.assertEqual(PostNoGeo.meilisearch.raw().search("Recorded"), recorded)
+        with self.assertRaises(MeilisearchApiError):
+            PostNoGeo.meilisearch.raw().search("Never recorded")
+
+    def test_replay_reproduces_latency(self):
+        from django_meili.backends.recording import ReplayBackend
+
+        path = Path(self.enterContext(TemporaryDirectory())) / "traffic.jsonl"
+        exchange = {"method": "GET", "path": "health", "body": None, "content_type": None}
+        path.write_text(
+            json.dumps(exchange | {"status": 200, "response": {"status": "available"}, "duration": 0.05})
+        )
+        started = time.perf_counter()
+        response = ReplayBackend(None, path=path).request("GET", "health")
+        self.assertEqual(response, {"status": "available"})
+        self.assertGreaterEqual(time.perf_counter() - started, 0.05)
+
 
 @override_settings(MEILISEARCH={"SYNC": True}, DEBUG=True)
 class DjangoMeiliTestCase(TestCase):
@@ -109,11 +1037,95 @@ class DjangoMeiliTestCase(TestCase):
     def test_post_was_indexed(self):
         self.assertNotEqual(Post.meilisearch.count(), 0)
 
+    def test_fields_left_out_of_a_save_are_sent_with_the_next(self):
+        from django_meili._client import client
+
+        created = PostNoGeo.objects.create(title="Partial", body="Saved first")
+        self.addCleanup(created.delete)
+        post = PostNoGeo.objects.get(pk=created.pk)
+        post.title = "Partial Again"
+        post.body = "Saved later"
+        post.save(update_fields=["title"])
+        post.save()
+        document = client.get_index(PostNoGeo._meilisearch["index_name"]).get_document(
+            post._meili_document_id()
+        )
+        self.assertEqual((document.title, document.body), ("Partial Again", "Saved later"))
+
     def test_post_search_returns_post(self):
         self.assertEqual(
             Post.meilisearch.search("Hello World").first().title, "Hello World"
         )
 
+    def test_search_attaches_highlights_and_scores(self):
+        with CaptureSearchesContext() as ctx:
+            post = (
+                PostNoGeo.meilisearch.highlight("title")
+                .with_ranking_score()
+                .search("Hello")
+                .first()
+            )
+        self.assertEqual(len(ctx), 1)
+        self.assertIn("<em>Hello</em>", post.meili_formatted["title"])
+        self.assertIsNotNone(post.meili_score)
+        self.assertIsNone(PostNoGeo.meilisearch.search("Hello").first().meili_score)
+
+    def test_autocomplete_returns_cached_hits(self):
+        from django.core.cache import cache
+
+        from django_meili.views import autocomplete
+
+        cache.clear()
+        request = RequestFactory().get("/autocomplete/", {"q": "Hello", "client": "a", "seq": 2})
+        with CaptureSearchesContext() as ctx:
+            response = autocomplete(request, "posts.PostNoGeo", fields=["id", "title"])
+            cached = autocomplete(request, "posts.PostNoGeo", fields=["id", "title"])
+        self.assertEqual(len(ctx), 1)
+        self.assertEqual(response.content, cached.content)
+        self.assertEqual(json.loads(response.content)["hits"][0]["title"], "Hello World")
+        stale = RequestFactory().get("/autocomplete/", {"q": "Hell", "client": "a", "seq": 1})
+        self.assertEqual(autocomplete(stale, "posts.PostNoGeo").status_code, 204)
+
+    def test_autocomplete_quotes_filter_values(self):
+        from django.core.cache import cache
+
+        from django_meili.views import autocomplete
+
+        cache.clear()
+        for title in ("it's", "x' OR title = 'Hello World", 'say "hi"'):
+            request = RequestFactory().get("/autocomplete/", {"q": "", "title": title})
+            response = autocomplete(request, "posts.PostNoGeo")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content)["hits"], [])
+        request = RequestFactory().get("/autocomplete/", {"q": "", "title": "Hello World"})
+        response = autocomplete(request, "posts.PostNoGeo")
+        self.assertEqual(json.loads(response.content)["hits"][0]["title"], "Hello World")
+
+    def test_autocomplete_answers_rejected_queries_with_400(self):
+        from django_meili.views import autocomplete
+
+        request = RequestFactory().get("/autocomplete/", {"q": "Hello"})
+        response = autocomplete(request, "posts.PostNoGeo", index_name="no_such_index")
+        self.assertEqual(response.status_code, 400)
+
+    def test_federated_search_merges_models(self):
+        from django_meili import federated_search
+
+        with CaptureSearchesContext(operations=("federated_search",)) as ctx:
+            with self.assertNumQueries(2):
+                results = federated_search(
+                    "Hello World", models=[Post, PostNoGeo], weights={PostNoGeo: 2.0}
+                )
+        self.assertEqual(len(ctx), 1)
+        self.assertIsInstance(results[0], PostNoGeo)
+        self.assertIn(self.post, results)
+        self.assertIn(self.post_no_geo, results)
+
+    def test_raw_search_returns_hits(self):
+        hits = PostNoGeo.meilisearch.raw().search("Hello World")
+        self.assertEqual(hits[0].title, "Hello World")
+        self.assertEqual(hits[0].id, str(self.post_no_geo.pk))
+
     def test_bad_search_returns_nothing(self):
         self.assertEqual(Post.meilisearch.search("al;kdfja;lsdkfj").count(), 0)
 
@@ -149,6 +1161,13 @@ class DjangoMeiliTestCase(TestCase):
             "Hello World",
         )
 
+    def test_geo_distance_is_attached_when_sorting_by_point(self):
+        lat, lng = self.coordinates
+        post = Post.meilisearch.order_by(f"geoPoint({lat}, {lng})").search().first()
+        self.assertEqual(post.meili_geo_distance, 0)
+        hit = Post.meilisearch.raw().order_by(f"geoPoint({lat}, {lng})").search()[0]
+        self.assertEqual(hit.geo_distance, 0)
+
     def test_post_no_geo_has_custom_index_name(self):
         self.assertEqual(PostNoGeo._meilisearch["index_name"], "posts_not_geo")
 
@@ -213,6 +1232,12 @@ class DjangoMeiliNonStandardIdTestCase(TestCase):
             "Hello World",
         )
 
+    def test_pk_codec_uses_the_primary_key_field(self):
+        codec = self.target_model._meili_pk_codec()
+        self.assertEqual((codec.attname, codec.lookup, codec.hit_key), ("crazy_id", "pk", "crazy_id"))
+        self.assertEqual(codec.to_python(["abc"]), ["abc"])
+        self.assertEqual(self.post._meili_document_id(), self.post.crazy_id)
+
     def test_crazy_id_present_in_serializer(self):
         # {'title': 'Hello World', 'body': 'This is a test post', 'crazy_id': 'WqzyCvZF'}
         self.assertEqual(
@@ -273,6 +1298,14 @@ class DjangoMeiliUuidTestCase(TestCase):
             "Hello World",
         )
 
+    def test_hit_ids_are_converted_back_to_uuids(self):
+        codec = self.target_model._meili_pk_codec()
+        self.assertEqual(codec.to_python([str(self.post.pk)]), [self.post.pk])
+        self.assertEqual(self.post._meili_document_id(), str(self.post.pk))
+        post = self.target_model.meilisearch.with_ranking_score().search("Hello World").first()
+        self.assertEqual(post, self.post)
+        self.assertIsNotNone(post.meili_score)
+
     def test_id_present_in_serializer(self):
         # {'title': 'Hello World', 'body': 'This is a test post', 'crazy_id': 'WqzyCvZF'}
         self.assertEqual(
@@ -335,6 +1368,54 @@ class DjangoMeiliSyncindexCommandTestCase(TestCase):
         self.assertIn("Synced index for posts.IndexNamePost", self.out.getvalue())
         self.assertEqual(IndexNamePost.meilisearch.count(), 2)
 
+    def test_syncindex_command_by_shard(self):
+        management.call_command("clearindex", "posts.IndexNamePost", stdout=self.out)
+        with override_settings(MEILISEARCH={"OFFLINE": True}):
+            IndexNamePost.objects.bulk_create(
+                [IndexNamePost(title=f"Hello World{i}", body="Body") for i in range(4)]
+            )
+        for shard in ("0", "1"):
+            management.call_command(
+                "syncindex",
+                "posts.IndexNamePost",
+                "--shards",
+                "2",
+                "--shard",
+                shard,
+                stdout=self.out,
+            )
+            # Rows added between the hosts starting must not move the cuts.
+            with override_settings(MEILISEARCH={"OFFLINE": True}):
+                IndexNamePost.objects.bulk_create(
+                    [IndexNamePost(title=f"Hello World{i}", body="Body") for i in range(4)]
+                )
+        self.assertIn("Synced index for posts.IndexNamePost (shard 2/2)", self.out.getvalue())
+        self.assertEqual(IndexNamePost.meilisearch.count(), 8)
+        self.assertEqual(SyncCheckpoint.objects.plan("posts.IndexNamePost"), {})
+
+
+    def test_syncindex_command_resumes_from_the_saved_shards(self):
+        management.call_command("clearindex", "posts.IndexNamePost", stdout=self.out)
+        with override_settings(MEILISEARCH={"OFFLINE": True}):
+            posts = IndexNamePost.objects.bulk_create(
+                [IndexNamePost(title=f"Hello World{i}", body="Body") for i in range(4)]
+            )
+        # The first shard of the interrupted sync finished, the second did not start.
+        SyncCheckpoint.objects.create_plan(
+            "posts.IndexNamePost", {"1/2": (None, posts[1].pk), "2/2": (posts[1].pk, None)}
+        )
+        SyncCheckpoint.objects.finish("posts.IndexNamePost", "1/2")
+
+        with self.assertRaises(SystemExit):
+            management.call_command(
+                "syncindex", "posts.IndexNamePost", "--shards", "3", "--resume", stderr=StringIO()
+            )
+        management.call_command(
+            "syncindex", "posts.IndexNamePost", "--shards", "2", "--resume", stdout=self.out
+        )
+        self.assertIn("posts.IndexNamePost shard 1/2: Already synced", self.out.getvalue())
+        self.assertEqual(IndexNamePost.meilisearch.count(), 3)
+        self.assertEqual(SyncCheckpoint.objects.plan("posts.IndexNamePost"), {})
 
 @override_settings(MEILISEARCH={"SYNC": True}, DEBUG=True)
 class DjangoMeiliClearindexCommandTestCase(TestCase):
@@ -364,3 +1445,54 @@ class DjangoMeiliClearindexCommandTestCase(TestCase):
             self.out.getvalue(),
         )
         self.assertEqual(IndexNamePost.meilisearch.count(), 0)
+
+
+@override_settings(MEILISEARCH={"SYNC": True}, DEBUG=True)
+class DjangoMeiliCheckCommandTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls) -> None:
+        from django_meili._client import client
+
+        client.client.delete_index(IndexNamePost._meilisearch["index_name"])
+        client.client.delete_index(ChunkedPost._meilisearch["index_name"])
+        return super().tearDownClass()
+
+    def test_meili_check_command(self):
+        IndexNamePost.objects.create(title="Hello World1", body="This is a test post1")
+        out = StringIO()
+        management.call_command("meili_check", "posts.IndexNamePost", stdout=out)
+        self.assertIn("Index for posts.IndexNamePost is consistent", out.getvalue())
+
+        with override_settings(MEILISEARCH={"OFFLINE": True}):
+            IndexNamePost.objects.create(
+                title="Hello World2", body="This is a test post2"
+            )
+        with self.assertRaises(SystemExit):
+            management.call_command("meili_check", "posts.IndexNamePost", stdout=out)
+        self.assertIn("1 missing documents", out.getvalue())
+
+        out = StringIO()
+        management.call_command(
+            "meili_check", "posts.IndexNamePost", "--content", "--repair", stdout=out
+        )
+        self.assertIn("Repaired index for posts.IndexNamePost", out.getvalue())
+        self.assertEqual(IndexNamePost.meilisearch.count(), 2)
+
+    def test_meili_check_repairs_chunked_rows(self):
+        post = ChunkedPost.objects.create(title="Hello", body="one two three four five six")
+        self.assertEqual(ChunkedPost.meilisearch.count(), 4)
+        with override_settings(MEILISEARCH={"OFFLINE": True}):
+            post.title = "Goodbye"
+            post.body = "one two"
+            post.save()
+
+        out = StringIO()
+        management.call_command(
+            "meili_check", "posts.ChunkedPost", "--content", "--repair", stdout=out
+        )
+        self.assertIn("1 stale documents", out.getvalue())
+        self.assertIn("Repaired index for posts.ChunkedPost", out.getvalue())
+        # The chunks the shorter body no longer has were deleted too.
+        self.assertEqual(ChunkedPost.meilisearch.count(), 1)
+        management.call_command("meili_check", "posts.ChunkedPost", "--content", stdout=out)
+        self.assertIn("Index for posts.ChunkedPost is consistent", out.getvalue())
@@ -0,0 +1,188 @@
+"""
+views.py
+Ian Kollipara <ian.kollipara@gmail.com>
+
+This module contains the views for the Django MeiliSearch app.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Future
+from hashlib import blake2b
+from json import dumps
+from threading import Lock
+from typing import Callable, Iterable, Type
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpRequest, HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.views.decorators.http import require_GET
+from meilisearch.errors import MeilisearchApiError, MeilisearchError
+
+from ._breaker import is_unavailable
+from .models import IndexMixin
+
+AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 50
+
+
+class _SingleFlight:
+    """Lets concurrent identical searches share a single MeiliSearch request."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.calls: dict[str, Future] = {}
+
+    def do(self, key: str, function: Callable[[], dict]) -> dict:
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = function()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+
+class _LatestQueries:
+    """Remembers the newest query number each client sent, to drop superseded ones."""
+
+    max_clients = 10_000
+
+    def __init__(self):
+        self.lock = Lock()
+        self.latest: OrderedDict[str, int] = OrderedDict()
+
+    def superseded(self, client: str, seq: int) -> bool:
+        """Record the query, returning whether the client already sent a newer one."""
+
+        with self.lock:
+            latest = self.latest.get(client, -1)
+            if seq > latest:
+                self.latest[client] = seq
+                self.latest.move_to_end(client)
+                if len(self.latest) > self.max_clients:
+                    self.latest.popitem(last=False)
+            return seq < latest
+
+
+_in_flight = _SingleFlight()
+_latest = _LatestQueries()
+
+
+@require_GET
+def autocomplete(
+    request: HttpRequest,
+    model: str | Type[IndexMixin],
+    fields: Iterable[str] | None = None,
+    limit: int = AUTOCOMPLETE_LIMIT,
+    index_name: str | Callable[[HttpRequest], str] | None = None,
+) -> HttpResponse:
+    """A JSON search-as-you-type endpoint for the given model.
+
+    Hits are returned as MeiliSearch sent them, with only the given fields
+    (the displayed fields by default), and rows are never loaded from the
+    database. GET parameters:
+    - q: the text typed so far.
+    - limit: the number of hits, up to the view's `limit` and at most 50.
+    - <field>: equality filters on the model's filterable fields.
+    - seq and client: an increasing number and a random id per input box (the
+      session is used when there is no client id). A query is answered with
+      204 No Content once the same client sent a newer one, so a burst of
+      keystrokes only costs the searches whose results can still be shown.
+
+    A model overriding `meili_index_name` needs the index to search, given as
+    `index_name`: its name, or a function returning it for the request.
+
+    Responses are cached for `MEILISEARCH["AUTOCOMPLETE_TIMEOUT"]` seconds by
+    index, query, filters and fields, and identical queries arriving together
+    in one process share a single search. While MeiliSearch is unavailable, or
+    the circuit breaker is open, it answers 503 Service Unavailable at once; a
+    query MeiliSearch rejects is answered with 400 Bad Request.
+
+    For example:
+    ```python
+    urlpatterns = [
+        path("posts/autocomplete/", autocomplete, {"model": "posts.Post", "fields": ["id", "title"]}),
+        path(
+            "notes/autocomplete/",
+            autocomplete,
+            {"model": "notes.Note", "index_name": lambda request: f"notes_{request.user.organization_id}"},
+        ),
+    ]
+    ```
+    """
+
+    Model = apps.get_model(model) if isinstance(model, str) else model
+    if index_name is None and Model._meilisearch["routed"]:
+        raise ImproperlyConfigured(
+            f"{Model._meta.label} routes documents to several indexes, "
+            "so autocomplete needs the index_name to search"
+        )
+    q = request.GET.get("q", "")
+    try:
+        limit = min(int(request.GET.get("limit", limit)), limit, MAX_AUTOCOMPLETE_LIMIT)
+        seq = int(request.GET["seq"]) if "seq" in request.GET else None
+    except ValueError:
+        return HttpResponseBadRequest("limit and seq must be integers")
+    filterable = Model._meilisearch["filterable_fields"] or ()
+    filters = {
+        field: request.GET[field]
+        for field in sorted(request.GET.keys() & set(filterable))
+        if not field.startswith("_")
+    }
+    fields = list(fields or Model._meilisearch["displayed_fields"] or ["*"])
+
+    client = request.GET.get("client") or (
+        request.session.session_key if hasattr(request, "session") else None
+    )
+    if seq is not None and client and _latest.superseded(f"{client}:{request.path}", seq):
+        return HttpResponse(status=204)
+
+    if callable(index_name):
+        index_name = index_name(request)
+    queryset = Model.meilisearch
+    if index_name is not None:
+        queryset = queryset.using_index(index_name)
+    index_name = queryset.index_name
+    digest = blake2b(
+        dumps([q.lower(), filters, fields, limit]).encode(), digest_size=16
+    ).hexdigest()
+    key = f"django_meili:autocomplete:{index_name}:{digest}"
+    cache = caches[settings.MEILISEARCH.get("AUTOCOMPLETE_CACHE", "default")]
+    body = cache.get(key)
+    if body is None:
+
+        def search() -> dict:
+            results = (
+                queryset.filter(**filters)
+                .attributes_to_retrieve(*fields)[:limit]
+                ._search(q)
+            )
+            body = {
+                "query": q,
+                "hits": results.get("hits", []),
+                "estimatedTotalHits": results.get("estimatedTotalHits"),
+            }
+            cache.set(key, body, settings.MEILISEARCH.get("AUTOCOMPLETE_TIMEOUT", 10))
+            return body
+
+        try:
+            body = _in_flight.do(key, search)
+        except MeilisearchError as e:
+            if is_unavailable(e):
+                return HttpResponse(status=503)
+            if isinstance(e, MeilisearchApiError) and 400 <= e.status_code < 500:
+                return HttpResponseBadRequest(e.message)
+            raise
+    return JsonResponse(body)
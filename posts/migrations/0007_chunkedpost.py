@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_indexnamepost_alter_uuididpost_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_chunkedpost'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlacePost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('lat', models.FloatField(null=True)),
+                ('lng', models.FloatField(null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -119,4 +119,38 @@ class IndexNamePost(IndexMixin, models.Model):
         index_name = "custom_index_name"
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+class ChunkedPost(IndexMixin, models.Model):
+    """Model definition for a Post split across several documents."""
+
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+
+    class MeiliMeta:
+        filterable_fields = ("title",)
+        searchable_fields = ("id", "title", "body")
+        displayed_fields = ("id", "title", "body")
+        index_name = "chunked_posts"
+        chunk_fields = {"body": 10}
+
+    def __str__(self):
+        return self.title
+
+
+class PlacePost(IndexMixin, models.Model):
+    """Model definition for a Post located by its geo_fields."""
+
+    title = models.CharField(max_length=255)
+    lat = models.FloatField(null=True)
+    lng = models.FloatField(null=True)
+
+    class MeiliMeta:
+        filterable_fields = ("title",)
+        searchable_fields = ("id", "title")
+        displayed_fields = ("id", "title")
+        geo_fields = ("lat", "lng")
+        index_name = "place_posts"
+
+    def __str__(self):
+        return self.title